@@ -3,11 +3,8 @@ from __future__ import annotations
 from typing import Any, Optional, Union
 
 import logging
-import math
-import time
-from datetime import datetime, timezone
+from datetime import datetime
 
-from pajbot import utils
 from pajbot.apiwrappers.response_cache import (
     ClassInstanceSerializer,
     DateTimeSerializer,
@@ -15,6 +12,7 @@ from pajbot.apiwrappers.response_cache import (
     TwitchChannelEmotesSerializer,
 )
 from pajbot.apiwrappers.twitch.base import BaseTwitchAPI
+from pajbot.apiwrappers.twitch.rate_limiter import HelixRateLimiter, get_endpoint_priority
 from pajbot.models.emote import Emote
 from pajbot.models.user import UserBasics, UserChannelInformation, UserStream
 from pajbot.utils import iterate_in_chunks
@@ -235,26 +233,37 @@ class TwitchHelixAPI(BaseTwitchAPI):
     def __init__(self, redis, app_token_manager):
         super().__init__(base_url="https://api.twitch.tv/helix", redis=redis)
         self.app_token_manager = app_token_manager
+        self.rate_limiter = HelixRateLimiter()
 
     @property
     def default_authorization(self):
         return self.app_token_manager
 
     def request(self, method, endpoint, params, headers, authorization=None, json=None):
+        # Twitch keeps one rate limit bucket per token
+        bucket_key = authorization if authorization is not None else self.default_authorization
+        priority = get_endpoint_priority(endpoint)
+
+        # wait for a point in the bucket, instead of running into the rate limit and then waiting for it to reset.
+        # Gives up with HelixRateLimitTimeout instead of holding the calling thread for the whole reset
+        self.rate_limiter.wait(bucket_key, priority)
         try:
-            return super().request(method, endpoint, params, headers, authorization, json)
+            response = super().request(method, endpoint, params, headers, authorization, json)
         except HTTPError as e:
             if e.response is None:
                 raise e
 
-            if e.response.status_code == 429:
-                # retry once after rate limit resets...
-                rate_limit_reset = datetime.fromtimestamp(int(e.response.headers["Ratelimit-Reset"]), tz=timezone.utc)
-                time_to_wait = rate_limit_reset - utils.now()
-                time.sleep(math.ceil(time_to_wait.total_seconds()))
-                return super().request(method, endpoint, params, headers, authorization, json)
+            if e.response.status_code != 429:
+                self.rate_limiter.update(bucket_key, e.response.headers)
+                raise e
+
+            # retry once, the rate limiter holds the request back until the rate limit resets
+            self.rate_limiter.update(bucket_key, e.response.headers, rate_limited=True)
+            self.rate_limiter.wait(bucket_key, priority)
+            response = super().request(method, endpoint, params, headers, authorization, json)
 
-            raise e
+        self.rate_limiter.update(bucket_key, response.headers)
+        return response
 
     @staticmethod
     def _with_pagination(after_pagination_cursor: Optional[str] = None) -> dict[str, str]:
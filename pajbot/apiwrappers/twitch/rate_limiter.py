@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from typing import Any, Hashable, Mapping, Optional
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from enum import IntEnum
+
+log = logging.getLogger(__name__)
+
+
+class HelixPriority(IntEnum):
+    """Lower values are granted first when requests have to wait for the rate limit"""
+
+    MODERATION = 0
+    CHAT = 1
+    DEFAULT = 2
+    BACKGROUND = 3
+
+
+# How long a synchronous request waits for its point before giving up, in seconds
+WAIT_TIMEOUTS: dict[HelixPriority, float] = {
+    HelixPriority.MODERATION: 10.0,
+    HelixPriority.CHAT: 10.0,
+    HelixPriority.DEFAULT: 30.0,
+    HelixPriority.BACKGROUND: 120.0,
+}
+
+
+class HelixRateLimitTimeout(Exception):
+    """Raised by HelixRateLimiter.wait if no point became available in time"""
+
+
+# Endpoint prefix -> priority, the first matching prefix wins
+ENDPOINT_PRIORITIES: list[tuple[str, HelixPriority]] = [
+    ("/moderation/bans", HelixPriority.MODERATION),
+    ("/moderation/banned", HelixPriority.MODERATION),
+    ("/moderation/chat", HelixPriority.MODERATION),
+    ("/whispers", HelixPriority.CHAT),
+    ("/chat/announcements", HelixPriority.CHAT),
+    ("/chat/settings", HelixPriority.CHAT),
+    ("/chat/chatters", HelixPriority.BACKGROUND),
+    ("/chat/emotes", HelixPriority.BACKGROUND),
+    ("/chat/badges", HelixPriority.BACKGROUND),
+    ("/moderation/moderators", HelixPriority.BACKGROUND),
+    ("/channels/vips", HelixPriority.BACKGROUND),
+    ("/subscriptions", HelixPriority.BACKGROUND),
+    ("/videos", HelixPriority.BACKGROUND),
+]
+
+
+def get_endpoint_priority(endpoint: Any) -> HelixPriority:
+    if isinstance(endpoint, str):
+        for prefix, priority in ENDPOINT_PRIORITIES:
+            if endpoint.startswith(prefix):
+                return priority
+
+    return HelixPriority.DEFAULT
+
+
+class RateLimitBucket:
+    """Client-side copy of the token bucket Twitch keeps for one token.
+    The bucket refills continuously at `limit` points per minute, and is corrected with the Ratelimit-* headers
+    of every response."""
+
+    # Share of the bucket that background requests can not use, so moderation isn't held up by e.g. chatter refreshes
+    BACKGROUND_RESERVE = 0.1
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.tokens = float(limit)
+        self.updated_at = time.monotonic()
+        # No tokens are granted before this (monotonic) time, e.g. after the bucket ran empty on Twitch's side
+        self.blocked_until = 0.0
+        # (priority, sequence number, future)
+        self.waiting: list[tuple[int, int, Future[None]]] = []
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(float(self.limit), self.tokens + (now - self.updated_at) * self.limit / 60.0)
+        self.updated_at = now
+
+    def can_grant(self, priority: int, now: float) -> bool:
+        if now < self.blocked_until:
+            return False
+
+        if priority >= HelixPriority.BACKGROUND:
+            return self.tokens >= 1 + self.limit * self.BACKGROUND_RESERVE
+        return self.tokens >= 1
+
+    def time_until_grant(self, priority: int, now: float) -> float:
+        """Seconds until a request with the given priority can be granted, assuming nothing else consumes tokens"""
+        required = 1.0
+        if priority >= HelixPriority.BACKGROUND:
+            required += self.limit * self.BACKGROUND_RESERVE
+        missing = max(0.0, required - self.tokens)
+        return max(self.blocked_until - now, missing * 60.0 / self.limit)
+
+
+class HelixRateLimiter:
+    """
+    Paces Helix requests ahead of time, instead of only reacting to HTTP 429 responses.
+
+    Every request acquires a point from the bucket of the token it is sent with. If the bucket is empty, the caller
+    gets a future that is resolved once a point is available. Waiting callers are resolved in order of their priority
+    (see HelixPriority), and in order of arrival within the same priority. `wait` is the blocking variant with
+    a timeout, for the synchronous API methods.
+    """
+
+    DEFAULT_LIMIT = 800
+
+    def __init__(self) -> None:
+        self._lock = threading.Condition()
+        self._buckets: dict[Hashable, RateLimitBucket] = {}
+        self._sequence = itertools.count()
+
+        self.num_granted = 0
+        self.num_delayed = 0
+
+        self._thread = threading.Thread(target=self._grant_waiting, name="HelixRateLimiter", daemon=True)
+        self._thread.start()
+
+    def _get_bucket(self, key: Hashable) -> RateLimitBucket:
+        bucket = self._buckets.get(key, None)
+        if bucket is None:
+            bucket = RateLimitBucket(self.DEFAULT_LIMIT)
+            self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, key: Hashable, priority: HelixPriority = HelixPriority.DEFAULT) -> Future[None]:
+        """Returns a future that is resolved once a request with the given bucket key may be sent"""
+        future: Future[None] = Future()
+
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._get_bucket(key)
+            bucket.refill(now)
+
+            if not bucket.waiting and bucket.can_grant(priority, now):
+                bucket.tokens -= 1
+                self.num_granted += 1
+                future.set_result(None)
+                return future
+
+            self.num_delayed += 1
+            heapq.heappush(bucket.waiting, (priority.value, next(self._sequence), future))
+            self._lock.notify()
+
+        return future
+
+    def wait(
+        self, key: Hashable, priority: HelixPriority = HelixPriority.DEFAULT, timeout: Optional[float] = None
+    ) -> None:
+        """Blocks until a request with the given bucket key may be sent, for at most timeout seconds
+        (see WAIT_TIMEOUTS for the default). Raises HelixRateLimitTimeout if that took too long"""
+        if timeout is None:
+            timeout = WAIT_TIMEOUTS[priority]
+
+        future = self.acquire(key, priority)
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                # Granting happens with the lock held, so the future is either granted by now or cancelled for good
+                if future.cancel():
+                    raise HelixRateLimitTimeout(
+                        f"Waited more than {timeout:.0f}s for the Helix rate limit ({priority.name} request)"
+                    ) from None
+
+    def update(self, key: Hashable, headers: Mapping[str, str], rate_limited: bool = False) -> None:
+        """Corrects the bucket with the Ratelimit-Limit, Ratelimit-Remaining and Ratelimit-Reset headers
+        of a response"""
+        try:
+            limit = int(headers["Ratelimit-Limit"])
+            remaining = int(headers["Ratelimit-Remaining"])
+            reset = int(headers["Ratelimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._get_bucket(key)
+            bucket.refill(now)
+
+            bucket.limit = max(1, limit)
+            # Requests still in flight already took their point from our copy, so never add tokens here
+            bucket.tokens = min(bucket.tokens, float(remaining))
+
+            if rate_limited or remaining <= 0:
+                # Ratelimit-Reset is a unix timestamp
+                bucket.tokens = 0.0
+                bucket.blocked_until = now + max(0.0, reset - time.time())
+
+            self._lock.notify()
+
+    def _grant_waiting(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                next_wakeup: Optional[float] = None
+
+                for bucket in self._buckets.values():
+                    if not bucket.waiting:
+                        continue
+
+                    bucket.refill(now)
+                    while bucket.waiting:
+                        priority, _, future = bucket.waiting[0]
+                        if not future.cancelled() and not bucket.can_grant(priority, now):
+                            wait_time = bucket.time_until_grant(priority, now)
+                            if next_wakeup is None or wait_time < next_wakeup:
+                                next_wakeup = wait_time
+                            break
+
+                        heapq.heappop(bucket.waiting)
+                        if future.cancelled():
+                            # The caller gave up waiting, see wait
+                            continue
+
+                        bucket.tokens -= 1
+                        self.num_granted += 1
+                        future.set_result(None)
+
+                self._lock.wait(timeout=next_wakeup)
+
+    def jsonify(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "granted": self.num_granted,
+                "delayed": self.num_delayed,
+                "waiting": sum(
+                    1 for bucket in self._buckets.values() for _, _, future in bucket.waiting if not future.cancelled()
+                ),
+            }
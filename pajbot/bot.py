@@ -30,21 +30,26 @@ from pajbot.managers.emote import EcountManager, EmoteManager, EpmManager
 from pajbot.managers.handler import HandlerManager
 from pajbot.managers.irc import IRCManager
 from pajbot.managers.kvi import KVIManager, parse_kvi_arguments
+from pajbot.managers.outbound import OutboundMessageScheduler, OutboundPriority
+from pajbot.managers.points_ledger import PointsLedger
 from pajbot.managers.redis import RedisManager
 from pajbot.managers.schedule import ScheduleManager
-from pajbot.managers.user_ranks_refresh import UserRanksRefreshManager
+from pajbot.managers.user_rank import UserRankManager
+from pajbot.managers.user_state import UserStateManager
 from pajbot.managers.websocket import WebSocketManager
 from pajbot.migration.db import DatabaseMigratable
 from pajbot.migration.migrate import Migration
 from pajbot.migration.redis import RedisMigratable
 from pajbot.models.action import ActionParser, SubstitutionFilter
 from pajbot.models.banphrase import BanphraseManager
+from pajbot.models.message_features import MessageFeatures
 from pajbot.models.moderation_action import Ban, Timeout, Unban, Untimeout, new_message_processing_scope
 from pajbot.models.module import ModuleManager
-from pajbot.models.sock import SocketManager
+from pajbot.models.sock import SocketClientManager, SocketManager
 from pajbot.models.stream import StreamManager
 from pajbot.models.timer import TimerManager
 from pajbot.models.user import User, UserBasics
+from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
 from pajbot.streamhelper import StreamHelper
 from pajbot.tmi import CHARACTER_LIMIT, TMIRateLimits, WhisperOutputMode
 
@@ -104,6 +109,7 @@ class Bot:
         utils.wait_for_redis_data_loaded(RedisManager.get())
 
         self.tmi_rate_limits = TMIRateLimits.BASE
+        self.outbound = OutboundMessageScheduler(self.tmi_rate_limits)
 
         self.whisper_output_mode = WhisperOutputMode.from_config_value(
             config["main"].get("whisper_output_mode", "normal")
@@ -177,19 +183,52 @@ class Bot:
         # Thread pool executor for async actions
         self.action_queue = ActionQueue()
 
-        # refresh points_rank and num_lines_rank regularly
-
-        self.user_ranks_refresh_manager = UserRanksRefreshManager(config)
+        # points_rank and num_lines_rank are kept up to date as users change, and reconciled with the database
+        # in the background, see UserRankManager for details
+        self.user_rank_manager = UserRankManager(config)
         rank_refresh_mode = config["main"].get("rank_refresh_mode", "0")
         if rank_refresh_mode == "0":
-            self.user_ranks_refresh_manager.start(self.action_queue)
+            self.user_rank_manager.start(self.action_queue)
         elif rank_refresh_mode == "1":
-            self.user_ranks_refresh_manager.run_once(self.action_queue)
+            self.user_rank_manager.start(self.action_queue, once_only=True)
         elif rank_refresh_mode == "2":
-            log.info("Not refreshing user rank")
+            log.info("Not reconciling user ranks, unless they haven't been built yet")
+            self.user_rank_manager.start(self.action_queue, once_only=True, only_if_missing=True)
         else:
             log.error(f"Invalid rank refresh mode {rank_refresh_mode}, valid options are: 0, 1, or 2")
 
+        # In-memory state of the users that are chatting, see UserStateManager for details
+        try:
+            user_cache_size = int(config["main"].get("user_cache_size", "50000"))
+            user_state_flush_interval = int(config["main"].get("user_state_flush_interval", "10"))
+        except ValueError:
+            log.exception("Bad user_cache_size or user_state_flush_interval in your config")
+            user_cache_size = 50000
+            user_state_flush_interval = 10
+        self.user_state_manager = UserStateManager(max_size=user_cache_size, user_rank_manager=self.user_rank_manager)
+        ScheduleManager.execute_every(
+            user_state_flush_interval, lambda: self.action_queue.submit(self.user_state_manager.commit)
+        )
+
+        # Every points change goes through the ledger, which writes them to the database in batches
+        self.points_ledger = PointsLedger(self.user_state_manager, self.user_rank_manager)
+        ScheduleManager.execute_every(
+            PointsLedger.COMMIT_INTERVAL, lambda: self.action_queue.submit(self.points_ledger.commit)
+        )
+
+        # Bans, timeouts and message deletions are sent to Twitch from these workers,
+        # so processing chat messages never has to wait for the Helix API
+        try:
+            moderation_workers = int(config["main"].get("moderation_workers", "4"))
+            moderation_queue_size = int(config["main"].get("moderation_queue_size", "1000"))
+        except ValueError:
+            log.exception("Bad moderation_workers or moderation_queue_size in your config")
+            moderation_workers = 4
+            moderation_queue_size = 1000
+        self.moderation_dispatcher = ModerationDispatcher(
+            num_workers=moderation_workers, max_queue_size=moderation_queue_size
+        )
+
         self.reactor = irc.client.Reactor()
         # SafeDefaultScheduler makes the bot not exit on exception in the main thread
         # e.g. on actions via bot.execute_now, etc.
@@ -200,8 +239,16 @@ class Bot:
         ActionParser.bot = self
 
         HandlerManager.init_handlers()
+        # Make the latency stats of the event handlers available to the web interface
+        ScheduleManager.execute_every(60, HandlerManager.publish_stats)
+        ScheduleManager.execute_every(60, DBManager.monitor.publish_stats)
+        ScheduleManager.execute_every(
+            DBManager.query_stats.PUBLISH_INTERVAL, DBManager.query_stats.publish_stats, args=["bot"]
+        )
 
         self.socket_manager = SocketManager(self.streamer.login, self.execute_now)
+        # Lets the bot tell the web process about changes made from chat, e.g. new banphrases
+        SocketClientManager.init(self.streamer.login)
         self.stream_manager = StreamManager(self)
         StreamHelper.init_stream_manager(self.stream_manager)
 
@@ -251,7 +298,13 @@ class Bot:
         HandlerManager.trigger("on_managers_loaded")
 
         # Commitable managers
-        self.commitable = {"commands": self.commands, "banphrases": self.banphrase_manager}
+        self.commitable = {
+            "commands": self.commands,
+            "banphrases": self.banphrase_manager,
+            "users": self.user_state_manager,
+            "points": self.points_ledger,
+            "emote_counts": self.ecount_manager,
+        }
 
         self.execute_every(60, self.commit_all)
         self.execute_every(1, self.do_tick)
@@ -519,8 +572,9 @@ class Bot:
         return None
 
     def privmsg_arr(self, arr, target=None):
-        for msg in arr:
-            self.privmsg(msg, target)
+        with self.outbound.priority_scope(OutboundPriority.BULK):
+            for msg in arr:
+                self.privmsg(msg, target)
 
     def privmsg_arr_chunked(self, arr, per_chunk=35, chunk_delay=30, target=None):
         i = 0
@@ -656,7 +710,12 @@ class Bot:
         self.ban_id(user.id, reason)
 
     def ban_id(self, user_id: str, reason: Optional[str] = None) -> None:
-        self._ban(user_id, reason)
+        if self._has_moderation_actions():
+            self.thread_locals.moderation_actions.add(user_id, Ban(reason))
+        else:
+            self.moderation_dispatcher.submit(
+                ModerationPriority.BAN, user_id, ("ban", user_id), self._ban, user_id, reason
+            )
 
     def ban_login(self, login: str, reason: Optional[str] = None) -> None:
         user_id = self.twitch_helix_api.get_user_id(login)
@@ -664,10 +723,7 @@ class Bot:
             log.error(f"Attempted to ban user with login {login}, but no such user was found")
             return
 
-        if self._has_moderation_actions():
-            self.thread_locals.moderation_actions.add(login, Ban(reason))
-        else:
-            self.ban_id(user_id, reason)
+        self.ban_id(user_id, reason)
 
     def _unban(self, user_id: str) -> None:
         try:
@@ -685,7 +741,12 @@ class Bot:
         self.unban_id(user.id)
 
     def unban_id(self, user_id: str) -> None:
-        self._unban(user_id)
+        if self._has_moderation_actions():
+            self.thread_locals.moderation_actions.add(user_id, Unban())
+        else:
+            self.moderation_dispatcher.submit(
+                ModerationPriority.UNBAN, user_id, ("unban", user_id), self._unban, user_id
+            )
 
     def unban_login(self, login: str) -> None:
         user_id = self.twitch_helix_api.get_user_id(login)
@@ -693,10 +754,7 @@ class Bot:
             log.error(f"Attempted to unban user with login {login}, but no such user was found")
             return
 
-        if self._has_moderation_actions():
-            self.thread_locals.moderation_actions.add(login, Unban())
-        else:
-            self.unban_id(user_id)
+        self.unban_id(user_id)
 
     def _untimeout(self, user_id: str) -> None:
         try:
@@ -736,7 +794,12 @@ class Bot:
         self.untimeout_id(user.id)
 
     def untimeout_id(self, user_id: str) -> None:
-        self._untimeout(user_id)
+        if self._has_moderation_actions():
+            self.thread_locals.moderation_actions.add(user_id, Untimeout())
+        else:
+            self.moderation_dispatcher.submit(
+                ModerationPriority.UNBAN, user_id, ("untimeout", user_id), self._untimeout, user_id
+            )
 
     def untimeout_login(self, login: str) -> None:
         user_id = self.twitch_helix_api.get_user_id(login)
@@ -744,13 +807,10 @@ class Bot:
             log.error(f"Attempted to untimeout user with login {login}, but no such user was found")
             return
 
-        if self._has_moderation_actions():
-            self.thread_locals.moderation_actions.add(login, Untimeout())
-        else:
-            self.untimeout_id(user_id)
+        self.untimeout_id(user_id)
 
     def timeout(self, user: User, duration: int, reason: Optional[str] = None) -> None:
-        self.timeout_login(user.login, duration, reason)
+        self.timeout_id(user.id, duration, reason)
 
     def _timeout(self, user_id: str, duration: int, reason: Optional[str] = None) -> None:
         try:
@@ -766,15 +826,29 @@ class Bot:
             else:
                 log.error(f"Failed to timeout user with id {user_id}: {e} - {e.response.text}")
 
-    def timeout_login(self, login: str, duration: int, reason: Optional[str] = None) -> None:
+    def timeout_id(self, user_id: str, duration: int, reason: Optional[str] = None) -> None:
         if self._has_moderation_actions():
-            self.thread_locals.moderation_actions.add(login, Timeout(duration, reason))
+            self.thread_locals.moderation_actions.add(user_id, Timeout(duration, reason))
         else:
-            user_id = self.twitch_helix_api.get_user_id(login)
-            if user_id is None:
-                log.error(f"Attempted to ban user with login {login}, but no such user was found")
-                return
-            self._timeout(user_id, duration, reason)
+            self.moderation_dispatcher.submit(
+                ModerationPriority.TIMEOUT,
+                user_id,
+                ("timeout", user_id, duration),
+                self._timeout,
+                user_id,
+                duration,
+                reason,
+                # Once the timeout has expired, the user may need to be timed out again
+                dedup_window=duration,
+            )
+
+    def timeout_login(self, login: str, duration: int, reason: Optional[str] = None) -> None:
+        user_id = self.twitch_helix_api.get_user_id(login)
+        if user_id is None:
+            log.error(f"Attempted to timeout user with login {login}, but no such user was found")
+            return
+
+        self.timeout_id(user_id, duration, reason)
 
     def timeout_warn(self, user: User, duration: int, reason: Optional[str] = None) -> tuple[int, str]:
         from pajbot.modules import WarningModule
@@ -789,6 +863,11 @@ class Bot:
         if channel_id is None:
             channel_id = self.streamer.id
 
+        self.moderation_dispatcher.submit(
+            ModerationPriority.DELETE, None, ("delete", msg_id), self._delete_message, msg_id, channel_id
+        )
+
+    def _delete_message(self, msg_id: str, channel_id: str) -> None:
         try:
             self.twitch_helix_api.delete_single_message(channel_id, self.bot_user.id, self.bot_token_manager, msg_id)
         except HTTPError as e:
@@ -797,7 +876,8 @@ class Bot:
 
             if e.response.status_code == 401:
                 log.error(f"Failed to delete message, unauthorized: {e} - {e.response.text}")
-                self.send_message("Error: The bot must be re-authed in order to delete a message.")
+                with self.outbound.priority_scope(OutboundPriority.MODERATION):
+                    self.send_message("Error: The bot must be re-authed in order to delete a message.")
             elif e.response.status_code == 403:
                 log.error(f"Failed to delete message - bot is not a moderator: {e} - {e.response.text}")
             else:
@@ -825,22 +905,25 @@ class Bot:
             else:
                 self.timeout_warn(user, duration, reason)
 
+    def _send_whisper(self, user_id: str, message: str) -> bool:
+        try:
+            self.twitch_helix_api.send_whisper(self.bot_user.id, user_id, message, self.bot_token_manager)
+        except HTTPError as e:
+            if e.response is None:
+                raise e
+
+            if e.response.status_code == 401:
+                log.error(f"Failed to send whisper, unauthorized: {e} - {e.response.text}")
+            elif e.response.status_code == 403:
+                log.error(f"Failed to send whisper, forbidden. user might not accept whispers: {e} - {e.response.text}")
+            else:
+                log.error(f"Failed to send whisper: {e} - {e.response.text}")
+
+        return True
+
     def whisper(self, user: User | UserBasics, message: str) -> None:
         if self.whisper_output_mode == WhisperOutputMode.NORMAL:
-            try:
-                self.twitch_helix_api.send_whisper(self.bot_user.id, user.id, message, self.bot_token_manager)
-            except HTTPError as e:
-                if e.response is None:
-                    raise e
-
-                if e.response.status_code == 401:
-                    log.error(f"Failed to send whisper, unauthorized: {e} - {e.response.text}")
-                elif e.response.status_code == 403:
-                    log.error(
-                        f"Failed to send whisper, forbidden. user might not accept whispers: {e} - {e.response.text}"
-                    )
-                else:
-                    log.error(f"Failed to send whisper: {e} - {e.response.text}")
+            self.outbound.submit("whisper", (user.id, message), self._send_whisper, user.id, message)
         if self.whisper_output_mode == WhisperOutputMode.CHAT:
             self.privmsg(f"{user}, {message}")
         if self.whisper_output_mode == WhisperOutputMode.CONTROL_HUB:
@@ -991,7 +1074,9 @@ class Bot:
     def connect(self) -> None:
         self.irc.start()
 
-    def parse_message(self, message, source, event, tags={}, whisper=False) -> bool:
+    def parse_message(
+        self, message, source, event, tags={}, whisper=False, features: Optional[MessageFeatures] = None
+    ) -> bool:
         msg_lower = message.lower()
 
         emote_tag = tags["emotes"]
@@ -1030,6 +1115,10 @@ class Bot:
 
         urls = self.find_unique_urls(message)
 
+        if features is None:
+            features = MessageFeatures(message)
+        features.set_emotes_and_urls(emote_instances, urls)
+
         res = HandlerManager.trigger(
             "on_message",
             source=source,
@@ -1040,6 +1129,7 @@ class Bot:
             urls=urls,
             msg_id=msg_id,
             event=event,
+            features=features,
         )
         if res is False:
             return False
@@ -1072,8 +1162,8 @@ class Bot:
         name = tags["display-name"]
 
         with DBManager.create_session_scope(expire_on_commit=False) as db_session:
-            source = User.from_basics(db_session, UserBasics(id, login, name))
-            self.parse_message(event.arguments[0], source, event, tags, whisper=True)
+            with self.user_state_manager.user_scope(db_session, UserBasics(id, login, name)) as source:
+                self.parse_message(event.arguments[0], source, event, tags, whisper=True)
 
     def on_usernotice(self, chatconn, event):
         tags = {tag["key"]: tag["value"] if tag["value"] is not None else "" for tag in event.tags}
@@ -1086,17 +1176,17 @@ class Bot:
         name = tags["display-name"]
 
         with DBManager.create_session_scope(expire_on_commit=False) as db_session:
-            source = User.from_basics(db_session, UserBasics(id, login, name))
-            if event.arguments and len(event.arguments) > 0:
-                msg = event.arguments[0]
-            else:
-                msg = None  # e.g. user didn't type an extra message to share with the streamer
+            with self.user_state_manager.user_scope(db_session, UserBasics(id, login, name)) as source:
+                if event.arguments and len(event.arguments) > 0:
+                    msg = event.arguments[0]
+                else:
+                    msg = None  # e.g. user didn't type an extra message to share with the streamer
 
-            with new_message_processing_scope(self):
-                HandlerManager.trigger("on_usernotice", source=source, message=msg, tags=tags)
+                with new_message_processing_scope(self):
+                    HandlerManager.trigger("on_usernotice", source=source, message=msg, tags=tags)
 
-                if msg is not None:
-                    self.parse_message(msg, source, event, tags)
+                    if msg is not None:
+                        self.parse_message(msg, source, event, tags)
 
     def on_action(self, chatconn, event):
         self.on_pubmsg(chatconn, event)
@@ -1113,7 +1203,7 @@ class Bot:
 
         if self.streamer == "forsen":
             if "zonothene" in login:
-                self._ban(id)
+                self.ban_id(id)
                 return True
 
             raw_m = event.arguments[0].lower()
@@ -1133,22 +1223,25 @@ class Bot:
 
         if self.streamer == "nymn":
             if "hades_k" in login:
-                self.timeout_login(login, 3600, reason="Bad username")
+                self.timeout_id(id, 3600, reason="Bad username")
                 return True
 
             if "hades_b" in login:
-                self.timeout_login(login, 3600, reason="Bad username")
+                self.timeout_id(id, 3600, reason="Bad username")
                 return True
 
         with DBManager.create_session_scope(expire_on_commit=False) as db_session:
-            source = User.from_basics(db_session, UserBasics(id, login, name))
-
-            with new_message_processing_scope(self):
-                res = HandlerManager.trigger("on_pubmsg", source=source, message=event.arguments[0], tags=tags)
-                if res is False:
-                    return False
+            with self.user_state_manager.user_scope(db_session, UserBasics(id, login, name)) as source:
+                with new_message_processing_scope(self):
+                    # Shared by the on_pubmsg and on_message handlers of this message
+                    features = MessageFeatures(event.arguments[0])
+                    res = HandlerManager.trigger(
+                        "on_pubmsg", source=source, message=event.arguments[0], tags=tags, features=features
+                    )
+                    if res is False:
+                        return False
 
-                self.parse_message(event.arguments[0], source, event, tags=tags)
+                    self.parse_message(event.arguments[0], source, event, tags=tags, features=features)
 
     def on_pubnotice(self, chatconn, event):
         tags = {tag["key"]: tag["value"] if tag["value"] is not None else "" for tag in event.tags}
@@ -1250,6 +1343,9 @@ class Bot:
 
         self.socket_manager.quit()
 
+        # Messages are sent from a background thread, make sure the quit phrases make it out
+        self.outbound.flush()
+
         sys.exit(0)
 
     def apply_filter(self, resp, f: SubstitutionFilter) -> Any:
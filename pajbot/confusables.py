@@ -0,0 +1,213 @@
+"""
+Folds look-alike characters (Cyrillic/Greek homoglyphs, fullwidth and "fancy" letters, accented letters) to the
+plain ASCII characters they are meant to look like, strips invisible characters and collapses whitespace.
+
+Used by banphrases with the `normalize_confusables` option, so e.g. "ｆо𝗋ѕеո" is matched by a banphrase for "forsen".
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import unicodedata
+
+# Letters from other scripts that look like a latin letter, but don't decompose to one
+HOMOGLYPHS = {
+    # Cyrillic
+    "А": "A",
+    "В": "B",
+    "Е": "E",
+    "Ѕ": "S",
+    "І": "I",
+    "Ј": "J",
+    "К": "K",
+    "М": "M",
+    "Н": "H",
+    "О": "O",
+    "Р": "P",
+    "С": "C",
+    "Т": "T",
+    "Х": "X",
+    "У": "Y",
+    "Ү": "Y",
+    "Ԁ": "D",
+    "Ԛ": "Q",
+    "Ԝ": "W",
+    "Ӏ": "I",
+    "а": "a",
+    "в": "b",
+    "е": "e",
+    "ѕ": "s",
+    "і": "i",
+    "ј": "j",
+    "к": "k",
+    "м": "m",
+    "н": "h",
+    "о": "o",
+    "п": "n",
+    "р": "p",
+    "с": "c",
+    "т": "t",
+    "у": "y",
+    "ү": "y",
+    "х": "x",
+    "һ": "h",
+    "ԁ": "d",
+    "ԛ": "q",
+    "ԝ": "w",
+    "ӏ": "l",
+    "ɡ": "g",
+    # Greek
+    "Α": "A",
+    "Β": "B",
+    "Ε": "E",
+    "Ζ": "Z",
+    "Η": "H",
+    "Ι": "I",
+    "Κ": "K",
+    "Μ": "M",
+    "Ν": "N",
+    "Ο": "O",
+    "Ρ": "P",
+    "Τ": "T",
+    "Υ": "Y",
+    "Χ": "X",
+    "α": "a",
+    "ι": "i",
+    "κ": "k",
+    "ν": "v",
+    "ο": "o",
+    "ρ": "p",
+    "τ": "t",
+    "υ": "u",
+    "χ": "x",
+    # Armenian
+    "օ": "o",
+    "ո": "n",
+    "ս": "u",
+    "հ": "h",
+    "ց": "g",
+    # Small capitals
+    "ᴀ": "a",
+    "ʙ": "b",
+    "ᴄ": "c",
+    "ᴅ": "d",
+    "ᴇ": "e",
+    "ꜰ": "f",
+    "ɢ": "g",
+    "ʜ": "h",
+    "ɪ": "i",
+    "ᴊ": "j",
+    "ᴋ": "k",
+    "ʟ": "l",
+    "ᴍ": "m",
+    "ɴ": "n",
+    "ᴏ": "o",
+    "ᴘ": "p",
+    "ʀ": "r",
+    "ꜱ": "s",
+    "ᴛ": "t",
+    "ᴜ": "u",
+    "ᴠ": "v",
+    "ᴡ": "w",
+    "ʏ": "y",
+    "ᴢ": "z",
+    # Latin letters without a decomposition
+    "ı": "i",
+    "ł": "l",
+    "Ł": "L",
+    "ø": "o",
+    "Ø": "O",
+    "đ": "d",
+    "Đ": "D",
+    "ß": "ss",
+    "æ": "ae",
+    "Æ": "AE",
+    "œ": "oe",
+    "Œ": "OE",
+}
+
+# Characters that are invisible, or only change how the character before them looks
+INVISIBLE_CHARACTERS = [
+    "\u00ad",  # soft hyphen
+    "\u034f",  # combining grapheme joiner
+    "\u061c",  # arabic letter mark
+    "\u115f",  # hangul choseong filler
+    "\u1160",  # hangul jungseong filler
+    "\u180e",  # mongolian vowel separator
+    "\u200b",  # zero width space
+    "\u200c",  # zero width non-joiner
+    "\u200d",  # zero width joiner
+    "\u200e",  # left-to-right mark
+    "\u200f",  # right-to-left mark
+    "\u2060",  # word joiner
+    "\u2061",  # function application
+    "\u2062",  # invisible times
+    "\u2063",  # invisible separator
+    "\u2064",  # invisible plus
+    "\u3164",  # hangul filler
+    "\ufeff",  # zero width no-break space
+    "\uffa0",  # halfwidth hangul filler
+    *(chr(codepoint) for codepoint in range(0x0300, 0x0370)),  # combining diacritical marks
+    *(chr(codepoint) for codepoint in range(0xFE00, 0xFE10)),  # variation selectors
+    *(chr(codepoint) for codepoint in range(0xE0000, 0xE0080)),  # tags
+]
+
+# Characters that look like a space, but aren't whitespace to str.split
+BLANK_CHARACTERS = [
+    "\u2800",  # braille pattern blank
+]
+
+# Blocks with letters and digits that decompose to plain ASCII (accented latin letters, fullwidth forms,
+# mathematical bold/italic/script letters, circled letters, superscripts, ...)
+DECOMPOSABLE_RANGES = [
+    (0x00A0, 0x0250),  # Latin-1 Supplement, Latin Extended-A and -B
+    (0x1E00, 0x1F00),  # Latin Extended Additional
+    (0x2070, 0x20A0),  # Superscripts and Subscripts
+    (0x2100, 0x2150),  # Letterlike Symbols
+    (0x2460, 0x2500),  # Enclosed Alphanumerics
+    (0xFB00, 0xFB07),  # Latin ligatures
+    (0xFF01, 0xFF5F),  # Fullwidth ASCII
+    (0x1D400, 0x1D800),  # Mathematical Alphanumeric Symbols
+    (0x1F130, 0x1F170),  # Squared Latin Capital Letters
+]
+
+
+def _decompose_to_ascii(character: str) -> str:
+    """Returns the ASCII characters the given character decomposes to (without its accents), or "" if it doesn't"""
+    decomposed = "".join(
+        c for c in unicodedata.normalize("NFKD", character) if not unicodedata.combining(c) and c.isprintable()
+    )
+    if decomposed and decomposed != character and decomposed.isascii():
+        return decomposed
+    return ""
+
+
+def _build_table() -> dict[int, Optional[str]]:
+    table: dict[int, Optional[str]] = {}
+
+    for start, end in DECOMPOSABLE_RANGES:
+        for codepoint in range(start, end):
+            replacement = _decompose_to_ascii(chr(codepoint))
+            if replacement:
+                table[codepoint] = replacement
+
+    for character, replacement in HOMOGLYPHS.items():
+        table[ord(character)] = replacement
+
+    for character in INVISIBLE_CHARACTERS:
+        table[ord(character)] = None
+
+    for character in BLANK_CHARACTERS:
+        table[ord(character)] = " "
+
+    return table
+
+
+CONFUSABLES_TABLE = _build_table()
+
+
+def fold_confusables(text: str) -> str:
+    """Folds look-alike characters to ASCII, removes invisible characters and collapses all whitespace
+    to single spaces"""
+    return " ".join(text.translate(CONFUSABLES_TABLE).split())
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, TypeVar, Union
+
+import codecs
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LinkCrawlerHostBusy(requests.exceptions.RequestException):
+    """Raised instead of making a request when the host has already been sent too many requests recently"""
+
+
+class LinkExtractor(HTMLParser):
+    """Collects the links to other sites (href of <a> tags) from HTML that is fed to it piece by piece"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.links: list[str] = []
+        self._seen_links: set[str] = set()
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if tag != "a":
+            return
+
+        for name, value in attrs:
+            if name != "href" or value is None:
+                continue
+
+            if value.startswith("//"):
+                value = "http:" + value
+            elif not (value.startswith("http://") or value.startswith("https://")):
+                continue
+
+            if value not in self._seen_links:
+                self._seen_links.add(value)
+                self.links.append(value)
+
+
+class LinkCrawler:
+    """
+    Makes the HTTP requests for the link checker.
+
+    All requests share one session, so connections are reused. Crawls run on the crawler's own `max_concurrent`
+    threads, and a URL that is already being crawled is not crawled a second time: everyone asking for it gets the
+    same future.
+
+    To be polite to the sites being checked, requests to the same host are started at least `host_interval` seconds
+    apart. A request that would have to wait more than `max_host_wait` seconds for its turn raises
+    `LinkCrawlerHostBusy` instead.
+    """
+
+    # Hosts we remember the last request time of, before the ones we're done waiting for are forgotten
+    MAX_TRACKED_HOSTS = 1000
+
+    def __init__(
+        self, user_agent: str, max_concurrent: int = 4, host_interval: float = 0.5, max_host_wait: float = 5.0
+    ) -> None:
+        self.host_interval = host_interval
+        self.max_host_wait = max_host_wait
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=max_concurrent * 4, pool_maxsize=max_concurrent)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="LinkCrawler")
+
+        self.lock = threading.Lock()
+        # key -> future of the crawl that's currently running for it
+        self.in_flight: dict[str, Future[Any]] = {}
+        # host -> monotonic time the next request to it may start at
+        self.next_request_at: dict[str, float] = {}
+
+    def crawl(self, key: str, function: Callable[[], T]) -> Future[T]:
+        """Runs function on a crawler thread, unless a crawl with the same key is still running. In that case the
+        future of the running crawl is returned"""
+        with self.lock:
+            future = self.in_flight.get(key, None)
+            if future is not None:
+                return future
+
+            future = self.executor.submit(function)
+            self.in_flight[key] = future
+
+        future.add_done_callback(lambda _: self._on_crawl_done(key, future))
+        return future
+
+    def _on_crawl_done(self, key: str, future: Future[Any]) -> None:
+        with self.lock:
+            if self.in_flight.get(key, None) is future:
+                del self.in_flight[key]
+
+    def wait_for_host(self, url: str) -> None:
+        host = urllib.parse.urlparse(url).netloc.lower()
+        now = time.monotonic()
+
+        with self.lock:
+            request_at = max(now, self.next_request_at.get(host, 0.0))
+            if request_at - now > self.max_host_wait:
+                raise LinkCrawlerHostBusy(f"Too many requests to {host}")
+            self.next_request_at[host] = request_at + self.host_interval
+
+            if len(self.next_request_at) > self.MAX_TRACKED_HOSTS:
+                self.next_request_at = {
+                    host: next_request_at
+                    for host, next_request_at in self.next_request_at.items()
+                    if next_request_at > now
+                }
+
+        if request_at > now:
+            time.sleep(request_at - now)
+
+    def head(self, url: str, timeout: Union[float, tuple[float, float]]) -> requests.Response:
+        self.wait_for_host(url)
+        return self.session.head(url, allow_redirects=True, timeout=timeout)
+
+    def get_links(
+        self, url: str, timeout: Union[float, tuple[float, float]], max_bytes: int, max_time: float
+    ) -> list[str]:
+        """Downloads the HTML page at url and returns the links to other sites in it. The page is parsed while it
+        downloads, and only its first max_bytes bytes, or what arrived within max_time seconds, are looked at"""
+        self.wait_for_host(url)
+
+        extractor = LinkExtractor()
+        with self.session.get(url, stream=True, timeout=timeout) as response:
+            try:
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+            start = time.monotonic()
+            size = 0
+            for chunk in response.iter_content(16 * 1024):
+                chunk = chunk[: max_bytes - size]
+                size += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+
+                if size >= max_bytes:
+                    log.debug(f"Only looked at the first {size} bytes of {url}")
+                    break
+                if time.monotonic() - start > max_time:
+                    log.debug(f"Only looked at the first {size} bytes of {url}, the site took too long to load")
+                    break
+
+        return extractor.links
@@ -51,6 +51,7 @@ class AdminLogManager:
         "Banphrase added": LogEntryTemplate('Added banphrase #{} "{}"'),
         "Banphrase edited": LogEntryTemplate('Edited banphrase #{} from "{}"'),
         "Banphrase removed": LogEntryTemplate('Removed banphrase #{} "{}"'),
+        "Banphrase quarantined": LogEntryTemplate('Disabled banphrase #{} "{}", its regex timed out {} times'),
         "Banphrase toggled": LogEntryTemplate('{} banphrase #{} "{}"'),
         "Blacklist link added": LogEntryTemplate('Added blacklist link "{}"'),
         "Blacklist link removed": LogEntryTemplate('Removed blacklisted link "{}"'),
@@ -5,6 +5,9 @@ from typing import Iterator, Optional
 import logging
 from contextlib import contextmanager
 
+from pajbot.managers.db_monitor import DBPoolMonitor, MonitoredQueuePool
+from pajbot.managers.db_query_stats import DBQueryMonitor, MonitoredCursor
+
 import sqlalchemy
 from psycopg2.extensions import STATUS_IN_TRANSACTION
 from psycopg2.extensions import connection as Psycopg2Connection
@@ -26,14 +29,26 @@ class ServerNoticeLogger:
         log.info(f"PostgreSQL Server notice: {notice.strip()}")
 
 
+db_monitor = DBPoolMonitor()
+db_query_stats = DBQueryMonitor()
+
+
 class DBManager:
     engine: Optional[sqlalchemy.engine.base.Engine] = None
     _sessionmaker: Optional[sessionmaker] = None
     ScopedSession: Optional[scoped_session] = None
+    # Connection pool and scope stats, see DBPoolMonitor
+    monitor = db_monitor
+    # Time spent per query and call site, see DBQueryMonitor
+    query_stats = db_query_stats
 
     @staticmethod
     def init(url: str) -> None:
-        DBManager.engine = create_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20)
+        DBManager.engine = create_engine(
+            url, pool_pre_ping=True, pool_size=10, max_overflow=20, poolclass=MonitoredQueuePool
+        )
+        DBManager.monitor.install(DBManager.engine)
+        DBManager.query_stats.install(DBManager.engine)
 
         # https://docs.sqlalchemy.org/en/13/core/events.html#sqlalchemy.events.PoolEvents.connect
         @event.listens_for(DBManager.engine, "connect")
@@ -98,6 +113,7 @@ class DBManager:
 
     @staticmethod
     @contextmanager
+    @db_monitor.monitored_scope
     def create_session_scope(**options) -> Iterator[Session]:
         session = DBManager.create_session(**options)
         try:
@@ -111,6 +127,7 @@ class DBManager:
 
     @staticmethod
     @contextmanager
+    @db_monitor.monitored_scope
     def create_session_scope_nc(**options):
         session = DBManager.create_session(**options)
         try:
@@ -123,6 +140,7 @@ class DBManager:
 
     @staticmethod
     @contextmanager
+    @db_monitor.monitored_scope
     def create_session_scope_ea(**options):
         session = DBManager.create_session(**options)
         try:
@@ -136,6 +154,7 @@ class DBManager:
 
     @staticmethod
     @contextmanager
+    @db_monitor.monitored_scope
     def create_scoped_session_scope(**options):
         session = DBManager.create_scoped_session(**options)
         try:
@@ -149,6 +168,7 @@ class DBManager:
 
     @staticmethod
     @contextmanager
+    @db_monitor.monitored_scope
     def create_dbapi_connection_scope(autocommit=False) -> Iterator[Psycopg2Connection]:
         if DBManager.engine is None:
             raise ValueError("DBManager not initialized")
@@ -169,6 +189,10 @@ class DBManager:
         if raw_connection is None:
             raise ValueError("unable to get raw db api object")
 
+        # Queries run on the raw connection bypass SQLAlchemy's cursor events, the cursor times them instead
+        previous_cursor_factory = raw_connection.cursor_factory
+        raw_connection.cursor_factory = MonitoredCursor
+
         try:
             if autocommit:
                 # The parameter "pool_pre_ping=True" from create_engine() above makes SQLAlchemy issue a
@@ -197,6 +221,9 @@ class DBManager:
                 # Because the connection is returned to the pool, we want to reset the autocommit state on it
                 raw_connection.autocommit = False
 
+            # SQLAlchemy's own cursors must not be timed twice
+            raw_connection.cursor_factory = previous_cursor_factory
+
             # Finally release connection back to the pool (notice we use .close() on the pool connection,
             # not raw_connection which would close the connection for good)
             pool_connection.close()
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from pajbot.managers.redis import RedisManager
+from pajbot.streamhelper import StreamHelper
+
+import psycopg2
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Frames in these files are skipped when looking for the code that uses the database
+_IGNORED_PATH_PREFIXES = (os.path.dirname(sqlalchemy.__file__), os.path.dirname(psycopg2.__file__))
+_IGNORED_FILES = {
+    contextlib.__file__,
+    __file__,
+    os.path.join(os.path.dirname(__file__), "db.py"),
+    os.path.join(os.path.dirname(__file__), "db_query_stats.py"),
+}
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+@functools.lru_cache(maxsize=1024)
+def _relative_path(filename: str) -> str:
+    if filename.startswith(_REPO_ROOT):
+        return os.path.relpath(filename, _REPO_ROOT)
+    return filename
+
+
+def find_call_site() -> str:
+    """Returns file:line (function) of the innermost frame outside of SQLAlchemy, psycopg2 and the DBManager"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename not in _IGNORED_FILES and not filename.startswith(_IGNORED_PATH_PREFIXES):
+            return f"{_relative_path(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back  # type: ignore[assignment]
+    return "unknown"
+
+
+class CallSiteStats:
+    """How often and how long the code at a call site held a database connection"""
+
+    __slots__ = ("num_checkouts", "total_time", "max_time")
+
+    def __init__(self) -> None:
+        self.num_checkouts = 0
+        # in seconds
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, duration: float) -> None:
+        self.num_checkouts += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+    def jsonify(self) -> dict[str, Any]:
+        return {
+            "checkouts": self.num_checkouts,
+            "avg_ms": self.total_time * 1000.0 / self.num_checkouts if self.num_checkouts > 0 else 0.0,
+            "max_ms": self.max_time * 1000.0,
+        }
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that tells its monitor how long getting a connection from it took"""
+
+    monitor: Optional[DBPoolMonitor] = None
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.monitor is not None:
+                self.monitor.record_wait(time.perf_counter() - start)
+
+
+class DBPoolMonitor:
+    """
+    Collects how the connection pool of the DBManager is used: how long getting a connection took, how many
+    connections are in use and beyond the pool size (overflow), and which code holds connections the longest.
+
+    Scopes (DBManager.create_session_scope and friends) that stay open for longer than SLOW_SCOPE_THRESHOLD seconds
+    are logged as a warning, with the code that opened them.
+    """
+
+    SLOW_SCOPE_THRESHOLD = 5.0
+
+    # How many call sites/checkouts are included in jsonify
+    NUM_TOP_ENTRIES = 5
+
+    def __init__(self) -> None:
+        self.pool: Optional[QueuePool] = None
+
+        self.lock = threading.Lock()
+        # id of the connection record -> (call site, monotonic checkout time, thread name)
+        self.checked_out: dict[int, tuple[str, float, str]] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.num_checkouts = 0
+            # in seconds
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.max_in_use = 0
+            self.max_overflow = 0
+            self.num_slow_scopes = 0
+            self.call_sites: dict[str, CallSiteStats] = {}
+
+    def install(self, engine: Engine) -> None:
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            log.warning(f"Not monitoring the database connection pool, it's a {type(pool).__name__}")
+            return
+
+        self.pool = pool
+        if isinstance(pool, MonitoredQueuePool):
+            pool.monitor = self
+
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def record_wait(self, duration: float) -> None:
+        with self.lock:
+            self.num_checkouts += 1
+            self.total_wait += duration
+            if duration > self.max_wait:
+                self.max_wait = duration
+
+    def _on_checkout(self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        call_site = find_call_site()
+        with self.lock:
+            self.checked_out[id(connection_record)] = (call_site, time.monotonic(), threading.current_thread().name)
+            if self.pool is not None:
+                self.max_in_use = max(self.max_in_use, self.pool.checkedout())
+                self.max_overflow = max(self.max_overflow, self.pool.overflow())
+
+    def _on_checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self.lock:
+            checkout = self.checked_out.pop(id(connection_record), None)
+            if checkout is None:
+                return
+
+            call_site, checked_out_at, _ = checkout
+            stats = self.call_sites.get(call_site, None)
+            if stats is None:
+                stats = CallSiteStats()
+                self.call_sites[call_site] = stats
+            stats.record(time.monotonic() - checked_out_at)
+
+    def record_scope(self, call_site: str, duration: float) -> None:
+        if duration < self.SLOW_SCOPE_THRESHOLD:
+            return
+
+        with self.lock:
+            self.num_slow_scopes += 1
+        log.warning(f"Database scope opened at {call_site} was held for {duration:.1f}s")
+
+    def monitored_scope(self, function: Callable[..., Iterator[T]]) -> Callable[..., Iterator[T]]:
+        """Decorates a generator based context manager function, see record_scope"""
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Iterator[T]:
+            call_site = find_call_site()
+            start = time.monotonic()
+            try:
+                yield from function(*args, **kwargs)
+            finally:
+                self.record_scope(call_site, time.monotonic() - start)
+
+        return wrapper
+
+    def jsonify(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self.lock:
+            longest_held = sorted(self.call_sites.items(), key=lambda item: item[1].max_time, reverse=True)
+            currently_held = sorted(self.checked_out.values(), key=lambda checkout: checkout[1])
+
+            return {
+                "pool_size": self.pool.size() if self.pool is not None else None,
+                "in_use": self.pool.checkedout() if self.pool is not None else None,
+                # QueuePool counts from -pool_size until all of its connections have been opened
+                "overflow": max(0, self.pool.overflow()) if self.pool is not None else None,
+                "max_in_use": self.max_in_use,
+                "max_overflow": self.max_overflow,
+                "checkouts": self.num_checkouts,
+                "avg_wait_ms": self.total_wait * 1000.0 / self.num_checkouts if self.num_checkouts > 0 else 0.0,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "slow_scopes": self.num_slow_scopes,
+                "longest_held": {
+                    call_site: stats.jsonify() for call_site, stats in longest_held[: self.NUM_TOP_ENTRIES]
+                },
+                "currently_held": [
+                    {"call_site": call_site, "thread": thread_name, "held_ms": (now - checked_out_at) * 1000.0}
+                    for call_site, checked_out_at, thread_name in currently_held[: self.NUM_TOP_ENTRIES]
+                ],
+            }
+
+    def publish_stats(self) -> None:
+        """Saves the current pool stats to redis, so they can be viewed from the web interface"""
+        streamer = StreamHelper.get_streamer()
+        RedisManager.get().set(f"{streamer}:db_pool_stats", json.dumps(self.jsonify()))
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import functools
+import json
+import logging
+import re
+import threading
+import time
+
+from pajbot.managers.db_monitor import find_call_site
+from pajbot.managers.redis import RedisManager
+from pajbot.streamhelper import StreamHelper
+
+from psycopg2.extensions import cursor as Psycopg2Cursor
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAMETER_RE = re.compile(r"%\(\w+\)s|%s")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_KEYWORD_LITERAL_RE = re.compile(r"([(,]\s*)(?:NULL|TRUE|FALSE)\b", re.IGNORECASE)
+_ARRAY_RE = re.compile(r"ARRAY\[[^\]]*\]", re.IGNORECASE)
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_GROUP_RE = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Longer statements (e.g. the ones built by execute_values, which contain all of their values) are not cached
+_MAX_CACHED_STATEMENT_LENGTH = 2000
+
+
+def _fingerprint(statement: str) -> str:
+    statement = _STRING_LITERAL_RE.sub("?", statement)
+    statement = _BIND_PARAMETER_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _KEYWORD_LITERAL_RE.sub(r"\1?", statement)
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    statement = _ARRAY_RE.sub("ARRAY[?]", statement)
+    statement = _PLACEHOLDER_LIST_RE.sub("(?, ...)", statement)
+    statement = _REPEATED_GROUP_RE.sub(r"\1, ...", statement)
+    return statement
+
+
+_cached_fingerprint = functools.lru_cache(maxsize=1024)(_fingerprint)
+
+
+def fingerprint(statement: str) -> str:
+    """Returns the statement with all of its parameters and literals replaced by ?, and lists of them (IN lists,
+    VALUES rows) collapsed, so the same query run with different values has the same fingerprint"""
+    if len(statement) <= _MAX_CACHED_STATEMENT_LENGTH:
+        return _cached_fingerprint(statement)
+    return _fingerprint(statement)
+
+
+def get_stats_key(process: str) -> str:
+    return f"{StreamHelper.get_streamer()}:db_query_stats:{process}"
+
+
+def merge_query_stats(published: dict[str, list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """Merges the query stats published by the processes (process name -> entries) into one list of entries,
+    the most expensive (by total time) first"""
+    merged: dict[tuple[str, str], dict[str, Any]] = {}
+    for process, entries in published.items():
+        for entry in entries:
+            key = (entry["fingerprint"], entry["call_site"])
+            existing = merged.get(key, None)
+            if existing is None:
+                merged[key] = {**entry, "processes": [process]}
+                continue
+
+            existing["count"] += entry["count"]
+            existing["total_ms"] += entry["total_ms"]
+            existing["max_ms"] = max(existing["max_ms"], entry["max_ms"])
+            existing["processes"].append(process)
+
+    for entry in merged.values():
+        entry["avg_ms"] = entry["total_ms"] / entry["count"] if entry["count"] > 0 else 0.0
+
+    return sorted(merged.values(), key=lambda entry: entry["total_ms"], reverse=True)
+
+
+class QueryStats:
+    """How often and how long a query ran from a call site"""
+
+    __slots__ = ("num_queries", "total_time", "max_time")
+
+    def __init__(self) -> None:
+        self.num_queries = 0
+        # in seconds
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, duration: float) -> None:
+        self.num_queries += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+
+class MonitoredCursor(Psycopg2Cursor):
+    """psycopg2 cursor that tells its monitor how long its queries took. Used for the connections handed out by
+    DBManager.create_dbapi_connection_scope, whose queries don't go through SQLAlchemy"""
+
+    monitor: Optional[DBQueryMonitor] = None
+
+    def execute(self, query: Any, vars: Any = None) -> None:
+        start = time.perf_counter()
+        try:
+            super().execute(query, vars)
+        finally:
+            if self.monitor is not None:
+                self.monitor.record(self._statement(query), time.perf_counter() - start)
+
+    def executemany(self, query: Any, vars_list: Any) -> None:
+        start = time.perf_counter()
+        try:
+            super().executemany(query, vars_list)
+        finally:
+            if self.monitor is not None:
+                self.monitor.record(self._statement(query), time.perf_counter() - start)
+
+    def _statement(self, query: Any) -> str:
+        if isinstance(query, str):
+            return query
+        if isinstance(query, bytes):
+            return query.decode("utf-8", "replace")
+        # psycopg2.sql.Composable
+        return query.as_string(self)
+
+
+class DBQueryMonitor:
+    """
+    Aggregates the count, total and maximum time of all queries run by this process, per query fingerprint (see
+    `fingerprint`) and call site (the code outside of SQLAlchemy and the DBManager that ran the query).
+
+    The bot and the web process publish their most expensive queries to redis every PUBLISH_INTERVAL seconds,
+    the merged report of both is shown by `!debug queries` and /api/v1/debug/queries.
+    """
+
+    PUBLISH_INTERVAL = 60
+
+    # How many fingerprint/call site pairs are published
+    NUM_TOP_ENTRIES = 20
+
+    # Queries of any new fingerprint/call site pair are counted together once this many pairs have been seen
+    MAX_ENTRIES = 2000
+    OTHER_KEY = ("(other queries)", "(other call sites)")
+
+    # Key in Connection.info of the start times of the queries currently running on the connection
+    START_TIMES_KEY = "pajbot_query_start_times"
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.last_publish = 0.0
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            # (fingerprint, call site) -> stats
+            self.queries: dict[tuple[str, str], QueryStats] = {}
+
+    def install(self, engine: Engine) -> None:
+        MonitoredCursor.monitor = self
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        conn.info.setdefault(self.START_TIMES_KEY, []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        start_times = conn.info.get(self.START_TIMES_KEY, None)
+        if not start_times:
+            return
+
+        self.record(statement, time.perf_counter() - start_times.pop())
+
+    def _handle_error(self, exception_context: Any) -> None:
+        # Failed queries never reach after_cursor_execute
+        conn = exception_context.connection
+        if conn is None or exception_context.statement is None:
+            return
+
+        start_times = conn.info.get(self.START_TIMES_KEY, None)
+        if start_times:
+            self.record(exception_context.statement, time.perf_counter() - start_times.pop())
+
+    def record(self, statement: str, duration: float) -> None:
+        key = (fingerprint(statement), find_call_site())
+        with self.lock:
+            stats = self.queries.get(key, None)
+            if stats is None:
+                if len(self.queries) >= self.MAX_ENTRIES:
+                    key = self.OTHER_KEY
+                stats = self.queries.setdefault(key, QueryStats())
+            stats.record(duration)
+
+    def jsonify(self) -> list[dict[str, Any]]:
+        """The NUM_TOP_ENTRIES most expensive queries (by total time) of this process"""
+        with self.lock:
+            top = sorted(self.queries.items(), key=lambda item: item[1].total_time, reverse=True)[
+                : self.NUM_TOP_ENTRIES
+            ]
+
+            return [
+                {
+                    "fingerprint": query_fingerprint,
+                    "call_site": call_site,
+                    "count": stats.num_queries,
+                    "total_ms": stats.total_time * 1000.0,
+                    "avg_ms": stats.total_time * 1000.0 / stats.num_queries,
+                    "max_ms": stats.max_time * 1000.0,
+                }
+                for (query_fingerprint, call_site), stats in top
+            ]
+
+    def publish_stats(self, process: str) -> None:
+        """Saves the most expensive queries of this process (e.g. bot or web) to redis"""
+        self.last_publish = time.monotonic()
+        # Expires in case the process is gone for good
+        RedisManager.get().set(get_stats_key(process), json.dumps(self.jsonify()), ex=self.PUBLISH_INTERVAL * 10)
+
+    def publish_stats_if_due(self, process: str) -> None:
+        """For processes without a scheduler (the web process), called after every request"""
+        if time.monotonic() - self.last_publish < self.PUBLISH_INTERVAL:
+            return
+
+        try:
+            self.publish_stats(process)
+        except:
+            log.exception("Failed to publish the query stats")
+
+    @staticmethod
+    def get_published_stats(processes: tuple[str, ...] = ("bot", "web")) -> dict[str, list[dict[str, Any]]]:
+        values = RedisManager.get().mget([get_stats_key(process) for process in processes])
+        return {process: json.loads(value) for process, value in zip(processes, values) if value is not None}
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, Protocol
+from typing import TYPE_CHECKING, Callable, Iterable, Optional, Protocol
 
+import collections
+import functools
 import logging
 import random
+import threading
+import time
 
 from pajbot.managers.redis import RedisManager
 from pajbot.managers.schedule import ScheduleManager
@@ -23,6 +27,33 @@ class EmoteAPI(Protocol):
     def get_channel_emotes(self, streamer_name: str, force_fetch: bool = ...) -> list[Emote]: ...
 
 
+class EmoteLookupTable:
+    """Maps words to the emote they represent, with the precedence between the emote sets already applied.
+    Instances are never modified, a new table is built instead."""
+
+    __slots__ = ("table", "min_length", "max_length", "first_characters")
+
+    def __init__(self, emote_sets: Iterable[Iterable[Emote]]) -> None:
+        """emote_sets must be ordered from highest to lowest precedence"""
+        self.table: dict[str, Emote] = {}
+        for emotes in emote_sets:
+            for emote in emotes:
+                if emote.code:
+                    self.table.setdefault(emote.code, emote)
+
+        # Cheap checks to skip words that can not be an emote before hashing them
+        # (an empty table matches no word at all)
+        self.min_length = min((len(code) for code in self.table), default=1)
+        self.max_length = max((len(code) for code in self.table), default=0)
+        self.first_characters = frozenset(code[0] for code in self.table)
+
+    def match(self, word: str) -> Optional[Emote]:
+        if not self.min_length <= len(word) <= self.max_length or word[0] not in self.first_characters:
+            return None
+
+        return self.table.get(word, None)
+
+
 class GenericChannelEmoteManager:
     friendly_name: str
 
@@ -35,8 +66,15 @@ class GenericChannelEmoteManager:
         self.global_lookup_table: dict[str, Emote] = {}
         self.channel_lookup_table: dict[str, Emote] = {}
 
+        # Called whenever the global or channel emotes change
+        self.on_update: Optional[Callable[[], None]] = None
+
         self.api = api
 
+    def _emotes_updated(self) -> None:
+        if self.on_update is not None:
+            self.on_update()
+
     @property
     def global_emotes(self) -> list[Emote]:
         return self._global_emotes
@@ -45,6 +83,7 @@ class GenericChannelEmoteManager:
     def global_emotes(self, value: list[Emote]) -> None:
         self._global_emotes = value
         self.global_lookup_table = {emote.code: emote for emote in value} if value is not None else {}
+        self._emotes_updated()
 
     @property
     def channel_emotes(self) -> list[Emote]:
@@ -54,6 +93,7 @@ class GenericChannelEmoteManager:
     def channel_emotes(self, value: list[Emote]) -> None:
         self._channel_emotes = value
         self.channel_lookup_table = {emote.code: emote for emote in value} if value is not None else {}
+        self._emotes_updated()
 
     def load_global_emotes(self) -> None:
         """Load channel emotes from the cache if available, or else, query the API."""
@@ -193,6 +233,12 @@ class EmoteManager:
         self.bttv_emote_manager = BTTVEmoteManager()
         self.seventv_emote_manager = SevenTVEmoteManager()
 
+        # word -> emote for all FFZ, BTTV and 7TV emotes, rebuilt whenever one of them is updated
+        self.lookup_table = EmoteLookupTable([])
+        self._lookup_table_lock = threading.Lock()
+        for manager in self.third_party_emote_managers:
+            manager.on_update = self.rebuild_lookup_table
+
         # every 1 hour
         # note: whenever emotes are refreshed (cache is saved to redis), the key is additionally set to expire
         # in one hour. This is to prevent emotes from never refreshing if the bot restarts in less than an hour.
@@ -201,6 +247,18 @@ class EmoteManager:
 
         self.load_all_emotes()
 
+    @property
+    def third_party_emote_managers(self) -> list[GenericChannelEmoteManager]:
+        return [self.ffz_emote_manager, self.bttv_emote_manager, self.seventv_emote_manager]
+
+    def rebuild_lookup_table(self) -> None:
+        # Channel emotes take precedence over global emotes, then FFZ over BTTV over 7TV
+        with self._lookup_table_lock:
+            self.lookup_table = EmoteLookupTable(
+                [manager.channel_emotes for manager in self.third_party_emote_managers]
+                + [manager.global_emotes for manager in self.third_party_emote_managers]
+            )
+
     def update_all_emotes(self) -> None:
         self.action_queue.submit(self.bttv_emote_manager.update_all)
         self.action_queue.submit(self.ffz_emote_manager.update_all)
@@ -218,7 +276,10 @@ class EmoteManager:
         return f"https://static-cdn.jtvnw.net/emoticons/v2/{emote_id}/default/dark/{size}"
 
     @staticmethod
+    @functools.lru_cache(maxsize=10000)
     def twitch_emote(emote_id: str, code: str) -> Emote:
+        # Cached, so the same emote used over and over in chat is the same object every time
+        # instead of a new Emote with three new URLs. Emote objects must therefore never be modified.
         return Emote(
             code=code,
             provider="twitch",
@@ -258,31 +319,7 @@ class EmoteManager:
         return emote_instances
 
     def match_word_to_emote(self, word: str) -> Optional[Emote]:
-        emote = self.ffz_emote_manager.match_channel_emote(word)
-        if emote is not None:
-            return emote
-
-        emote = self.bttv_emote_manager.match_channel_emote(word)
-        if emote is not None:
-            return emote
-
-        emote = self.seventv_emote_manager.match_channel_emote(word)
-        if emote is not None:
-            return emote
-
-        emote = self.ffz_emote_manager.match_global_emote(word)
-        if emote is not None:
-            return emote
-
-        emote = self.bttv_emote_manager.match_global_emote(word)
-        if emote is not None:
-            return emote
-
-        emote = self.seventv_emote_manager.match_global_emote(word)
-        if emote is not None:
-            return emote
-
-        return None
+        return self.lookup_table.match(word)
 
     def parse_all_emotes(
         self, message: str, twitch_emotes_tag: str = ""
@@ -295,6 +332,7 @@ class EmoteManager:
         # and then, if word is not a twitch emote, consider ffz channel -> bttv channel ->
         # 7tv channel -> ffz global -> bttv global -> 7tv global in that order.
         third_party_emote_instances = []
+        lookup_table = self.lookup_table
 
         for current_word_index, word in iterate_split_with_index(message.split(" ")):
             # ignore twitch emotes
@@ -302,7 +340,7 @@ class EmoteManager:
             if is_twitch_emote:
                 continue
 
-            emote = self.match_word_to_emote(word)
+            emote = lookup_table.match(word)
             if emote is None:
                 # this word is not an emote
                 continue
@@ -375,50 +413,113 @@ def compute_emote_counts(emote_instances: list[EmoteInstance]) -> dict[str, Emot
     return emote_counts
 
 
+class EpmCounter:
+    """Amount of uses of one emote within the last minute, kept as a ring buffer of one-second buckets"""
+
+    NUM_BUCKETS = 60
+
+    __slots__ = ("buckets", "total", "last_second")
+
+    def __init__(self, now: int) -> None:
+        self.buckets = [0] * self.NUM_BUCKETS
+        self.total = 0
+        self.last_second = now
+
+    def advance(self, now: int) -> None:
+        """Clears the buckets of the seconds that passed since the last call"""
+        elapsed = now - self.last_second
+        if elapsed <= 0:
+            return
+
+        if elapsed >= self.NUM_BUCKETS:
+            self.buckets = [0] * self.NUM_BUCKETS
+            self.total = 0
+        else:
+            for second in range(self.last_second + 1, now + 1):
+                index = second % self.NUM_BUCKETS
+                self.total -= self.buckets[index]
+                self.buckets[index] = 0
+
+        self.last_second = now
+
+    def add(self, now: int, count: int) -> int:
+        self.advance(now)
+        self.buckets[now % self.NUM_BUCKETS] += count
+        self.total += count
+        return self.total
+
+
 class EpmManager:
+    # How often (in seconds) new EPM records are written to redis
+    RECORD_FLUSH_INTERVAL = 5
+
     def __init__(self) -> None:
-        self.epm: dict[str, int] = {}
+        self.epm: dict[str, EpmCounter] = {}
+
+        self._lock = threading.Lock()
+        # emote code -> highest EPM since the last flush
+        self._peaks: dict[str, int] = {}
 
         redis = RedisManager.get()
+        # KEYS[1] = the record key, ARGV = emote code, EPM, emote code, EPM, ...
         self.redis_zadd_if_higher = redis.register_script(
             """
-local c = tonumber(redis.call('zscore', KEYS[1], ARGV[1]));
-if c then
-    if tonumber(KEYS[2]) > c then
-        redis.call('zadd', KEYS[1], KEYS[2], ARGV[1])
-        return tonumber(KEYS[2]) - c
-    else
-        return 0
+for i = 1, #ARGV, 2 do
+    local c = tonumber(redis.call('zscore', KEYS[1], ARGV[i]));
+    if not c or tonumber(ARGV[i + 1]) > c then
+        redis.call('zadd', KEYS[1], ARGV[i + 1], ARGV[i])
     end
-else
-    redis.call('zadd', KEYS[1], KEYS[2], ARGV[1])
-    return 'OK'
 end
 """
         )
 
+        ScheduleManager.execute_every(self.RECORD_FLUSH_INTERVAL, self.save_epm_records)
+
     def handle_emotes(self, emote_counts: EmoteInstanceCountMap) -> None:
         # passed dict maps emote code (e.g. "Kappa") to an EmoteInstanceCount instance
-        for emote_code, obj in emote_counts.items():
-            self.epm_incr(emote_code, obj.count)
+        now = int(time.monotonic())
+        with self._lock:
+            for emote_code, obj in emote_counts.items():
+                self.epm_incr(emote_code, obj.count, now)
+
+    def epm_incr(self, code: str, count: int, now: int) -> None:
+        counter = self.epm.get(code, None)
+        if counter is None:
+            counter = EpmCounter(now)
+            self.epm[code] = counter
 
-    def epm_incr(self, code: str, count: int) -> None:
-        new_epm = self.epm.get(code, 0) + count
-        self.epm[code] = new_epm
-        self.save_epm_record(code, new_epm)
-        ScheduleManager.execute_delayed(60, self.epm_decr, args=[code, count])
+        new_epm = counter.add(now, count)
+        if new_epm > self._peaks.get(code, 0):
+            self._peaks[code] = new_epm
 
-    def epm_decr(self, code: str, count: int) -> None:
-        self.epm[code] -= count
+    def save_epm_records(self) -> None:
+        """Writes the highest EPM of every emote since the last call to the EPM records, if they beat the record"""
+        with self._lock:
+            peaks, self._peaks = self._peaks, {}
+
+        if not peaks:
+            return
+
+        args: list[str | int] = []
+        for code, epm in peaks.items():
+            args.extend((code, epm))
 
-    def save_epm_record(self, code: str, count: int) -> None:
         streamer = StreamHelper.get_streamer()
-        self.redis_zadd_if_higher(keys=[f"{streamer}:emotes:epmrecord", count], args=[code])
+        try:
+            self.redis_zadd_if_higher(keys=[f"{streamer}:emotes:epmrecord"], args=args)
+        except:
+            log.exception(f"Failed to save the EPM records of {len(peaks)} emotes")
 
     def get_emote_epm(self, emote_code: str) -> Optional[int]:
         """Returns the current "emote per minute" usage of the given emote code,
         or None if the emote is unknown to the bot."""
-        return self.epm.get(emote_code, None)
+        with self._lock:
+            counter = self.epm.get(emote_code, None)
+            if counter is None:
+                return None
+
+            counter.advance(int(time.monotonic()))
+            return counter.total
 
     @staticmethod
     def get_emote_epm_record(emote_code) -> Optional[float]:
@@ -428,20 +529,49 @@ end
 
 
 class EcountManager:
-    @staticmethod
-    def handle_emotes(emote_counts: EmoteInstanceCountMap) -> None:
+    # How often (in seconds) the counted emotes are added to the totals in redis
+    FLUSH_INTERVAL = 5
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # emote code -> uses not yet added to redis
+        self._pending: collections.Counter[str] = collections.Counter()
+
+        ScheduleManager.execute_every(self.FLUSH_INTERVAL, self.commit)
+
+    def handle_emotes(self, emote_counts: EmoteInstanceCountMap) -> None:
         # passed dict maps emote code (e.g. "Kappa") to an EmoteInstanceCount instance
-        streamer = StreamHelper.get_streamer()
-        redis_key = f"{streamer}:emotes:count"
-        with RedisManager.pipeline_context() as redis:
+        with self._lock:
             for emote_code, instance_counts in emote_counts.items():
-                redis.zincrby(redis_key, instance_counts.count, emote_code)
+                self._pending[emote_code] += instance_counts.count
 
-    @staticmethod
-    def get_emote_count(emote_code: str) -> Optional[int]:
+    def commit(self) -> None:
+        """Adds the emote uses counted since the last call to the totals in redis, in one pipeline"""
+        with self._lock:
+            pending, self._pending = self._pending, collections.Counter()
+
+        if not pending:
+            return
+
+        streamer = StreamHelper.get_streamer()
+        redis_key = f"{streamer}:emotes:count"
+        try:
+            with RedisManager.pipeline_context() as redis:
+                for emote_code, count in pending.items():
+                    redis.zincrby(redis_key, count, emote_code)
+        except:
+            log.exception(f"Failed to save the counts of {len(pending)} emotes, trying again on the next commit")
+            with self._lock:
+                self._pending.update(pending)
+
+    def get_emote_count(self, emote_code: str) -> Optional[int]:
         redis = RedisManager.get()
         streamer = StreamHelper.get_streamer()
         emote_count = redis.zscore(f"{streamer}:emotes:count", emote_code)
+
+        with self._lock:
+            pending_count = self._pending.get(emote_code, 0)
+
         if emote_count is None:
-            return None
-        return int(emote_count)
+            return pending_count if pending_count > 0 else None
+        return int(emote_count) + pending_count
@@ -1,27 +1,109 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
+import json
 import logging
 import operator
+import time
 
+from pajbot.managers.redis import RedisManager
+from pajbot.streamhelper import StreamHelper
 from pajbot.utils import find
 
 log = logging.getLogger("pajbot")
 
 
+class HandlerStats:
+    """Call count, exception count, propagation stop count and a latency histogram of a single event handler"""
+
+    # Upper bounds (in milliseconds) of the latency histogram buckets.
+    # There is one extra bucket at the end for anything slower than the last bound.
+    BUCKET_BOUNDS_MS = (0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0, 1000.0)
+
+    __slots__ = ("num_calls", "num_exceptions", "num_propagation_stops", "total_time", "max_time", "histogram")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.num_calls = 0
+        self.num_exceptions = 0
+        self.num_propagation_stops = 0
+        # in seconds
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(self.BUCKET_BOUNDS_MS) + 1)
+
+    def record(self, duration: float) -> None:
+        self.num_calls += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+        duration_ms = duration * 1000.0
+        for index, bound in enumerate(self.BUCKET_BOUNDS_MS):
+            if duration_ms <= bound:
+                self.histogram[index] += 1
+                return
+        self.histogram[-1] += 1
+
+    def percentile_ms(self, fraction: float) -> Optional[float]:
+        """Returns the upper bound of the histogram bucket the given percentile falls into,
+        or None if it falls into the last (unbounded) bucket"""
+        if self.num_calls <= 0:
+            return 0.0
+
+        threshold = fraction * self.num_calls
+        seen = 0
+        for index, bound in enumerate(self.BUCKET_BOUNDS_MS):
+            seen += self.histogram[index]
+            if seen >= threshold:
+                return bound
+        return None
+
+    def jsonify(self) -> dict[str, Any]:
+        return {
+            "calls": self.num_calls,
+            "exceptions": self.num_exceptions,
+            "propagation_stops": self.num_propagation_stops,
+            "total_ms": self.total_time * 1000.0,
+            "avg_ms": self.total_time * 1000.0 / self.num_calls if self.num_calls > 0 else 0.0,
+            "max_ms": self.max_time * 1000.0,
+            "p50_ms": self.percentile_ms(0.50),
+            "p99_ms": self.percentile_ms(0.99),
+            "histogram": {
+                **{f"<={bound}": count for bound, count in zip(self.BUCKET_BOUNDS_MS, self.histogram)},
+                f">{self.BUCKET_BOUNDS_MS[-1]}": self.histogram[-1],
+            },
+        }
+
+
+def get_handler_name(handler: Callable[..., Any]) -> str:
+    """e.g. LinkCheckerModule.on_message"""
+    owner = getattr(handler, "__self__", None)
+    if owner is not None:
+        return f"{type(owner).__name__}.{getattr(handler, '__name__', '?')}"
+
+    return getattr(handler, "__qualname__", repr(handler))
+
+
 class HandlerManager:
     """This Dict maps event name -> List of event handlers
-    Event handler is a triple: (Callable event handler, priority, run_if_propagation_stopped)"""
+    Event handler is a tuple: (Callable event handler, priority, run_if_propagation_stopped, stats)"""
+
+    handlers: dict[str, list[tuple[Callable[..., bool], int, bool, HandlerStats]]] = {}
 
-    handlers: dict[str, list[tuple[Callable[..., bool], int, bool]]] = {}
+    # event name -> handler name -> stats
+    # Stats are kept when a handler is removed, so they survive modules being disabled and enabled again
+    stats: dict[str, dict[str, HandlerStats]] = {}
 
     @staticmethod
     def init_handlers() -> None:
         HandlerManager.handlers = {}
 
-        # on_pubmsg(source, message, tags)
+        # on_pubmsg(source, message, tags, features)
         HandlerManager.create_handler("on_pubmsg")
 
-        # on_message(source, message, emote_instances, emote_counts, whisper, urls, msg_id, event)
+        # on_message(source, message, emote_instances, emote_counts, whisper, urls, msg_id, event, features)
         HandlerManager.create_handler("on_message")
 
         # on_usernotice(source, message, tags)
@@ -33,6 +115,9 @@ class HandlerManager:
         # on_commit()
         HandlerManager.create_handler("on_commit")
 
+        # on_chatters_refreshed(chatters)
+        HandlerManager.create_handler("on_chatters_refreshed")
+
         # on_stream_start()
         HandlerManager.create_handler("on_stream_start")
 
@@ -88,11 +173,17 @@ class HandlerManager:
         event: str, method: Callable[..., bool], priority: int = 0, run_if_propagation_stopped: bool = False
     ) -> None:
         try:
-            HandlerManager.handlers[event].append((method, priority, run_if_propagation_stopped))
-            HandlerManager.handlers[event].sort(key=operator.itemgetter(1), reverse=True)
+            handlers = HandlerManager.handlers[event]
         except KeyError:
             # No handlers for this event found
             log.error(f"HandlerManager.add_handler: No handler for {event} found.")
+            return
+
+        event_stats = HandlerManager.stats.setdefault(event, {})
+        stats = event_stats.setdefault(get_handler_name(method), HandlerStats())
+
+        handlers.append((method, priority, run_if_propagation_stopped, stats))
+        handlers.sort(key=operator.itemgetter(1), reverse=True)
 
     @staticmethod
     def remove_handler(event: str, method: Callable[..., bool]) -> None:
@@ -111,18 +202,42 @@ class HandlerManager:
             return False
 
         propagation_stopped = False
-        for handler, _, run_if_propagation_stopped in HandlerManager.handlers[event_name]:
+        for handler, _, run_if_propagation_stopped, stats in HandlerManager.handlers[event_name]:
             if propagation_stopped and not run_if_propagation_stopped:
                 continue
 
             res = None
+            time_start = time.perf_counter()
             try:
                 res = handler(*args, **kwargs)
             except:
+                stats.num_exceptions += 1
                 log.exception(f"Unhandled exception from {handler} in {event_name}")
+            stats.record(time.perf_counter() - time_start)
 
             if res is False and stop_on_false is True:
                 # Abort if handler returns False and stop_on_false is enabled
+                if not propagation_stopped:
+                    stats.num_propagation_stops += 1
                 propagation_stopped = True
 
         return True
+
+    @staticmethod
+    def jsonify_stats() -> dict[str, dict[str, Any]]:
+        return {
+            event: {handler_name: stats.jsonify() for handler_name, stats in list(event_stats.items())}
+            for event, event_stats in list(HandlerManager.stats.items())
+        }
+
+    @staticmethod
+    def publish_stats() -> None:
+        """Saves the current handler stats to redis, so they can be viewed from the web interface"""
+        streamer = StreamHelper.get_streamer()
+        RedisManager.get().set(f"{streamer}:handler_stats", json.dumps(HandlerManager.jsonify_stats()))
+
+    @staticmethod
+    def reset_stats() -> None:
+        for event_stats in HandlerManager.stats.values():
+            for stats in event_stats.values():
+                stats.reset()
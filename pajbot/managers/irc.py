@@ -56,8 +56,6 @@ class IRCManager:
         self.conn: Optional[Connection] = None
         self.ping_task: Optional[ScheduledJob] = None
 
-        self.num_privmsg_sent = 0
-
         self.channels: list[str] = [self.bot.channel]
 
         if self.bot.control_hub_channel is not None:
@@ -105,32 +103,26 @@ class IRCManager:
             self.conn.ping("tmi.twitch.tv")
 
     def privmsg(self, channel: str, message: str) -> None:
+        self.bot.outbound.submit("chat", (channel, message), self._send_privmsg, channel, message)
+
+    def send_raw(self, message: str) -> None:
+        self.bot.outbound.submit("chat", message, self._send_raw, message)
+
+    def _send_privmsg(self, channel: str, message: str) -> bool:
         if self.conn is None:
-            log.error("Not connected or rate limit was reached. Delaying message a few seconds.")
-            self.bot.execute_delayed(2, self.privmsg, channel, message)
-            return
+            log.error("Not connected. Delaying message a few seconds.")
+            return False
 
         self.conn.privmsg(channel, message)
+        return True
 
-        self.num_privmsg_sent += 1
-        self.bot.execute_delayed(31, self._reduce_num_privmsg_sent)
-
-    def send_raw(self, message):
+    def _send_raw(self, message: str) -> bool:
         if self.conn is None:
-            log.error("Not connected or rate limit was reached. Delaying message a few seconds.")
-            self.bot.execute_delayed(2, self.send_raw, message)
-            return
+            log.error("Not connected. Delaying message a few seconds.")
+            return False
 
         self.conn.send_raw(message)
-
-        self.num_privmsg_sent += 1
-        self.bot.execute_delayed(31, self._reduce_num_privmsg_sent)
-
-    def _can_send(self) -> bool:
-        return self.num_privmsg_sent < self.bot.tmi_rate_limits.privmsg_per_30
-
-    def _reduce_num_privmsg_sent(self):
-        self.num_privmsg_sent -= 1
+        return True
 
     def _dispatcher(self, conn, event):
         method = getattr(self.bot, "on_" + event.type, None)
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+import collections
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+
+from pajbot.tmi import TMIRateLimits
+
+log = logging.getLogger(__name__)
+
+
+class OutboundPriority(IntEnum):
+    """Lower values are sent first"""
+
+    MODERATION = 0
+    REPLY = 1
+    BULK = 2
+
+
+class SlidingWindowLimit:
+    """Allows at most `limit` sends within any `window` seconds"""
+
+    def __init__(self, limit: int, window: float) -> None:
+        self.limit = limit
+        self.window = window
+        # monotonic times of the sends within the current window
+        self.sent: collections.deque[float] = collections.deque()
+
+    def time_until_available(self, now: float) -> float:
+        while self.sent and now - self.sent[0] >= self.window:
+            self.sent.popleft()
+
+        if len(self.sent) < self.limit:
+            return 0.0
+
+        return self.sent[0] + self.window - now
+
+    def record(self, now: float) -> None:
+        self.sent.append(now)
+
+
+class OutboundMessage:
+    __slots__ = ("key", "send", "args", "enqueued_at")
+
+    def __init__(self, key: Hashable, send: Callable[..., bool], args: tuple[Any, ...], enqueued_at: float) -> None:
+        self.key = key
+        self.send = send
+        self.args = args
+        self.enqueued_at = enqueued_at
+
+
+class OutboundLane:
+    """Messages that share the same rate limits (e.g. all chat messages), sent in order of priority by one thread"""
+
+    # How long to wait before retrying a message that could not be sent, e.g. because we're not connected
+    RETRY_DELAY = 2.0
+
+    def __init__(self, name: str, limits: list[SlidingWindowLimit], max_backlog: int) -> None:
+        self.name = name
+        self.limits = limits
+        self.max_backlog = max_backlog
+
+        self._lock = threading.Condition()
+        # one queue per priority
+        self._queues: list[collections.deque[OutboundMessage]] = [collections.deque() for _ in OutboundPriority]
+        # key -> amount of queued messages with that key
+        self._queued_keys: collections.Counter[Hashable] = collections.Counter()
+
+        # message that was taken from the queue, but not sent yet
+        self._in_flight: Optional[OutboundMessage] = None
+
+        self.num_sent = 0
+        self.num_coalesced = 0
+        self.num_dropped = 0
+        self.max_wait_time = 0.0
+
+        self._thread = threading.Thread(target=self._send_queued, name=f"OutboundLane-{name}", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues)
+
+    def submit(
+        self, priority: OutboundPriority, key: Hashable, send: Callable[..., bool], args: tuple[Any, ...]
+    ) -> bool:
+        with self._lock:
+            if self._queued_keys[key] > 0:
+                # The exact same message is still waiting to be sent
+                self.num_coalesced += 1
+                return False
+
+            if priority >= OutboundPriority.BULK and len(self) >= self.max_backlog:
+                self.num_dropped += 1
+                log.warning(f"Too many {self.name} messages are waiting to be sent, dropping {args}")
+                return False
+
+            self._queues[priority].append(OutboundMessage(key, send, args, time.monotonic()))
+            self._queued_keys[key] += 1
+            self._lock.notify()
+
+        return True
+
+    def _time_until_available(self, now: float) -> float:
+        return max(limit.time_until_available(now) for limit in self.limits)
+
+    def _pop(self) -> OutboundMessage:
+        """Waits until a message is queued and the rate limits allow sending it"""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                queue = next((queue for queue in self._queues if queue), None)
+                if queue is None:
+                    self._lock.wait()
+                    continue
+
+                wait_time = self._time_until_available(now)
+                if wait_time > 0:
+                    self._lock.wait(timeout=wait_time)
+                    continue
+
+                message = queue.popleft()
+                self._queued_keys[message.key] -= 1
+                if self._queued_keys[message.key] <= 0:
+                    del self._queued_keys[message.key]
+
+                for limit in self.limits:
+                    limit.record(now)
+                self.max_wait_time = max(self.max_wait_time, now - message.enqueued_at)
+                self._in_flight = message
+                return message
+
+    def _send_queued(self) -> None:
+        while True:
+            message = self._pop()
+
+            try:
+                sent = message.send(*message.args)
+            except:
+                log.exception(f"Unhandled exception while sending {self.name} message {message.args}")
+                sent = None
+
+            with self._lock:
+                self._in_flight = None
+                if sent is False:
+                    # Try again later, before anything else
+                    self._queues[0].appendleft(message)
+                    self._queued_keys[message.key] += 1
+                else:
+                    self.num_sent += 1
+                self._lock.notify_all()
+
+            if sent is False:
+                time.sleep(self.RETRY_DELAY)
+
+    def flush(self, timeout: float) -> bool:
+        """Waits until all queued messages have been sent. Returns False if that took longer than `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while len(self) > 0 or self._in_flight is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(timeout=remaining)
+        return True
+
+    def is_congested(self) -> bool:
+        with self._lock:
+            return len(self) > 0 and self._time_until_available(time.monotonic()) > 0
+
+    def jsonify(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": len(self),
+                "sent": self.num_sent,
+                "coalesced": self.num_coalesced,
+                "dropped": self.num_dropped,
+                "max_wait_ms": self.max_wait_time * 1000.0,
+            }
+
+
+class OutboundMessageScheduler:
+    """
+    Sends chat messages and whispers without exceeding the rate limits in TMIRateLimits.
+
+    - Messages are sent in order of priority (see OutboundPriority). Messages sent by code running inside a
+      `priority_scope` get that scope's priority, everything else is sent with REPLY priority.
+    - A message that is identical to a message that is still waiting to be sent is dropped.
+    - BULK messages are dropped when too many messages are waiting. `is_congested` lets modules hold back
+      messages themselves while the rate limit is exhausted.
+    """
+
+    def __init__(self, rate_limits: TMIRateLimits, max_backlog: int = 100) -> None:
+        # The windows are a little longer than Twitch's, so we never race their counter
+        self.lanes = {
+            "chat": OutboundLane("chat", [SlidingWindowLimit(rate_limits.privmsg_per_30, 31)], max_backlog),
+            "whisper": OutboundLane(
+                "whisper",
+                [
+                    SlidingWindowLimit(rate_limits.whispers_per_second, 1.1),
+                    SlidingWindowLimit(rate_limits.whispers_per_minute, 61),
+                ],
+                max_backlog,
+            ),
+        }
+
+        self._thread_locals = threading.local()
+
+    @contextmanager
+    def priority_scope(self, priority: OutboundPriority) -> Iterator[None]:
+        previous_priority = self._current_priority()
+        self._thread_locals.priority = priority
+        try:
+            yield
+        finally:
+            self._thread_locals.priority = previous_priority
+
+    def _current_priority(self) -> OutboundPriority:
+        return getattr(self._thread_locals, "priority", OutboundPriority.REPLY)
+
+    def submit(
+        self,
+        lane: str,
+        key: Hashable,
+        send: Callable[..., bool],
+        *args: Any,
+        priority: Optional[OutboundPriority] = None,
+    ) -> bool:
+        """Queues a call to `send` with the given arguments. `send` can return False to be called again later.
+        Returns False if the message was dropped."""
+        if priority is None:
+            priority = self._current_priority()
+
+        return self.lanes[lane].submit(priority, key, send, args)
+
+    def flush(self, timeout: float = 10.0) -> None:
+        deadline = time.monotonic() + timeout
+        for name, lane in self.lanes.items():
+            if not lane.flush(max(0.0, deadline - time.monotonic())):
+                log.warning(f"Gave up waiting for {len(lane)} {name} messages to be sent")
+
+    def is_congested(self, lane: str = "chat") -> bool:
+        """Returns True if messages in the given lane are currently held back by the rate limit"""
+        return self.lanes[lane].is_congested()
+
+    def jsonify(self) -> dict[str, Any]:
+        return {name: lane.jsonify() for name, lane in self.lanes.items()}
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+import datetime
+import logging
+import threading
+
+from pajbot import utils
+from pajbot.managers.db import DBManager
+from pajbot.models.user import User
+
+from psycopg2.extras import execute_values
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+
+if TYPE_CHECKING:
+    from pajbot.managers.user_rank import UserRankManager
+    from pajbot.managers.user_state import UserStateManager
+
+log = logging.getLogger(__name__)
+
+
+class PointsLedgerEntry:
+    __slots__ = ("user_id", "amount", "reason", "other_user_id", "created_at")
+
+    def __init__(
+        self, user_id: str, amount: int, reason: str, other_user_id: Optional[str], created_at: datetime.datetime
+    ) -> None:
+        self.user_id = user_id
+        self.amount = amount
+        self.reason = reason
+        # The other user involved, e.g. the receiver of !givepoints or the admin that changed the points
+        self.other_user_id = other_user_id
+        self.created_at = created_at
+
+
+class PointsReservation:
+    """
+    Points set aside by `PointsLedger.reserve`. They are taken from the user's balance in the ledger right away,
+    so they can't be spent on anything else, no matter which copy of the user is used, and are either spent for good
+    with `commit` or given back with `release`.
+
+    Can be used as a context manager, which commits the reservation when the block finishes and releases it if the
+    block raises.
+    """
+
+    def __init__(self, ledger: PointsLedger, user: User, amount: int, reason: str, stored: bool) -> None:
+        self.ledger = ledger
+        self.user = user
+        self.amount = amount
+        self.reason = reason
+        # Whether the user's row existed when the points were reserved, otherwise they were taken from its INSERT
+        self.stored = stored
+        self.done = False
+
+    def commit(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.ledger._commit_reservation(self)
+
+    def release(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.ledger._release_reservation(self)
+
+    def __enter__(self) -> PointsReservation:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.release()
+
+
+class PointsLedger:
+    """
+    Applies all points changes done by the bot.
+
+    Changes are written to the database in batches by `commit` as `points = points + amount`, so they can't overwrite
+    changes done at the same time by someone else. Every change is also appended to the points_ledger_entry table in
+    the same transaction.
+
+    While a user has changes that are not confirmed written yet, or reserved points, the ledger keeps the user's
+    balance (points in the database + unwritten changes - reserved points). That balance decides whether the user can
+    afford something, no matter which copy of the User object is passed in, and is applied to every copy of the user
+    that is passed in or loaded from the database.
+    """
+
+    # How often the buffered changes are written to the database, in seconds
+    COMMIT_INTERVAL = 1
+
+    def __init__(
+        self,
+        user_state_manager: Optional[UserStateManager] = None,
+        user_rank_manager: Optional[UserRankManager] = None,
+    ) -> None:
+        # Told about the users whose points changed, see _apply
+        self.user_state_manager = user_state_manager
+        self.user_rank_manager = user_rank_manager
+
+        # Reentrant, reading the points of an expired user loads it, which ends up in _on_load
+        self._lock = threading.RLock()
+        # Held while writing, so only one batch is in flight at a time
+        self._commit_lock = threading.Lock()
+        # user ID -> amount of points not yet sent to the database
+        self._pending: dict[str, int] = {}
+        # user ID -> amount of points being written by the running commit. Until it's done, a user loaded from the
+        # database may or may not have it included already
+        self._in_flight: dict[str, int] = {}
+        # Entries not yet written to the database
+        self._entries: list[PointsLedgerEntry] = []
+        # user ID -> amount of points currently reserved
+        self._reserved: dict[str, int] = {}
+        # user ID -> the user's balance, for all users with pending, in flight or reserved points
+        self._balances: dict[str, int] = {}
+
+        event.listen(User, "load", self._on_load)
+        event.listen(User, "refresh", self._on_refresh)
+
+    @staticmethod
+    def _is_stored(user: User) -> bool:
+        """False if the user's row has not been inserted yet, its points are then written by that INSERT"""
+        state = inspect(user)
+        return state.persistent or state.detached
+
+    def _sync(self, user: User, points: int) -> None:
+        if user.points != points:
+            # The ORM must not write the new value, the ledger writes the changes
+            set_committed_value(user, "points", points)
+
+    def balance(self, user: User) -> int:
+        """The points the user can spend right now"""
+        with self._lock:
+            if user.id is not None and user.id in self._balances:
+                balance = self._balances[user.id]
+                if self._is_stored(user):
+                    self._sync(user, balance)
+                return balance
+
+            return user.points
+
+    def _apply(self, user: User, amount: int) -> None:
+        """Must be called with the lock held"""
+        if self._is_stored(user):
+            balance = self.balance(user) + amount
+            self._balances[user.id] = balance
+            set_committed_value(user, "points", balance)
+            if self.user_state_manager is not None:
+                self.user_state_manager.invalidate([user.id])
+        else:
+            user.points += amount
+
+    def _add_pending(self, user_id: str, amount: int) -> None:
+        """Must be called with the lock held, after the amount has been applied to the user's balance"""
+        self._pending[user_id] = self._pending.get(user_id, 0) + amount
+
+    def _untrack_if_idle(self, user_id: str) -> None:
+        """Must be called with the lock held. Once everything about the user is written, the database is right again"""
+        if user_id not in self._pending and user_id not in self._in_flight and user_id not in self._reserved:
+            self._balances.pop(user_id, None)
+
+    def _add_entry(self, user: User, amount: int, reason: str, other_user: Optional[User]) -> None:
+        self._entries.append(
+            PointsLedgerEntry(user.id, amount, reason, other_user.id if other_user is not None else None, utils.now())
+        )
+
+    def _record(self, user: User, amount: int, reason: str, other_user: Optional[User]) -> None:
+        """Must be called with the lock held, after the amount has been applied to the user"""
+        if self._is_stored(user):
+            self._add_pending(user.id, amount)
+        self._add_entry(user, amount, reason, other_user)
+
+    def add(self, user: User, amount: int, reason: str, other_user: Optional[User] = None) -> None:
+        """Gives the user amount points, or takes them if amount is negative"""
+        if amount == 0:
+            return
+
+        with self._lock:
+            self._apply(user, amount)
+            self._record(user, amount, reason, other_user)
+
+    def set(self, user: User, points: int, reason: str, other_user: Optional[User] = None) -> None:
+        """Sets the user's points to the given amount"""
+        with self._lock:
+            amount = points - self.balance(user)
+            if amount == 0:
+                return
+
+            self._apply(user, amount)
+            self._record(user, amount, reason, other_user)
+
+    def spend(self, user: User, amount: int, reason: str) -> bool:
+        """Takes amount points from the user. Returns False without taking anything if the user can't afford it"""
+        with self._lock:
+            if self.balance(user) < amount:
+                return False
+
+            self._apply(user, -amount)
+            self._record(user, -amount, reason, None)
+
+        return True
+
+    def transfer(self, source: User, target: User, amount: int, reason: str) -> bool:
+        """Moves amount points from source to target. Returns False without moving anything if source can't
+        afford it"""
+        with self._lock:
+            if self.balance(source) < amount:
+                return False
+
+            self._apply(source, -amount)
+            self._apply(target, amount)
+            self._record(source, -amount, reason, target)
+            self._record(target, amount, reason, source)
+
+        return True
+
+    def reserve(self, user: User, amount: int, reason: str) -> Optional[PointsReservation]:
+        """Takes amount points from the user until the returned reservation is committed or released.
+        Returns None if the user can't afford it"""
+        if amount <= 0:
+            return PointsReservation(self, user, 0, reason, False)
+
+        with self._lock:
+            if self.balance(user) < amount:
+                return None
+
+            self._apply(user, -amount)
+            stored = self._is_stored(user)
+            if stored:
+                self._reserved[user.id] = self._reserved.get(user.id, 0) + amount
+
+        return PointsReservation(self, user, amount, reason, stored)
+
+    def _unreserve(self, reservation: PointsReservation) -> None:
+        """Must be called with the lock held"""
+        user_id = reservation.user.id
+        if not reservation.stored or user_id not in self._reserved:
+            return
+
+        self._reserved[user_id] -= reservation.amount
+        if self._reserved[user_id] <= 0:
+            del self._reserved[user_id]
+
+    def _commit_reservation(self, reservation: PointsReservation) -> None:
+        if reservation.amount == 0:
+            return
+
+        with self._lock:
+            self._unreserve(reservation)
+            # The balance already had the points taken by reserve
+            if reservation.stored:
+                self._add_pending(reservation.user.id, -reservation.amount)
+            self._add_entry(reservation.user, -reservation.amount, reservation.reason, None)
+
+    def _release_reservation(self, reservation: PointsReservation) -> None:
+        if reservation.amount == 0:
+            return
+
+        with self._lock:
+            self._apply(reservation.user, reservation.amount)
+            self._unreserve(reservation)
+            if not reservation.stored and self._is_stored(reservation.user):
+                # The user's row has been inserted with the reserved points already taken
+                self._add_pending(reservation.user.id, reservation.amount)
+            self._untrack_if_idle(reservation.user.id)
+
+    def _on_load(self, user: User, context: Any) -> None:
+        with self._lock:
+            balance = self._balances.get(user.id, None)
+            if balance is not None and "points" in inspect(user).dict:
+                # Whatever the database returned, the ledger knows better until its changes are written
+                self._sync(user, balance)
+
+    def _on_refresh(self, user: User, context: Any, attrs: Optional[Any]) -> None:
+        if attrs is None or "points" in attrs:
+            self._on_load(user, context)
+
+    def commit(self) -> None:
+        """Writes the buffered points changes and ledger entries to the database in one transaction"""
+        with self._commit_lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        with self._lock:
+            entries, self._entries = self._entries, []
+            amounts = {user_id: amount for user_id, amount in self._pending.items() if amount != 0}
+            self._pending = {}
+            for user_id, amount in amounts.items():
+                self._in_flight[user_id] = amount
+            for user_id in self._balances.keys() - amounts.keys():
+                self._untrack_if_idle(user_id)
+
+        if not entries and not amounts:
+            return
+
+        try:
+            with DBManager.create_dbapi_cursor_scope() as cursor:
+                new_points = []
+                if amounts:
+                    new_points = execute_values(
+                        cursor,
+                        """
+UPDATE "user" SET points = "user".points + v.amount
+FROM (VALUES %s) AS v(id, amount)
+WHERE "user".id = v.id
+RETURNING "user".id, "user".points""",
+                        list(amounts.items()),
+                        template="(%s, %s::bigint)",
+                        fetch=True,
+                    )
+                execute_values(
+                    cursor,
+                    "INSERT INTO points_ledger_entry(user_id, amount, reason, other_user_id, created_at) VALUES %s",
+                    [
+                        (entry.user_id, entry.amount, entry.reason, entry.other_user_id, entry.created_at)
+                        for entry in entries
+                    ],
+                )
+        except:
+            log.exception(f"Failed to write {len(entries)} points changes, trying again on the next commit")
+            with self._lock:
+                self._entries[:0] = entries
+                for user_id, amount in amounts.items():
+                    del self._in_flight[user_id]
+                    self._add_pending(user_id, amount)
+            return
+
+        changed_user_ids = []
+        with self._lock:
+            for user_id in amounts:
+                del self._in_flight[user_id]
+
+            # The database now has our changes, and possibly changes done by others in the meantime
+            for user_id, points in new_points:
+                balance = points + self._pending.get(user_id, 0) - self._reserved.get(user_id, 0)
+                if user_id in self._balances and self._balances[user_id] != balance:
+                    self._balances[user_id] = balance
+                    changed_user_ids.append(user_id)
+
+            for user_id in amounts:
+                self._untrack_if_idle(user_id)
+
+        if changed_user_ids and self.user_state_manager is not None:
+            self.user_state_manager.invalidate(changed_user_ids)
+
+        log.debug(f"Wrote {len(entries)} points changes of {len(amounts)} users")
+
+        if self.user_rank_manager is not None:
+            self.user_rank_manager.update("points", dict(new_points))
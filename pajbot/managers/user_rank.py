@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional, Union
+
+import logging
+import random
+import threading
+
+import pajbot.config as cfg
+from pajbot.managers.db import DBManager
+from pajbot.managers.redis import RedisManager
+from pajbot.managers.schedule import ScheduleManager
+from pajbot.models.user import User
+from pajbot.streamhelper import StreamHelper
+from pajbot.utils import time_method
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+# Columns users are ranked by, each one has its own sorted set (member = user ID, score = column value)
+RANKED_COLUMNS = ("points", "num_lines")
+
+# Key in Session.info where the ranked values written by a flush are kept until the transaction is over
+SESSION_INFO_CHANGED_KEY = "pajbot_user_rank_changed"
+
+
+def get_rank_key(column: str) -> str:
+    return f"{StreamHelper.get_streamer()}:users:{column}_rank"
+
+
+def get_rank(column: str, value: int) -> Optional[int]:
+    """Returns the rank a user with the given value has in the given column, the same way
+    RANK() OVER (ORDER BY column DESC) would. Returns None if the index hasn't been built yet"""
+    key = get_rank_key(column)
+    try:
+        pipeline = RedisManager.get().pipeline()
+        pipeline.exists(key)
+        pipeline.zcount(key, f"({value}", "+inf")
+        exists, num_higher = pipeline.execute()
+    except:
+        log.exception(f"Failed to get the {column} rank")
+        return None
+
+    if not exists:
+        return None
+
+    return num_higher + 1
+
+
+def rank_scores(scores: Iterable[tuple[str, float]]) -> list[tuple[str, int, int]]:
+    """Turns (user ID, score) pairs sorted by score, highest first, into (user ID, value, rank) tuples.
+    Users with the same score share the same rank, and the rank after them skips ahead like RANK() does"""
+    ranked = []
+    previous_value = None
+    rank = 0
+    for position, (user_id, score) in enumerate(scores, start=1):
+        value = int(score)
+        if value != previous_value:
+            rank = position
+            previous_value = value
+        ranked.append((user_id, value, rank))
+    return ranked
+
+
+def get_top(column: str, count: int) -> Optional[list[tuple[str, int, int]]]:
+    """Returns (user ID, value, rank) of the count highest ranked users in the given column.
+    Returns None if the index hasn't been built yet"""
+    key = get_rank_key(column)
+    try:
+        pipeline = RedisManager.get().pipeline()
+        pipeline.exists(key)
+        pipeline.zrevrange(key, 0, count - 1, withscores=True)
+        exists, scores = pipeline.execute()
+    except:
+        log.exception(f"Failed to get the top {count} users by {column}")
+        return None
+
+    if not exists:
+        return None
+
+    return rank_scores(scores)
+
+
+class UserRankManager:
+    """
+    Ranks the users by points and lines in redis sorted sets, so the rank of any user and the top users can be
+    looked up in O(log n) instead of being read from the user_rank materialized view.
+
+    Every User row written through a SQLAlchemy session in this process updates the index once its transaction is
+    committed. Changes done with raw SQL (chatters refresh, mass points, the batched hot columns of the
+    UserStateManager) are passed to `update` by the code doing them.
+
+    Changes done outside of this process, and anything else the index may have missed, are fixed by `reconcile`,
+    which rebuilds the index from the database in the background.
+    """
+
+    # How many users are read from the database and written to redis at once while reconciling
+    RECONCILE_BATCH_SIZE = 10000
+
+    def __init__(self, config: cfg.Config) -> None:
+        self.jitter = 60
+        try:
+            self.delay = int(config["main"].get("rank_refresh_delay", "60")) * 60
+        except ValueError:
+            log.exception("Bad rank_refresh_delay in your config")
+            self.delay = 60 * 60
+
+        # Held while writing to the index, so no write is lost to a rebuild being swapped in
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+        event.listen(Session, "after_flush", self._on_after_flush)
+        event.listen(Session, "after_commit", self._on_after_commit)
+        event.listen(Session, "after_soft_rollback", self._on_after_soft_rollback)
+
+    def _jitter(self) -> int:
+        return random.randint(0, self.jitter)
+
+    def start(self, action_queue, once_only: bool = False, only_if_missing: bool = False) -> None:
+        # Jitter is added to alleviate CPU spikes when multiple pajbot instances restart at the same time
+        ScheduleManager.execute_delayed(
+            self._jitter(),
+            lambda: action_queue.submit(self._reconcile_and_reschedule, action_queue, once_only, only_if_missing),
+        )
+
+    def _reconcile_and_reschedule(self, action_queue, once_only: bool, only_if_missing: bool) -> None:
+        try:
+            if not only_if_missing or not self.is_built():
+                self.reconcile()
+        except:
+            log.exception("Failed to reconcile the user ranks")
+        finally:
+            if not once_only:
+                ScheduleManager.execute_delayed(
+                    self.delay + self._jitter(),
+                    lambda: action_queue.submit(self._reconcile_and_reschedule, action_queue, False, False),
+                )
+
+    @staticmethod
+    def is_built() -> bool:
+        return RedisManager.get().exists(*(get_rank_key(column) for column in RANKED_COLUMNS)) == len(RANKED_COLUMNS)
+
+    def update(self, column: str, values: dict[str, int]) -> None:
+        """Sets the ranked value of the given users (user ID -> value)"""
+        if not values:
+            return
+
+        key = get_rank_key(column)
+        # member -> score, typed the way redis expects it
+        scores: dict[Union[str, bytes], float] = {user_id: value for user_id, value in values.items()}
+        try:
+            with self._lock:
+                pipeline = RedisManager.get().pipeline()
+                pipeline.zadd(key, scores)
+                if self._rebuilding:
+                    # Newer than what the rebuild read from the database, see reconcile
+                    pipeline.zadd(f"{key}:rebuild", scores)
+                pipeline.execute()
+        except:
+            log.exception(f"Failed to update the {column} rank of {len(values)} users")
+
+    def remove(self, user_ids: list[str]) -> None:
+        if not user_ids:
+            return
+
+        try:
+            with self._lock:
+                pipeline = RedisManager.get().pipeline()
+                for column in RANKED_COLUMNS:
+                    key = get_rank_key(column)
+                    pipeline.zrem(key, *user_ids)
+                    if self._rebuilding:
+                        pipeline.zrem(f"{key}:rebuild", *user_ids)
+                pipeline.execute()
+        except:
+            log.exception(f"Failed to remove {len(user_ids)} users from the user ranks")
+
+    @time_method
+    def reconcile(self) -> None:
+        """Rebuilds the index from the database. The new index is built next to the live one, which keeps being
+        used and updated until the new one replaces it"""
+        redis = RedisManager.get()
+        keys = {column: get_rank_key(column) for column in RANKED_COLUMNS}
+        rebuild_keys = {column: f"{key}:rebuild" for column, key in keys.items()}
+
+        redis.delete(*rebuild_keys.values())
+        with self._lock:
+            self._rebuilding = True
+
+        try:
+            num_users = 0
+            with DBManager.create_dbapi_connection_scope() as sql_conn:
+                # Named cursors are server-side cursors, the users are streamed instead of being loaded all at once
+                with sql_conn.cursor(name="user_rank_reconcile") as cursor:
+                    cursor.itersize = self.RECONCILE_BATCH_SIZE
+                    cursor.execute('SELECT id, points, num_lines FROM "user"')
+                    while True:
+                        rows = cursor.fetchmany(self.RECONCILE_BATCH_SIZE)
+                        if not rows:
+                            break
+
+                        num_users += len(rows)
+                        pipeline = redis.pipeline()
+                        # nx: users updated since the rebuild started already have a newer value than the one we read
+                        pipeline.zadd(rebuild_keys["points"], {user_id: points for user_id, points, _ in rows}, nx=True)
+                        pipeline.zadd(
+                            rebuild_keys["num_lines"], {user_id: num_lines for user_id, _, num_lines in rows}, nx=True
+                        )
+                        pipeline.execute()
+
+            with self._lock:
+                pipeline = redis.pipeline(transaction=True)
+                for column, key in keys.items():
+                    if num_users > 0:
+                        pipeline.rename(rebuild_keys[column], key)
+                    else:
+                        pipeline.delete(key)
+                pipeline.execute()
+                self._rebuilding = False
+
+            log.info(f"Reconciled the ranks of {num_users} users")
+        finally:
+            with self._lock:
+                if self._rebuilding:
+                    self._rebuilding = False
+                    redis.delete(*rebuild_keys.values())
+
+    def _on_after_flush(self, db_session: Session, flush_context: Any) -> None:
+        changed_users: dict[str, Optional[dict[str, int]]] = db_session.info.setdefault(SESSION_INFO_CHANGED_KEY, {})
+
+        for obj in db_session.new:
+            if isinstance(obj, User):
+                state_dict = inspect(obj).dict
+                changed_users[obj.id] = {
+                    column: state_dict[column] for column in RANKED_COLUMNS if state_dict.get(column, None) is not None
+                }
+
+        for obj in db_session.dirty:
+            if isinstance(obj, User):
+                state = inspect(obj)
+                values = changed_users.get(obj.id, None) or {}
+                for column in RANKED_COLUMNS:
+                    if state.attrs[column].history.has_changes():
+                        values[column] = state.dict[column]
+                if values:
+                    changed_users[obj.id] = values
+
+        for obj in db_session.deleted:
+            if isinstance(obj, User):
+                changed_users[obj.id] = None
+
+    def _on_after_commit(self, db_session: Session) -> None:
+        changed_users = db_session.info.pop(SESSION_INFO_CHANGED_KEY, None)
+        if not changed_users:
+            return
+
+        for column in RANKED_COLUMNS:
+            self.update(
+                column,
+                {
+                    user_id: values[column]
+                    for user_id, values in changed_users.items()
+                    if values is not None and column in values
+                },
+            )
+
+        self.remove([user_id for user_id, values in changed_users.items() if values is None])
+
+    def _on_after_soft_rollback(self, db_session: Session, previous_transaction: Any) -> None:
+        db_session.info.pop(SESSION_INFO_CHANGED_KEY, None)
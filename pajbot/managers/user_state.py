@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
+
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pajbot.managers.db import DBManager
+from pajbot.models.user import User, UserBasics
+
+from psycopg2.extras import execute_values
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+if TYPE_CHECKING:
+    from pajbot.managers.user_rank import UserRankManager
+
+log = logging.getLogger(__name__)
+
+# Columns that change on (almost) every chat message. Changes to these are never flushed through the ORM
+# for users served by the UserStateManager, they are collected in memory and written in batches instead.
+HOT_COLUMNS = ("num_lines", "last_seen", "last_active")
+
+# Keys in Session.info where the IDs of users served by the UserStateManager, and the User rows
+# written by a flush are kept until the transaction is over
+SESSION_INFO_SERVED_KEY = "pajbot_user_state_served"
+SESSION_INFO_FLUSHED_KEY = "pajbot_user_state_flushed"
+
+
+class PendingUserState:
+    __slots__ = ("num_lines", "last_seen", "last_active")
+
+    def __init__(self) -> None:
+        # Amount of lines not yet added to the num_lines value stored in the database
+        self.num_lines = 0
+        self.last_seen: Optional[datetime.datetime] = None
+        self.last_active: Optional[datetime.datetime] = None
+
+    def newest(self, key: str, value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+        """Returns whichever is newer out of the given timestamp and the pending one"""
+        pending_value = getattr(self, key)
+        if pending_value is None:
+            return value
+        if value is None or pending_value > value:
+            return pending_value
+        return value
+
+    def merge_timestamp(self, key: str, value: Optional[datetime.datetime]) -> None:
+        setattr(self, key, self.newest(key, value))
+
+
+class UserStateManager:
+    """
+    Resident, size-bounded cache of the users that are chatting.
+
+    Users served through `user_scope` are created from the in-memory copy of their row instead of being SELECTed
+    on every message. Changes to the hot columns (see HOT_COLUMNS) are kept in memory and written to the database
+    in batches by `commit`, all other changes (points, level, flags, ...) are flushed by the message's session
+    like before.
+
+    Every User row written by any SQLAlchemy session in this process updates the cached copy once its transaction
+    is committed, and evicts it if the transaction is rolled back. Cached copies expire after `ttl` seconds, which
+    bounds how long changes done outside of this process (e.g. from the web interface) can go unnoticed.
+    """
+
+    def __init__(
+        self, max_size: int = 50000, ttl: float = 10 * 60, user_rank_manager: Optional[UserRankManager] = None
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        # Told about the new num_lines of the users written by commit
+        self.user_rank_manager = user_rank_manager
+
+        self._lock = threading.Lock()
+        # Held while writing, so only one batch is in flight at a time
+        self._commit_lock = threading.Lock()
+        # user ID -> (time the entry was stored, column values)
+        self._users: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        # user ID -> changes to the hot columns that have not been written to the database yet
+        self._pending: dict[str, PendingUserState] = {}
+        # user ID -> changes being written by the running commit. Until it's done, a user loaded from the database
+        # may or may not have them included already
+        self._in_flight: dict[str, PendingUserState] = {}
+
+        self.num_hits = 0
+        self.num_misses = 0
+
+        self._column_keys = [column_attr.key for column_attr in inspect(User).column_attrs]
+
+        event.listen(Session, "after_flush", self._on_after_flush)
+        event.listen(Session, "after_commit", self._on_after_commit)
+        event.listen(Session, "after_soft_rollback", self._on_after_soft_rollback)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @contextmanager
+    def user_scope(self, db_session: Session, basics: UserBasics) -> Iterator[User]:
+        """Returns the User for the given basics, attached to the given session.
+        Changes to the hot columns done inside of this scope are moved to the write-behind buffer on exit,
+        so they don't make the session issue an UPDATE."""
+        user = self._load(db_session, basics)
+        try:
+            yield user
+        finally:
+            self._defer_hot_columns(db_session, user)
+
+    def _load(self, db_session: Session, basics: UserBasics) -> User:
+        db_session.info.setdefault(SESSION_INFO_SERVED_KEY, set()).add(basics.id)
+
+        values = self._get_values(basics.id)
+        if values is None:
+            self.num_misses += 1
+            user = User.from_basics(db_session, basics)
+            if inspect(user).persistent:
+                # The row from the database does not contain the unwritten hot column changes yet
+                with self._lock:
+                    for pending in self._unwritten(user.id):
+                        set_committed_value(user, "num_lines", user.num_lines + pending.num_lines)
+                        for key in ("last_seen", "last_active"):
+                            set_committed_value(user, key, pending.newest(key, getattr(user, key)))
+            return user
+
+        self.num_hits += 1
+
+        user = User()
+        for key, value in values.items():
+            setattr(user, key, value)
+
+        # Makes SQLAlchemy consider the user as loaded from the database, without querying it
+        make_transient_to_detached(user)
+        db_session.add(user)
+
+        # Same as User.from_basics, but only touch the attributes if they actually changed
+        if user._login != basics.login:
+            user._login = basics.login
+        if user.name != basics.name:
+            user.name = basics.name
+
+        return user
+
+    def _unwritten(self, user_id: str) -> list[PendingUserState]:
+        """Must be called with the lock held. The user's hot column changes that are being written or not written yet"""
+        return [
+            pending
+            for pending in (self._in_flight.get(user_id, None), self._pending.get(user_id, None))
+            if pending is not None
+        ]
+
+    def _get_values(self, user_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._users.get(user_id, None)
+            if entry is None:
+                return None
+
+            stored_at, values = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._users[user_id]
+                return None
+
+            self._users.move_to_end(user_id)
+            return values
+
+    def _store(self, user_id: str, values: dict[str, Any]) -> None:
+        with self._lock:
+            self._users[user_id] = (time.monotonic(), values)
+            self._users.move_to_end(user_id)
+
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def _snapshot(self, user: User) -> Optional[dict[str, Any]]:
+        """Returns the column values of the given user without triggering any loads,
+        or None if not all columns are loaded"""
+        state_dict = inspect(user).dict
+        try:
+            return {key: state_dict[key] for key in self._column_keys}
+        except KeyError:
+            return None
+
+    def _defer_hot_columns(self, db_session: Session, user: User) -> None:
+        state = inspect(user)
+        if state.transient or state.pending:
+            # User was just created, the hot columns are written as part of its INSERT
+            return
+
+        with self._lock:
+            for key in HOT_COLUMNS:
+                history = state.attrs[key].history
+                if not history.added:
+                    continue
+
+                new_value = history.added[0]
+                old_value = history.deleted[0] if history.deleted else None
+
+                pending = self._pending.get(user.id, None)
+                if pending is None:
+                    pending = PendingUserState()
+                    self._pending[user.id] = pending
+
+                if key == "num_lines":
+                    pending.num_lines += new_value - (old_value or 0)
+                else:
+                    pending.merge_timestamp(key, new_value)
+
+                # The new value becomes the "loaded" value, so the ORM will not write it
+                set_committed_value(user, key, new_value)
+
+        if db_session.is_modified(user):
+            # The after_commit event will store the user once the transaction with the other changes is done
+            return
+
+        values = self._snapshot(user)
+        if values is not None:
+            self._store(user.id, values)
+
+        # Attributes that were set to their current value (e.g. the moderator/subscriber flags on every message)
+        # would otherwise make the session check out a connection on commit just to find nothing to update
+        if not db_session.new and not db_session.deleted and all(obj is user for obj in db_session.dirty):
+            db_session.expunge(user)
+
+    def invalidate(self, user_ids: Iterable[str]) -> None:
+        """Removes the given users from the cache, e.g. after they have been updated through raw SQL"""
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+    def _on_after_flush(self, db_session: Session, flush_context: Any) -> None:
+        flushed_users: dict[str, Optional[dict[str, Any]]] = db_session.info.setdefault(SESSION_INFO_FLUSHED_KEY, {})
+
+        for obj in db_session.new:
+            if isinstance(obj, User):
+                flushed_users[obj.id] = self._snapshot(obj)
+
+        for obj in db_session.dirty:
+            if isinstance(obj, User):
+                flushed_users[obj.id] = self._snapshot(obj)
+
+        for obj in db_session.deleted:
+            if isinstance(obj, User):
+                flushed_users[obj.id] = None
+
+    def _on_after_commit(self, db_session: Session) -> None:
+        served_user_ids = db_session.info.pop(SESSION_INFO_SERVED_KEY, set())
+        flushed_users = db_session.info.pop(SESSION_INFO_FLUSHED_KEY, None)
+        if not flushed_users:
+            return
+
+        for user_id, values in flushed_users.items():
+            if values is None:
+                self.invalidate([user_id])
+                continue
+
+            if user_id not in served_user_ids:
+                # Users loaded by any other session don't contain the unwritten hot column changes, add them back
+                with self._lock:
+                    for pending in self._unwritten(user_id):
+                        values["num_lines"] += pending.num_lines
+                        for key in ("last_seen", "last_active"):
+                            values[key] = pending.newest(key, values[key])
+
+            self._store(user_id, values)
+
+    def _on_after_soft_rollback(self, db_session: Session, previous_transaction: Any) -> None:
+        db_session.info.pop(SESSION_INFO_SERVED_KEY, None)
+        flushed_users = db_session.info.pop(SESSION_INFO_FLUSHED_KEY, None)
+        if not flushed_users:
+            return
+
+        self.invalidate(flushed_users.keys())
+
+    def commit(self) -> None:
+        """Writes the buffered hot column changes to the database in one batch"""
+        with self._commit_lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._in_flight = pending
+
+        if not pending:
+            return
+
+        rows = [(user_id, state.num_lines, state.last_seen, state.last_active) for user_id, state in pending.items()]
+
+        try:
+            with DBManager.create_dbapi_cursor_scope() as cursor:
+                num_lines = execute_values(
+                    cursor,
+                    """
+UPDATE "user" SET
+    num_lines = "user".num_lines + v.num_lines,
+    last_seen = GREATEST("user".last_seen, v.last_seen),
+    last_active = GREATEST("user".last_active, v.last_active)
+FROM (VALUES %s) AS v(id, num_lines, last_seen, last_active)
+WHERE "user".id = v.id
+RETURNING "user".id, "user".num_lines""",
+                    rows,
+                    template="(%s, %s, %s::timestamptz, %s::timestamptz)",
+                    fetch=True,
+                )
+        except:
+            log.exception(f"Failed to write the state of {len(rows)} users, trying again on the next commit")
+            with self._lock:
+                self._in_flight = {}
+                for user_id, state in pending.items():
+                    current_state = self._pending.get(user_id, None)
+                    if current_state is None:
+                        self._pending[user_id] = state
+                        continue
+
+                    current_state.num_lines += state.num_lines
+                    current_state.merge_timestamp("last_seen", state.last_seen)
+                    current_state.merge_timestamp("last_active", state.last_active)
+            return
+
+        with self._lock:
+            self._in_flight = {}
+        # Users loaded while the batch was being written may have it included twice
+        self.invalidate(pending.keys())
+
+        log.debug(f"Wrote the state of {len(rows)} users")
+
+        if self.user_rank_manager is not None:
+            self.user_rank_manager.update("num_lines", dict(num_lines))
@@ -0,0 +1,3 @@
+def up(cursor, bot):
+    # Banphrases can opt in to being matched against messages with look-alike characters folded to ASCII
+    cursor.execute("ALTER TABLE banphrase ADD COLUMN normalize_confusables BOOLEAN NOT NULL DEFAULT FALSE")
@@ -0,0 +1,3 @@
+def up(cursor, bot):
+    # User ranks are kept in redis now (see UserRankManager), nothing refreshes the materialized view anymore
+    cursor.execute("DROP MATERIALIZED VIEW IF EXISTS user_rank")
@@ -0,0 +1,15 @@
+def up(cursor, bot):
+    # Append-only record of every points change done through the PointsLedger
+    cursor.execute(
+        """
+    CREATE TABLE points_ledger_entry (
+        id BIGSERIAL PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        amount BIGINT NOT NULL,
+        reason TEXT NOT NULL,
+        other_user_id TEXT NULL,
+        created_at TIMESTAMPTZ NOT NULL
+    )
+    """
+    )
+    cursor.execute("CREATE INDEX ON points_ledger_entry(user_id, created_at)")
@@ -15,19 +15,28 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Literal, Optional, Union
 
 import argparse
+import collections
 import logging
+import threading
 
+from pajbot.confusables import fold_confusables
+from pajbot.managers.adminlog import AdminLogManager
 from pajbot.managers.db import Base, DBManager
+from pajbot.managers.redis import RedisManager
+from pajbot.managers.schedule import ScheduleManager
+from pajbot.models.banphrase_matcher import BanphraseMatcher, normalize_message
+from pajbot.models.sock import SocketClientManager
 from pajbot.models.user import User
+from pajbot.streamhelper import StreamHelper
 from pajbot.utils import find
 
 import regex as re
 from sqlalchemy import Boolean, ForeignKey, Integer, Text, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from unidecode import unidecode
 
 if TYPE_CHECKING:
     from pajbot.bot import Bot
+    from pajbot.models.sock import SocketManager
 
 log = logging.getLogger("pajbot")
 
@@ -43,6 +52,7 @@ class Banphrase(Base):
     warning: Mapped[bool] = mapped_column(Boolean, default=True)
     case_sensitive: Mapped[bool]
     remove_accents: Mapped[bool]
+    normalize_confusables: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
     enabled: Mapped[bool] = mapped_column(Boolean, default=True)
     sub_immunity: Mapped[bool]
     operator: Mapped[str] = mapped_column(Text, default="contains", server_default="contains")
@@ -61,6 +71,7 @@ class Banphrase(Base):
         self.sub_immunity = False
         self.operator = "contains"
         self.remove_accents = False
+        self.normalize_confusables = False
         self.compiled_regex = None
         self.predicate = None
 
@@ -77,22 +88,24 @@ class Banphrase(Base):
         self.enabled = options.get("enabled", self.enabled)
         self.operator = options.get("operator", self.operator)
         self.remove_accents = options.get("remove_accents", self.remove_accents)
+        self.normalize_confusables = options.get("normalize_confusables", self.normalize_confusables)
         self.compiled_regex = None
 
         self.refresh_operator()
 
     def format_message(self, message):
-        if self.case_sensitive is False:
-            message = message.lower()
-        if self.remove_accents:
-            message = unidecode(message).strip()
-
-        return message
+        return normalize_message(
+            message, self.case_sensitive is not False, bool(self.remove_accents), bool(self.normalize_confusables)
+        )
 
     def get_phrase(self):
+        phrase = self.phrase
+        if self.normalize_confusables and self.operator != "regex":
+            # The phrase has to look like a message that went through the same normalization
+            phrase = fold_confusables(phrase)
         if self.case_sensitive is False:
-            return self.phrase.lower()
-        return self.phrase
+            return phrase.lower()
+        return phrase
 
     def refresh_operator(self):
         self.predicate = getattr(self, f"predicate_{self.operator}", None)
@@ -170,6 +183,7 @@ class Banphrase(Base):
             "case_sensitive": self.case_sensitive,
             "sub_immunity": self.sub_immunity,
             "remove_accents": self.remove_accents,
+            "normalize_confusables": self.normalize_confusables,
         }
 
 
@@ -227,16 +241,45 @@ class BanphraseData(Base):
         self.edited_by = options.get("edited_by", self.edited_by)
 
 
+class BanphraseRegexCost:
+    """Time spent searching messages with one regex banphrase, since it was last published to redis"""
+
+    __slots__ = ("num_searches", "total_time", "num_timeouts")
+
+    def __init__(self) -> None:
+        self.num_searches = 0
+        self.total_time = 0.0
+        self.num_timeouts = 0
+
+
 class BanphraseManager:
-    def __init__(self, bot: Optional[Bot]) -> None:
+    # Longest a regex banphrase may search one message for, in seconds. Longer searches are aborted and don't match
+    REGEX_TIMEOUT = 0.05
+    # Regex banphrases that time out this often are disabled, so a catastrophically backtracking pattern can't
+    # keep stalling the bot
+    MAX_REGEX_TIMEOUTS = 3
+
+    def __init__(self, bot: Optional[Bot], socket_manager: Optional[SocketManager] = None) -> None:
         self.bot = bot
         self.banphrases: list[Banphrase] = []
         self.enabled_banphrases: list[Banphrase] = []
+        # Built from enabled_banphrases the first time a message is checked after they changed
+        self._matcher: Optional[BanphraseMatcher] = None
         self.db_session = DBManager.create_session(expire_on_commit=False)
 
+        # The bot keeps track of the cost of every regex banphrase and disables the ones that keep timing out
+        self._regex_costs_lock = threading.Lock()
+        self._regex_costs: dict[int, BanphraseRegexCost] = {}
+        self._regex_timeouts: collections.Counter[int] = collections.Counter()
         if self.bot:
-            self.bot.socket_manager.add_handler("banphrase.update", self.on_banphrase_update)
-            self.bot.socket_manager.add_handler("banphrase.remove", self.on_banphrase_remove)
+            ScheduleManager.execute_every(30, self.publish_regex_costs)
+
+        if socket_manager is None and self.bot:
+            socket_manager = self.bot.socket_manager
+
+        if socket_manager:
+            socket_manager.add_handler("banphrase.update", self.on_banphrase_update)
+            socket_manager.add_handler("banphrase.remove", self.on_banphrase_remove)
 
     def on_banphrase_update(self, data) -> None:
         try:
@@ -268,6 +311,8 @@ class BanphraseManager:
             if banphrase.enabled is False:
                 self.enabled_banphrases.remove(banphrase)
 
+        self.invalidate_matcher()
+
     def on_banphrase_remove(self, data) -> None:
         try:
             banphrase_id = int(data["id"])
@@ -286,11 +331,15 @@ class BanphraseManager:
             if removed_banphrase in self.banphrases:
                 self.banphrases.remove(removed_banphrase)
 
+            self.invalidate_matcher()
+            self.forget_regex_cost(banphrase_id)
+
     def load(self) -> BanphraseManager:
         self.banphrases = self.db_session.query(Banphrase).all()
         for banphrase in self.banphrases:
             self.db_session.expunge(banphrase)
         self.enabled_banphrases = [banphrase for banphrase in self.banphrases if banphrase.enabled is True]
+        self.invalidate_matcher()
         return self
 
     def commit(self) -> None:
@@ -311,6 +360,7 @@ class BanphraseManager:
 
         self.banphrases.append(banphrase)
         self.enabled_banphrases.append(banphrase)
+        self.invalidate_matcher()
 
         return banphrase, True
 
@@ -318,11 +368,13 @@ class BanphraseManager:
         self.banphrases.remove(banphrase)
         if banphrase in self.enabled_banphrases:
             self.enabled_banphrases.remove(banphrase)
+        self.invalidate_matcher()
 
         self.db_session.expunge(banphrase.data)
         self.db_session.delete(banphrase)
         self.db_session.delete(banphrase.data)
         self.commit()
+        self.forget_regex_cost(banphrase.id)
 
     def punish(self, user, banphrase) -> None:
         """
@@ -353,19 +405,138 @@ class BanphraseManager:
             # Finally, time out the user for whatever timeout length was required.
             self.bot.timeout(user, timeout_length, reason=reason)
 
-    def check_message(self, message: str, user: Optional[User]) -> Union[Banphrase, Literal[False]]:
-        matched_banphrase = None
-        for banphrase in self.enabled_banphrases:
-            if banphrase.match(message, user):
-                if not matched_banphrase:
-                    matched_banphrase = banphrase
-                    continue
+    def invalidate_matcher(self) -> None:
+        """Must be called whenever enabled_banphrases, or a banphrase in it, has been changed"""
+        self._matcher = None
+
+    def get_matcher(self) -> BanphraseMatcher:
+        matcher = self._matcher
+        if matcher is None:
+            matcher = BanphraseMatcher(
+                self.enabled_banphrases,
+                regex_timeout=self.REGEX_TIMEOUT,
+                on_regex_search=self.on_regex_search if self.bot else None,
+            )
+            self._matcher = matcher
+        return matcher
+
+    def on_regex_search(self, banphrase: Banphrase, duration: float, timed_out: bool) -> None:
+        with self._regex_costs_lock:
+            cost = self._regex_costs.get(banphrase.id, None)
+            if cost is None:
+                cost = BanphraseRegexCost()
+                self._regex_costs[banphrase.id] = cost
+
+            cost.num_searches += 1
+            cost.total_time += duration
+            if not timed_out:
+                return
+
+            cost.num_timeouts += 1
+            self._regex_timeouts[banphrase.id] += 1
+            if self._regex_timeouts[banphrase.id] != self.MAX_REGEX_TIMEOUTS:
+                return
+
+        assert self.bot is not None
+        # Not while the matcher is still busy with this message
+        self.bot.execute_now(self.quarantine_banphrase, banphrase)
+
+    def quarantine_banphrase(self, banphrase: Banphrase) -> None:
+        """Disables a regex banphrase that took longer than REGEX_TIMEOUT too often"""
+        assert self.bot is not None
+
+        if banphrase not in self.enabled_banphrases:
+            return
+
+        log.warning(
+            f"Disabling banphrase {banphrase.id}, its regex timed out {self.MAX_REGEX_TIMEOUTS} times: {banphrase.phrase}"
+        )
+
+        banphrase.enabled = False
+        self.enabled_banphrases.remove(banphrase)
+        self.invalidate_matcher()
+
+        with DBManager.create_session_scope() as db_session:
+            db_session.query(Banphrase).filter_by(id=banphrase.id).update({"enabled": False})
+            bot_user = User.from_basics(db_session, self.bot.bot_user)
+            AdminLogManager.post(
+                "Banphrase quarantined", bot_user, banphrase.id, banphrase.phrase, self.MAX_REGEX_TIMEOUTS
+            )
+
+        SocketClientManager.send("banphrase.update", {"id": banphrase.id})
+
+    @staticmethod
+    def _regex_cost_keys() -> tuple[str, str, str]:
+        streamer = StreamHelper.get_streamer()
+        return (
+            f"{streamer}:banphrase_regex_searches",
+            f"{streamer}:banphrase_regex_time_ms",
+            f"{streamer}:banphrase_regex_timeouts",
+        )
+
+    def publish_regex_costs(self) -> None:
+        """Adds the regex costs collected since the last call to the totals in redis, for the admin banphrase list"""
+        with self._regex_costs_lock:
+            regex_costs = self._regex_costs
+            self._regex_costs = {}
+
+        if not regex_costs:
+            return
 
-                if banphrase.greater_than(matched_banphrase):
-                    matched_banphrase = banphrase
-                    continue
+        searches_key, time_key, timeouts_key = self._regex_cost_keys()
+        try:
+            pipeline = RedisManager.get().pipeline()
+            for banphrase_id, cost in regex_costs.items():
+                pipeline.hincrby(searches_key, str(banphrase_id), cost.num_searches)
+                pipeline.hincrbyfloat(time_key, str(banphrase_id), cost.total_time * 1000.0)
+                if cost.num_timeouts > 0:
+                    pipeline.hincrby(timeouts_key, str(banphrase_id), cost.num_timeouts)
+            pipeline.execute()
+        except:
+            log.exception("Failed to publish banphrase regex costs")
+
+    def forget_regex_cost(self, banphrase_id: int) -> None:
+        with self._regex_costs_lock:
+            self._regex_costs.pop(banphrase_id, None)
+            self._regex_timeouts.pop(banphrase_id, None)
 
-        return matched_banphrase or False
+        if not self.bot:
+            return
+
+        try:
+            pipeline = RedisManager.get().pipeline()
+            for key in self._regex_cost_keys():
+                pipeline.hdel(key, str(banphrase_id))
+            pipeline.execute()
+        except:
+            log.exception("Failed to remove banphrase regex costs")
+
+    @staticmethod
+    def get_regex_costs() -> dict[int, dict[str, float]]:
+        """Total searches, time (ms) and timeouts of every regex banphrase, as published by the bot"""
+        searches_key, time_key, timeouts_key = BanphraseManager._regex_cost_keys()
+        pipeline = RedisManager.get().pipeline()
+        pipeline.hgetall(searches_key)
+        pipeline.hgetall(time_key)
+        pipeline.hgetall(timeouts_key)
+        all_searches, all_times, all_timeouts = pipeline.execute()
+
+        regex_costs = {}
+        for banphrase_id, num_searches in all_searches.items():
+            num_searches = int(num_searches)
+            total_time = float(all_times.get(banphrase_id, 0))
+            regex_costs[int(banphrase_id)] = {
+                "searches": num_searches,
+                "time_ms": total_time,
+                "avg_time_ms": total_time / num_searches if num_searches > 0 else 0.0,
+                "timeouts": int(all_timeouts.get(banphrase_id, 0)),
+            }
+        return regex_costs
+
+    def check_message(self, message: str, user: Optional[User]) -> Union[Banphrase, Literal[False]]:
+        """Returns the enabled banphrase that matches the message, the one with the harshest punishment
+        (see Banphrase.greater_than) if several match"""
+        return self.get_matcher().match(message, user) or False
 
     def find_match(self, message: str, banphrase_id: Optional[str] = None) -> Optional[Banphrase]:
         match = None
@@ -393,6 +564,8 @@ class BanphraseManager:
         parser.add_argument("--no-subimmunity", dest="sub_immunity", action="store_false")
         parser.add_argument("--removeaccents", dest="remove_accents", action="store_true")
         parser.add_argument("--no-removeaccents", dest="remove_accents", action="store_false")
+        parser.add_argument("--confusables", dest="normalize_confusables", action="store_true")
+        parser.add_argument("--no-confusables", dest="normalize_confusables", action="store_false")
         parser.add_argument("--operator", dest="operator", type=str)
         parser.add_argument("--name", nargs="+", dest="name")
         parser.set_defaults(
@@ -402,6 +575,7 @@ class BanphraseManager:
             warning=None,
             sub_immunity=None,
             remove_accents=None,
+            normalize_confusables=None,
             operator="contains",
         )
 
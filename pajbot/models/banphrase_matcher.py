@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+import logging
+import time
+
+from pajbot.confusables import fold_confusables
+
+import regex as re
+from unidecode import unidecode
+
+if TYPE_CHECKING:
+    from pajbot.models.banphrase import Banphrase
+    from pajbot.models.user import User
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# (case_sensitive, remove_accents, normalize_confusables)
+Variant = tuple[bool, bool, bool]
+
+# Called with the regex banphrase, the seconds the search took and whether it timed out
+RegexSearchCallback = Callable[["Banphrase", float, bool], None]
+
+# Regexes that refer to their own groups (backreferences, conditionals, recursion) or use inline flags/comments
+# can't be merged into one alternation without changing their meaning, they are always searched on their own
+UNCOMBINABLE_REGEX = re.compile(r"\\(?:[1-9]|g)|\(\?(?!:|=|!|<=|<!|P?<[A-Za-z_])")
+
+
+def normalize_message(
+    message: str, case_sensitive: bool, remove_accents: bool, normalize_confusables: bool = False
+) -> str:
+    if normalize_confusables:
+        # Accents are removed by fold_confusables too, unidecode isn't needed
+        message = fold_confusables(message)
+        if not case_sensitive:
+            message = message.lower()
+        return message
+
+    if not case_sensitive:
+        message = message.lower()
+    if remove_accents:
+        message = unidecode(message).strip()
+
+    return message
+
+
+class AhoCorasickAutomaton(Generic[T]):
+    """Finds all occurrences of any number of patterns in a single pass over the text"""
+
+    def __init__(self, patterns: Iterable[tuple[str, T]]) -> None:
+        # state -> character -> next state, state 0 is the root
+        self.transitions: list[dict[str, int]] = [{}]
+        # state -> (pattern length, value) of every pattern that ends in that state, including via fail links
+        self.outputs: list[list[tuple[int, T]]] = [[]]
+
+        for pattern, value in patterns:
+            state = 0
+            for character in pattern:
+                next_state = self.transitions[state].get(character, None)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][character] = next_state
+                    self.transitions.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append((len(pattern), value))
+
+        # Breadth-first, so the fail state of a state is always finished before the state itself
+        self.fail = [0] * len(self.transitions)
+        queue = list(self.transitions[0].values())
+        for state in queue:
+            for character, next_state in self.transitions[state].items():
+                fail_state = self.fail[state]
+                while character not in self.transitions[fail_state] and fail_state != 0:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.transitions[fail_state].get(character, 0)
+                self.outputs[next_state].extend(self.outputs[self.fail[next_state]])
+                queue.append(next_state)
+
+    def search(self, text: str) -> Iterator[tuple[int, int, T]]:
+        """Yields (start, end, value) of every pattern occurrence in text, overlapping occurrences included"""
+        transitions = self.transitions
+        fail = self.fail
+        outputs = self.outputs
+
+        state = 0
+        for end, character in enumerate(text, start=1):
+            while state != 0 and character not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(character, 0)
+            for length, value in outputs[state]:
+                yield end - length, end, value
+
+
+class BanphraseMatcherVariant:
+    """All banphrases that look at the message normalized the same way"""
+
+    def __init__(self, regex_timeout: Optional[float], on_regex_search: Optional[RegexSearchCallback]) -> None:
+        self.regex_timeout = regex_timeout
+        self.on_regex_search = on_regex_search
+
+        # (rank, banphrase) of all contains/startswith/endswith/exact banphrases, the operator is checked per match
+        self.phrases: list[tuple[str, tuple[int, Banphrase]]] = []
+        # banphrases with an empty phrase, which the automaton can't report
+        self.empty_phrases: list[tuple[int, Banphrase]] = []
+        self.regexes: list[tuple[int, Banphrase]] = []
+
+        self.automaton: Optional[AhoCorasickAutomaton[tuple[int, Banphrase]]] = None
+        # one alternation of all regexes that can be combined, if it doesn't match, none of them match
+        self.combined_regex: Optional[re.Pattern[str]] = None
+        self.uncombined_regexes: list[tuple[int, Banphrase]] = []
+
+    def compile(self) -> None:
+        if self.phrases:
+            self.automaton = AhoCorasickAutomaton(self.phrases)
+
+        combinable = []
+        for rank, banphrase in self.regexes:
+            if UNCOMBINABLE_REGEX.search(banphrase.phrase):
+                self.uncombined_regexes.append((rank, banphrase))
+            else:
+                combinable.append((rank, banphrase))
+
+        if combinable:
+            # A prefilter may match more than the regexes would on their own, but never less
+            flags = re.IGNORECASE if any(not banphrase.case_sensitive for _, banphrase in combinable) else 0
+            try:
+                self.combined_regex = re.compile(
+                    "|".join(f"(?:{banphrase.phrase})" for _, banphrase in combinable), flags=flags
+                )
+            except Exception:
+                log.exception("Unable to combine banphrase regexes, searching them one by one instead")
+                self.uncombined_regexes.extend(combinable)
+                self.uncombined_regexes.sort(key=lambda entry: entry[0])
+
+    def best_phrase_match(self, message: str, is_immune: bool) -> Optional[tuple[int, Banphrase]]:
+        best: Optional[tuple[int, Banphrase]] = None
+
+        for rank, banphrase in self.empty_phrases:
+            if best is not None and rank >= best[0]:
+                break
+            if is_immune and banphrase.sub_immunity:
+                continue
+            if banphrase.operator != "exact" or message == "":
+                best = (rank, banphrase)
+
+        if self.automaton is None:
+            return best
+
+        message_length = len(message)
+        for start, end, entry in self.automaton.search(message):
+            rank, banphrase = entry
+            if best is not None and rank >= best[0]:
+                continue
+            if is_immune and banphrase.sub_immunity:
+                continue
+
+            operator = banphrase.operator
+            if (
+                operator == "contains"
+                or (operator == "startswith" and start == 0)
+                or (operator == "endswith" and end == message_length)
+                or (operator == "exact" and start == 0 and end == message_length)
+            ):
+                best = entry
+
+        return best
+
+    def best_regex_match(
+        self, message: str, is_immune: bool, best_rank: Optional[int]
+    ) -> Optional[tuple[int, Banphrase]]:
+        """Returns the highest ranked regex banphrase that matches and ranks higher than best_rank"""
+        candidates: Iterable[tuple[int, Banphrase]] = self.uncombined_regexes
+        if self.combined_regex is not None:
+            try:
+                if self.combined_regex.search(message, timeout=self.regex_timeout) is not None:
+                    candidates = self.regexes
+            except TimeoutError:
+                # Let the regexes time out on their own, so the slow one gets the blame
+                candidates = self.regexes
+
+        # Sorted by rank, so the first match is the best one
+        for rank, banphrase in candidates:
+            if best_rank is not None and rank >= best_rank:
+                break
+            if is_immune and banphrase.sub_immunity:
+                continue
+            if banphrase.compiled_regex is not None and self.search_regex(banphrase, message):
+                return rank, banphrase
+
+        return None
+
+    def search_regex(self, banphrase: Banphrase, message: str) -> bool:
+        assert banphrase.compiled_regex is not None
+
+        start_time = time.perf_counter()
+        try:
+            matched = banphrase.compiled_regex.search(message, timeout=self.regex_timeout) is not None
+            timed_out = False
+        except TimeoutError:
+            log.warning(f"Regex of banphrase {banphrase.id} timed out on message {message!r}")
+            matched = False
+            timed_out = True
+
+        if self.on_regex_search is not None:
+            self.on_regex_search(banphrase, time.perf_counter() - start_time, timed_out)
+
+        return matched
+
+
+class BanphraseMatcher:
+    """
+    Checks a message against all given banphrases at once.
+
+    Banphrases are grouped by how they normalize the message (case_sensitive/remove_accents/normalize_confusables),
+    so the message is normalized at most once per group. All contains/startswith/endswith/exact phrases of a group are found with one
+    Aho-Corasick automaton, and regexes are first tested as one combined pattern.
+
+    Banphrases are ranked the way `Banphrase.greater_than` orders them: permanent banphrases first, then by length,
+    then by position in the list. The matcher returns the highest ranked match, which is the same banphrase
+    that looping over the list and keeping the `greater_than` one would return.
+
+    Every regex search gives up after `regex_timeout` seconds, and counts as no match then. `on_regex_search` is
+    told how long every regex search took.
+    """
+
+    def __init__(
+        self,
+        banphrases: list[Banphrase],
+        regex_timeout: Optional[float] = None,
+        on_regex_search: Optional[RegexSearchCallback] = None,
+    ) -> None:
+        self.variants: dict[Variant, BanphraseMatcherVariant] = {}
+
+        ranked = sorted(
+            enumerate(banphrases),
+            key=lambda entry: (not entry[1].permanent, 0 if entry[1].permanent else -entry[1].length, entry[0]),
+        )
+        for rank, (_, banphrase) in enumerate(ranked):
+            if banphrase.predicate is None:
+                # Banphrase.match would log a warning and never match
+                continue
+
+            case_sensitive = banphrase.case_sensitive is not False
+            if banphrase.normalize_confusables:
+                variant_key = (case_sensitive, False, True)
+            else:
+                variant_key = (case_sensitive, bool(banphrase.remove_accents), False)
+            variant = self.variants.get(variant_key, None)
+            if variant is None:
+                variant = BanphraseMatcherVariant(regex_timeout, on_regex_search)
+                self.variants[variant_key] = variant
+
+            if banphrase.operator == "regex":
+                if banphrase.compiled_regex is not None:
+                    variant.regexes.append((rank, banphrase))
+            else:
+                phrase = banphrase.get_phrase()
+                if phrase:
+                    variant.phrases.append((phrase, (rank, banphrase)))
+                else:
+                    variant.empty_phrases.append((rank, banphrase))
+
+        for variant in self.variants.values():
+            variant.compile()
+
+    def match(self, message: str, user: Optional[User]) -> Optional[Banphrase]:
+        is_immune = user is not None and user.subscriber is True
+
+        best: Optional[tuple[int, Banphrase]] = None
+        normalized_messages: list[tuple[BanphraseMatcherVariant, str]] = []
+        folded_message: Optional[str] = None
+        for (case_sensitive, remove_accents, normalize_confusables), variant in self.variants.items():
+            if normalize_confusables:
+                # Folded once, no matter whether it is needed case sensitive, case insensitive or both
+                if folded_message is None:
+                    folded_message = fold_confusables(message)
+                normalized_message = folded_message if case_sensitive else folded_message.lower()
+            else:
+                normalized_message = normalize_message(message, case_sensitive, remove_accents)
+            normalized_messages.append((variant, normalized_message))
+
+            phrase_match = variant.best_phrase_match(normalized_message, is_immune)
+            if phrase_match is not None and (best is None or phrase_match[0] < best[0]):
+                best = phrase_match
+
+        # Regexes are the most expensive, so they only get searched once we know which rank they have to beat
+        for variant, normalized_message in normalized_messages:
+            regex_match = variant.best_regex_match(normalized_message, is_immune, best[0] if best else None)
+            if regex_match is not None:
+                best = regex_match
+
+        return best[1] if best is not None else None
@@ -469,7 +469,14 @@ class Command(Base):
 
         cur_time = pajbot.utils.now()
         cur_time_ts = cur_time.timestamp()
-        with source.spend_currency_context(self.cost, self.tokens_cost):
+        reason = f"Used !{self.command}" if self.command else "Used a command"
+        points_reservation = bot.points_ledger.reserve(source, self.cost, reason)
+        if points_reservation is None:
+            # The user spent their points since they were checked in run
+            log.debug(f"{source} can no longer afford {self}")
+            return
+
+        with source.spend_currency_context(points_reservation, self.tokens_cost):
             ret = self.action.run(bot, source, message, event, args)
             if ret is False:
                 raise FailedCommand("return currency")
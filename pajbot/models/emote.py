@@ -66,6 +66,8 @@ class EmoteInstance:
     :ivar emote: The emote.
     :type emote: Emote"""
 
+    __slots__ = ("start", "end", "emote")
+
     def __init__(self, start: int, end: int, emote: Emote) -> None:
         self.start = start
         self.end = end
@@ -97,6 +99,8 @@ class EmoteInstanceCount:
     :type emote_instances: list[EmoteInstance]
     """
 
+    __slots__ = ("count", "emote", "emote_instances")
+
     def __init__(self, count: int, emote: Emote, emote_instances: list[EmoteInstance]) -> None:
         self.count = count
         self.emote = emote
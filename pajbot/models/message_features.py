@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+import collections
+import string
+from functools import cached_property
+
+from pajbot.emoji import contains_emoji
+
+if TYPE_CHECKING:
+    from pajbot.models.emote import EmoteInstance
+
+ASCII_LOWERCASE = string.ascii_lowercase.encode("ascii")
+ASCII_UPPERCASE = string.ascii_uppercase.encode("ascii")
+ASCII_ALNUM = (string.ascii_letters + string.digits).encode("ascii")
+
+
+class CharacterCounts:
+    __slots__ = ("lowercase", "uppercase", "non_alnum")
+
+    def __init__(self, lowercase: int, uppercase: int, non_alnum: int) -> None:
+        self.lowercase = lowercase
+        self.uppercase = uppercase
+        self.non_alnum = non_alnum
+
+
+def count_characters(message: str) -> CharacterCounts:
+    """Counts the lowercase, uppercase and not alphanumeric characters of the message, the same way
+    str.islower/str.isupper/str.isalnum would for every single character"""
+    if message.isascii():
+        # Most messages are plain ASCII, those are counted by bytes.translate instead of a Python loop
+        encoded = message.encode("ascii")
+        length = len(encoded)
+        return CharacterCounts(
+            length - len(encoded.translate(None, ASCII_LOWERCASE)),
+            length - len(encoded.translate(None, ASCII_UPPERCASE)),
+            len(encoded.translate(None, ASCII_ALNUM)),
+        )
+
+    lowercase = 0
+    uppercase = 0
+    non_alnum = 0
+    for c in message:
+        if c.islower():
+            lowercase += 1
+        elif c.isupper():
+            uppercase += 1
+        if not c.isalnum():
+            non_alnum += 1
+
+    return CharacterCounts(lowercase, uppercase, non_alnum)
+
+
+class MessageFeatures:
+    """
+    What the moderation modules look at in a chat message. Created once per message by the bot and passed to the
+    on_pubmsg and on_message handlers as `features`, so every module reads the same values instead of walking the
+    message again. Each value is computed the first time a module asks for it.
+
+    `emote_instances` and `urls` are empty until `Bot.parse_message` has parsed them, i.e. during on_pubmsg.
+    """
+
+    def __init__(
+        self, message: str, emote_instances: Optional[list[EmoteInstance]] = None, urls: Optional[set[str]] = None
+    ) -> None:
+        self.message = message
+        self.emote_instances: list[EmoteInstance] = emote_instances if emote_instances is not None else []
+        self.urls: set[str] = urls if urls is not None else set()
+
+    def set_emotes_and_urls(self, emote_instances: list[EmoteInstance], urls: set[str]) -> None:
+        self.emote_instances = emote_instances
+        self.urls = urls
+        # In case it was asked for before the emotes were known
+        self.__dict__.pop("emote_providers", None)
+
+    @cached_property
+    def character_counts(self) -> CharacterCounts:
+        return count_characters(self.message)
+
+    @property
+    def num_lowercase(self) -> int:
+        return self.character_counts.lowercase
+
+    @property
+    def num_uppercase(self) -> int:
+        return self.character_counts.uppercase
+
+    @property
+    def num_non_alnum(self) -> int:
+        return self.character_counts.non_alnum
+
+    @cached_property
+    def words(self) -> list[str]:
+        """The message split on single spaces, like str.split(" ")"""
+        return self.message.split(" ")
+
+    @cached_property
+    def word_frequency(self) -> collections.Counter[str]:
+        return collections.Counter(self.words)
+
+    @cached_property
+    def longest_repeat_run(self) -> int:
+        """How often the same word is repeated back to back at most, e.g. 3 for "a b b b a" """
+        longest = 0
+        run = 0
+        previous_word = None
+        for word in self.words:
+            if word == previous_word:
+                run += 1
+            else:
+                run = 1
+                previous_word = word
+            longest = max(longest, run)
+        return longest
+
+    @property
+    def num_emotes(self) -> int:
+        return len(self.emote_instances)
+
+    @cached_property
+    def emote_providers(self) -> frozenset[str]:
+        """The providers (twitch, ffz, bttv, 7tv) of all emotes in the message"""
+        return frozenset(emote_instance.emote.provider for emote_instance in self.emote_instances)
+
+    @cached_property
+    def contains_emoji(self) -> bool:
+        return contains_emoji(self.message)
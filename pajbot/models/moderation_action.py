@@ -47,27 +47,27 @@ def _combine_reasons(a: Optional[str], b: Optional[str]) -> Optional[str]:
 
 
 class ModerationActions:
-    # Maps login -> action to execute
+    # Maps user ID -> action to execute
     actions: dict[str, ModerationAction]
 
     def __init__(self) -> None:
         super().__init__()
         self.actions = {}
 
-    def add(self, login: str, action: ModerationAction) -> None:
-        if login not in self.actions:
-            self.actions[login] = action
+    def add(self, user_id: str, action: ModerationAction) -> None:
+        if user_id not in self.actions:
+            self.actions[user_id] = action
             return
 
-        existing_action = self.actions[login]
+        existing_action = self.actions[user_id]
 
         if isinstance(action, Ban):
             if isinstance(existing_action, Ban):
                 # combine the two
-                self.actions[login] = Ban(reason=_combine_reasons(existing_action.reason, action.reason))
+                self.actions[user_id] = Ban(reason=_combine_reasons(existing_action.reason, action.reason))
             else:
                 # ban wins over lower-tier action
-                self.actions[login] = action
+                self.actions[user_id] = action
             return
 
         if isinstance(action, Timeout):
@@ -77,13 +77,13 @@ class ModerationActions:
 
             if isinstance(existing_action, Timeout):
                 # combine the two
-                self.actions[login] = Timeout(
+                self.actions[user_id] = Timeout(
                     duration=max(action.duration, existing_action.duration),
                     reason=_combine_reasons(existing_action.reason, action.reason),
                 )
             else:
                 # timeout wins over lower-tier action
-                self.actions[login] = action
+                self.actions[user_id] = action
             return
 
         if isinstance(action, Unban):
@@ -96,7 +96,7 @@ class ModerationActions:
                 pass
             else:
                 # unban wins over lower-tier untimeout
-                self.actions[login] = action
+                self.actions[user_id] = action
             return
 
         # we have an untimeout action
@@ -107,15 +107,15 @@ class ModerationActions:
         # so, in essence, there is nothing to do here.
 
     def execute(self, bot) -> None:
-        for login, action in self.actions.items():
+        for user_id, action in self.actions.items():
             if isinstance(action, Ban):
-                bot.ban_login(login, action.reason)
+                bot.ban_id(user_id, action.reason)
             if isinstance(action, Timeout):
-                bot.timeout_login(login, action.duration, action.reason)
+                bot.timeout_id(user_id, action.duration, action.reason)
             if isinstance(action, Unban):
-                bot.unban_login(login)
+                bot.unban_id(user_id)
             if isinstance(action, Untimeout):
-                bot.untimeout_login(login)
+                bot.untimeout_id(user_id)
 
 
 @contextmanager
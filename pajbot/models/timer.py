@@ -13,6 +13,7 @@ import json
 import logging
 
 from pajbot.managers.db import Base, DBManager
+from pajbot.managers.outbound import OutboundPriority
 from pajbot.models.action import ActionParser, BaseAction
 from pajbot.models.user import User
 from pajbot.utils import find
@@ -158,6 +159,14 @@ class TimerManager:
                 self.offline_timers.remove(removed_timer)
 
     def tick(self) -> None:
+        if self.bot.outbound.is_congested():
+            # Chat is backed up, try again next minute instead of adding to it
+            return
+
+        with self.bot.outbound.priority_scope(OutboundPriority.BULK):
+            self._tick()
+
+    def _tick(self) -> None:
         if self.bot.is_online:
             for active_timer in self.online_timers:
                 active_timer.time_to_send_online -= 1
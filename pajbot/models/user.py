@@ -15,7 +15,7 @@ from pajbot.models.duel import UserDuelStats
 
 from redis import Redis
 from sqlalchemy import BigInteger, Integer, Interval, Text, and_, or_
-from sqlalchemy.orm import Mapped, Session, foreign, mapped_column, relationship
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.sql import functions
 from sqlalchemy.sql.expression import select
@@ -24,6 +24,7 @@ from sqlalchemy_utc import UtcDateTime
 
 if TYPE_CHECKING:
     from pajbot.apiwrappers.twitch.helix import TwitchHelixAPI
+    from pajbot.managers.points_ledger import PointsReservation
     from pajbot.modules.warning import WarningModule
 
     hybrid_property = property
@@ -33,14 +34,6 @@ else:
 log = logging.getLogger(__name__)
 
 
-class UserRank(Base):
-    __tablename__ = "user_rank"
-
-    user_id: Mapped[str] = mapped_column(Text, primary_key=True)
-    points_rank: Mapped[int]
-    num_lines_rank: Mapped[int]
-
-
 class UserBasics:
     def __init__(self, id: str, login: str, name: str):
         self.id = id
@@ -129,8 +122,6 @@ class User(Base):
     vip: Mapped[bool]
     founder: Mapped[bool]
 
-    _rank = relationship(UserRank, primaryjoin=foreign(id) == UserRank.user_id, lazy="select", viewonly=True)
-
     def __init__(self) -> None:
         self.level = 100
         self.points = 0
@@ -176,21 +167,23 @@ class User(Base):
 
     @property
     def points_rank(self) -> int:
-        if self._rank:
-            return self._rank.points_rank
-        else:
-            # user is relatively new, and they are not inside the user_rank materialized view yet.
-            # on next refresh, they will be included.
+        from pajbot.managers.user_rank import get_rank
+
+        rank = get_rank("points", self.points)
+        if rank is None:
+            # the user ranks have not been built yet, see UserRankManager
             return 420
+        return rank
 
     @property
     def num_lines_rank(self) -> int:
-        if self._rank:
-            return self._rank.num_lines_rank
-        else:
-            # user is relatively new, and they are not inside the user_rank materialized view yet.
-            # on next refresh, they will be included.
+        from pajbot.managers.user_rank import get_rank
+
+        rank = get_rank("num_lines", self.num_lines)
+        if rank is None:
+            # the user ranks have not been built yet, see UserRankManager
             return 1337
+        return rank
 
     @property
     def minutes_in_chat_online(self) -> int:
@@ -230,23 +223,23 @@ class User(Base):
         return self.tokens >= cost
 
     @contextmanager
-    def spend_currency_context(self, points: int, tokens: int) -> Iterator[None]:
+    def spend_currency_context(self, points_reservation: PointsReservation, tokens: int) -> Iterator[None]:
+        """The reserved points are spent and the tokens taken if the block finishes, both are returned if it raises"""
         try:
-            with self._spend_currency_context(points, "points"), self._spend_currency_context(tokens, "tokens"):
+            with points_reservation, self._spend_tokens_context(tokens):
                 yield
         except FailedCommand:
             pass
 
     @contextmanager
-    def _spend_currency_context(self, amount: int, currency: str) -> Iterator[None]:
-        # self.{points,tokens} -= spend_amount
-        setattr(self, currency, getattr(self, currency) - amount)
+    def _spend_tokens_context(self, amount: int) -> Iterator[None]:
+        self.tokens -= amount
 
         try:
             yield
         except:
-            log.debug(f"Returning {amount} {currency} to {self}")
-            setattr(self, currency, getattr(self, currency) + amount)
+            log.debug(f"Returning {amount} tokens to {self}")
+            self.tokens += amount
             raise
 
     def get_warning_keys(self, total_chances: int, prefix: str) -> list[str]:
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable, Optional
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from enum import IntEnum
+
+log = logging.getLogger(__name__)
+
+
+class ModerationPriority(IntEnum):
+    """Lower values are executed first"""
+
+    BAN = 0
+    TIMEOUT = 1
+    UNBAN = 2
+    DELETE = 3
+
+
+class ModerationStats:
+    __slots__ = ("num_completed", "num_failed", "total_wait_time", "max_wait_time", "total_run_time", "max_run_time")
+
+    def __init__(self) -> None:
+        self.num_completed = 0
+        self.num_failed = 0
+        # in seconds
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+
+    def record(self, wait_time: float, run_time: float, failed: bool) -> None:
+        if failed:
+            self.num_failed += 1
+        else:
+            self.num_completed += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        self.total_run_time += run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+
+    def jsonify(self) -> dict[str, Any]:
+        num_done = self.num_completed + self.num_failed
+        return {
+            "completed": self.num_completed,
+            "failed": self.num_failed,
+            "avg_wait_ms": self.total_wait_time * 1000.0 / num_done if num_done > 0 else 0.0,
+            "max_wait_ms": self.max_wait_time * 1000.0,
+            "avg_run_ms": self.total_run_time * 1000.0 / num_done if num_done > 0 else 0.0,
+            "max_run_ms": self.max_run_time * 1000.0,
+        }
+
+
+class ModerationDispatcher:
+    """
+    Executes moderation actions (bans, timeouts, message deletions, ...) on a small pool of worker threads,
+    so the thread processing chat messages only has to enqueue them instead of waiting for the Helix round trip.
+
+    - The queue is bounded, actions submitted while it is full are dropped (and logged).
+    - Actions are executed by priority (see ModerationPriority), and in submission order within the same priority.
+    - All actions for the same user are executed by the same worker, in the order they were submitted, so e.g.
+      an untimeout can never run at the same time as or before the timeout it's meant to lift.
+    - An action with the same dedup key as an action submitted less than `dedup_window` seconds ago (or less than the
+      window passed to `submit`, e.g. the duration of a timeout) is skipped. Unbans and untimeouts forget the dedup
+      keys of the user's earlier bans and timeouts, and the other way around, so e.g. ban, unban, ban bans the user.
+
+    The workers share the requests session of the API wrapper the actions use, so connections to Twitch are kept alive
+    between actions.
+    """
+
+    def __init__(self, num_workers: int = 4, max_queue_size: int = 1000, dedup_window: float = 5.0) -> None:
+        self.max_queue_size = max_queue_size
+        self.dedup_window = dedup_window
+
+        # One queue per worker, each of them holds
+        # (priority, sequence number, enqueued at, user ID, priority name, function, args, kwargs)
+        self._queues: list[
+            queue.PriorityQueue[tuple[int, int, float, Optional[str], str, Callable[..., Any], tuple, dict]]
+        ] = [queue.PriorityQueue() for _ in range(num_workers)]
+        self._sequence = itertools.count()
+
+        self._lock = threading.Lock()
+        # dedup key -> (time until which it is skipped, whether it lifts a ban or timeout)
+        self._recent: dict[Hashable, tuple[float, bool]] = {}
+        # user ID -> the user's dedup keys in _recent
+        self._recent_user_keys: dict[str, set[Hashable]] = {}
+        self._num_queued = 0
+        # user ID -> (number of queued actions, priority value of the last one)
+        self._queued_users: dict[str, tuple[int, int]] = {}
+
+        self.num_submitted = 0
+        self.num_deduplicated = 0
+        self.num_dropped = 0
+        # priority name -> stats
+        self.stats: dict[str, ModerationStats] = {priority.name: ModerationStats() for priority in ModerationPriority}
+
+        self._workers = [
+            threading.Thread(target=self._work, args=(work_queue,), name=f"ModerationDispatcher-{i}", daemon=True)
+            for i, work_queue in enumerate(self._queues)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        priority: ModerationPriority,
+        user_id: Optional[str],
+        dedup_key: Optional[Hashable],
+        function: Callable[..., Any],
+        *args: Any,
+        dedup_window: Optional[float] = None,
+        **kwargs: Any,
+    ) -> bool:
+        """Enqueues the given action for the given user (None if it isn't about a single user).
+        dedup_window shortens the time duplicates of this action are skipped for, e.g. to the duration of a timeout.
+        Returns False if it was skipped as a duplicate or dropped"""
+        now = time.monotonic()
+        lifts = priority == ModerationPriority.UNBAN
+
+        with self._lock:
+            if dedup_key is not None:
+                recent = self._recent.get(dedup_key, None)
+                if recent is not None and now < recent[0]:
+                    self.num_deduplicated += 1
+                    return False
+
+            if self._num_queued >= self.max_queue_size:
+                self.num_dropped += 1
+                log.error(f"Moderation queue is full, dropping {priority.name} action {function.__name__}{args}")
+                return False
+
+            if user_id is not None:
+                self._forget_opposite(user_id, lifts)
+
+            if dedup_key is not None:
+                window = self.dedup_window if dedup_window is None else min(self.dedup_window, dedup_window)
+                self._recent[dedup_key] = (now + window, lifts)
+                if user_id is not None:
+                    self._recent_user_keys.setdefault(user_id, set()).add(dedup_key)
+                if len(self._recent) > 10000:
+                    self._forget_old(now)
+
+            sequence = next(self._sequence)
+            priority_value = priority.value
+            if user_id is None:
+                work_queue = self._queues[sequence % len(self._queues)]
+            else:
+                work_queue = self._queues[hash(user_id) % len(self._queues)]
+                num_queued, queued_priority_value = self._queued_users.get(user_id, (0, priority_value))
+                # Never overtake an action queued earlier for the same user
+                priority_value = max(priority_value, queued_priority_value)
+                self._queued_users[user_id] = (num_queued + 1, priority_value)
+
+            self._num_queued += 1
+            self.num_submitted += 1
+            work_queue.put_nowait((priority_value, sequence, now, user_id, priority.name, function, args, kwargs))
+
+        return True
+
+    def _forget_opposite(self, user_id: str, lifts: bool) -> None:
+        """Must be called with the lock held. Forgets the user's dedup keys of actions that undo an action of the
+        given kind, so e.g. a ban after an unban is never skipped as a duplicate of the ban before the unban"""
+        keys = self._recent_user_keys.get(user_id, None)
+        if keys is None:
+            return
+
+        for key in [key for key in keys if key not in self._recent or self._recent[key][1] != lifts]:
+            keys.discard(key)
+            self._recent.pop(key, None)
+        if not keys:
+            del self._recent_user_keys[user_id]
+
+    def _forget_old(self, now: float) -> None:
+        self._recent = {key: recent for key, recent in self._recent.items() if now < recent[0]}
+        self._recent_user_keys = {
+            user_id: {key for key in keys if key in self._recent}
+            for user_id, keys in self._recent_user_keys.items()
+            if any(key in self._recent for key in keys)
+        }
+
+    def _dequeued(self, user_id: Optional[str]) -> None:
+        """Called by the worker that took an action of the given user from its queue"""
+        with self._lock:
+            self._num_queued -= 1
+            if user_id is None:
+                return
+
+            num_queued, queued_priority_value = self._queued_users[user_id]
+            if num_queued <= 1:
+                del self._queued_users[user_id]
+            else:
+                self._queued_users[user_id] = (num_queued - 1, queued_priority_value)
+
+    def _work(self, work_queue: queue.PriorityQueue) -> None:
+        while True:
+            _, _, enqueued_at, user_id, priority_name, function, args, kwargs = work_queue.get()
+            # The user's next action is queued on this worker too, so it can't start before this one is done
+            self._dequeued(user_id)
+
+            time_start = time.monotonic()
+            failed = False
+            try:
+                function(*args, **kwargs)
+            except:
+                failed = True
+                log.exception(f"Unhandled exception while executing moderation action {function.__name__}{args}")
+            time_end = time.monotonic()
+
+            self.stats[priority_name].record(time_start - enqueued_at, time_end - time_start, failed)
+            work_queue.task_done()
+
+    def join(self) -> None:
+        """Blocks until all actions submitted so far have been executed"""
+        for work_queue in self._queues:
+            work_queue.join()
+
+    def jsonify(self) -> dict[str, Any]:
+        return {
+            "queued": self._num_queued,
+            "submitted": self.num_submitted,
+            "deduplicated": self.num_deduplicated,
+            "dropped": self.num_dropped,
+            "actions": {priority_name: stats.jsonify() for priority_name, stats in self.stats.items()},
+        }
@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Any, Optional
 import logging
 
 from pajbot.managers.handler import HandlerManager
+from pajbot.models.message_features import MessageFeatures
 from pajbot.models.user import User
 from pajbot.modules.base import BaseModule, ModuleSetting
 
@@ -91,17 +92,19 @@ class AsciiProtectionModule(BaseModule):
     ]
 
     @staticmethod
-    def check_message(message):
+    def check_message(message, features: Optional[MessageFeatures] = None):
         if len(message) <= 0:
             return False
 
-        non_alnum = sum(not c.isalnum() for c in message)
-        ratio = non_alnum / len(message)
+        if features is None:
+            features = MessageFeatures(message)
+
+        ratio = features.num_non_alnum / len(message)
         if (len(message) > 240 and ratio > 0.8) or ratio > 0.93:
             return True
         return False
 
-    def on_pubmsg(self, source: User, message: str, tags: Any, **rest) -> bool:
+    def on_pubmsg(self, source: User, message: str, tags: Any, features: MessageFeatures, **rest) -> bool:
         if self.bot is None:
             log.warning("Module bot is None")
             return True
@@ -118,7 +121,7 @@ class AsciiProtectionModule(BaseModule):
         if len(message) <= self.settings["min_msg_length"]:
             return True
 
-        if AsciiProtectionModule.check_message(message) is False:
+        if AsciiProtectionModule.check_message(message, features) is False:
             return True
 
         self.bot.delete_or_timeout(
@@ -6,6 +6,7 @@ from pajbot.managers.adminlog import AdminLogManager
 from pajbot.managers.db import DBManager
 from pajbot.managers.handler import HandlerManager
 from pajbot.models.command import Command, CommandExample
+from pajbot.models.sock import SocketClientManager
 from pajbot.modules.base import BaseModule
 
 log = logging.getLogger(__name__)
@@ -68,9 +69,11 @@ class BanphraseModule(BaseModule):
             if new_banphrase is True:
                 bot.whisper(source, f"Added your banphrase (ID: {banphrase.id})")
                 AdminLogManager.post("Banphrase added", source, banphrase.id, banphrase.phrase)
+                SocketClientManager.send("banphrase.update", {"id": banphrase.id})
                 return True
 
             banphrase.set(**options)
+            bot.banphrase_manager.invalidate_matcher()
             banphrase.data.set(edited_by=options["edited_by"])
             DBManager.session_add_expunge(banphrase)
             bot.banphrase_manager.commit()
@@ -79,6 +82,7 @@ class BanphraseModule(BaseModule):
                 f"Updated your banphrase (ID: {banphrase.id}) with ({', '.join([key for key in options if key != 'added_by'])})",
             )
             AdminLogManager.post("Banphrase edited", source, banphrase.id, banphrase.phrase)
+            SocketClientManager.send("banphrase.update", {"id": banphrase.id})
 
     @staticmethod
     def remove_banphrase(bot, source, message, **rest):
@@ -101,6 +105,7 @@ class BanphraseModule(BaseModule):
         AdminLogManager.post("Banphrase removed", source, banphrase.id, banphrase.phrase)
         bot.whisper(source, f"Successfully removed banphrase with id {banphrase.id}")
         bot.banphrase_manager.remove_banphrase(banphrase)
+        SocketClientManager.send("banphrase.remove", {"id": banphrase.id})
 
     def load_commands(self, **options):
         self.commands["add"] = Command.multiaction_command(
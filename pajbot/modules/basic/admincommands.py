@@ -58,7 +58,7 @@ class AdminCommandsModule(BaseModule):
                 bot.whisper(source, "This user does not exist FailFish")
                 return False
 
-            user.points += num_points
+            bot.points_ledger.add(user, num_points, "Added by an admin", other_user=source)
 
             if num_points >= 0:
                 bot.whisper(source, f"Successfully gave {user} {num_points} points.")
@@ -93,7 +93,7 @@ class AdminCommandsModule(BaseModule):
                 bot.whisper(source, "This user does not exist FailFish")
                 return False
 
-            user.points = num_points
+            bot.points_ledger.set(user, num_points, "Set by an admin", other_user=source)
 
             bot.whisper(source, f"Successfully set {user}'s points to {num_points}.")
 
@@ -2,6 +2,8 @@ import collections
 import logging
 
 from pajbot.managers.db import DBManager
+from pajbot.managers.db_query_stats import merge_query_stats
+from pajbot.managers.handler import HandlerManager
 from pajbot.models.command import Command, CommandExample
 from pajbot.models.user import User
 from pajbot.modules import BaseModule, ModuleType
@@ -84,6 +86,99 @@ class DebugModule(BaseModule):
 
             bot.whisper(source, ", ".join([f"{key}={value}" for (key, value) in data.items()]))
 
+    @staticmethod
+    def debug_handlers(bot, source, message, **options):
+        event = message.split(" ")[0] if message else "on_message"
+
+        if event == "reset":
+            HandlerManager.reset_stats()
+            bot.whisper(source, "Reset the stats of all event handlers.")
+            return
+
+        if event not in HandlerManager.stats:
+            bot.whisper(source, f"No stats for the event {event} found.")
+            return False
+
+        # Slowest handlers (by total time spent in them) first
+        slowest = sorted(HandlerManager.stats[event].items(), key=lambda item: item[1].total_time, reverse=True)
+        data = []
+        for handler_name, stats in slowest[:3]:
+            stats_json = stats.jsonify()
+            p99 = f"{stats_json['p99_ms']}ms" if stats_json["p99_ms"] is not None else "slow"
+            data.append(
+                f"{handler_name}: calls={stats.num_calls}, avg={stats_json['avg_ms']:.2f}ms, p99<={p99}, "
+                f"max={stats_json['max_ms']:.1f}ms, exceptions={stats.num_exceptions}, "
+                f"stops={stats.num_propagation_stops}"
+            )
+
+        bot.whisper(source, f"{event}: " + " | ".join(data))
+
+    @staticmethod
+    def debug_db(bot, source, message, **options):
+        if message and message.split(" ")[0] == "reset":
+            DBManager.monitor.reset()
+            bot.whisper(source, "Reset the database connection pool stats.")
+            return
+
+        data = DBManager.monitor.jsonify()
+        longest_held = data.pop("longest_held")
+        currently_held = data.pop("currently_held")
+        data = {key: round(value, 1) if isinstance(value, float) else value for (key, value) in data.items()}
+        parts = [", ".join([f"{key}={value}" for (key, value) in data.items()])]
+        for call_site, stats in list(longest_held.items())[:3]:
+            parts.append(
+                f"{call_site}: checkouts={stats['checkouts']}, avg={stats['avg_ms']:.1f}ms, max={stats['max_ms']:.1f}ms"
+            )
+        for checkout in currently_held[:3]:
+            parts.append(f"Held by {checkout['call_site']} in {checkout['thread']} for {checkout['held_ms']:.0f}ms")
+
+        bot.whisper(source, " | ".join(parts))
+
+    @staticmethod
+    def debug_queries(bot, source, message, **options):
+        if message and message.split(" ")[0] == "reset":
+            DBManager.query_stats.reset()
+            DBManager.query_stats.publish_stats("bot")
+            bot.whisper(source, "Reset the query stats of the bot.")
+            return
+
+        # The web process publishes its query stats every minute, the bot's own are published right now
+        DBManager.query_stats.publish_stats("bot")
+        queries = merge_query_stats(DBManager.query_stats.get_published_stats())
+        if not queries:
+            bot.whisper(source, "No queries have been run yet.")
+            return False
+
+        data = []
+        for query in queries[:3]:
+            data.append(
+                f"{query['call_site']} ({'/'.join(query['processes'])}): {query['fingerprint'][:100]} | "
+                f"count={query['count']}, total={query['total_ms']:.0f}ms, avg={query['avg_ms']:.1f}ms, "
+                f"max={query['max_ms']:.1f}ms"
+            )
+
+        bot.whisper(source, " || ".join(data))
+
+    @staticmethod
+    def debug_moderation(bot, source, message, **options):
+        data = bot.moderation_dispatcher.jsonify()
+        actions = data.pop("actions")
+        parts = [", ".join([f"{key}={value}" for (key, value) in data.items()])]
+        for action, stats in actions.items():
+            parts.append(
+                f"{action}: completed={stats['completed']}, failed={stats['failed']}, "
+                f"avg_wait={stats['avg_wait_ms']:.1f}ms, max_wait={stats['max_wait_ms']:.1f}ms, "
+                f"avg_run={stats['avg_run_ms']:.1f}ms"
+            )
+
+        for lane, lane_data in bot.outbound.jsonify().items():
+            parts.append(f"Outbound {lane}: " + ", ".join([f"{key}={value}" for (key, value) in lane_data.items()]))
+
+        helix_data = bot.twitch_helix_api.rate_limiter.jsonify()
+        parts.append("Helix rate limit: " + ", ".join([f"{key}={value}" for (key, value) in helix_data.items()]))
+
+        bot.whisper(source, " | ".join(parts))
+
     def load_commands(self, **options):
         self.commands["debug"] = Command.multiaction_command(
             level=100,
@@ -119,5 +214,52 @@ class DebugModule(BaseModule):
                         ).parse()
                     ],
                 ),
+                "handlers": Command.raw_command(
+                    self.debug_handlers,
+                    level=1000,
+                    description="Show the slowest handlers of an event",
+                    examples=[
+                        CommandExample(
+                            None,
+                            "Show the slowest on_message handlers",
+                            chat="user:!debug handlers on_message\n"
+                            "bot>user: on_message: LinkCheckerModule.on_message: calls=1200, avg=0.42ms, p99<=5.0ms, max=31.2ms, exceptions=0, stops=3 | ...",
+                            description="Use `!debug handlers reset` to reset the stats",
+                        ).parse()
+                    ],
+                ),
+                "db": Command.raw_command(
+                    self.debug_db,
+                    level=1000,
+                    description="Show how the database connection pool is used, and which code holds connections the longest",
+                    examples=[
+                        CommandExample(
+                            None,
+                            "Show the database connection pool stats",
+                            chat="user:!debug db\n"
+                            "bot>user: pool_size=10, in_use=2, overflow=0, max_in_use=4, max_overflow=0, checkouts=5120, avg_wait_ms=0.1, max_wait_ms=2.3, slow_scopes=0 | pajbot/managers/points_ledger.py:261 (commit): checkouts=300, avg=4.2ms, max=88.0ms | ...",
+                            description="Use `!debug db reset` to reset the stats",
+                        ).parse()
+                    ],
+                ),
+                "queries": Command.raw_command(
+                    self.debug_queries,
+                    level=1000,
+                    description="Show the queries the bot and the web interface spend the most time on, and the code that runs them",
+                    examples=[
+                        CommandExample(
+                            None,
+                            "Show the most expensive queries",
+                            chat="user:!debug queries\n"
+                            "bot>user: pajbot/modules/playsound.py:163 (play_sound) (bot): SELECT playsound.name, playsound.link, ... FROM playsound WHERE playsound.name = ? | count=840, total=2210ms, avg=2.6ms, max=40.1ms || ...",
+                            description="Use `!debug queries reset` to reset the query stats of the bot",
+                        ).parse()
+                    ],
+                ),
+                "moderation": Command.raw_command(
+                    self.debug_moderation,
+                    level=1000,
+                    description="Show how many moderation actions, chat messages and whispers were sent, and how long they waited",
+                ),
             },
         )
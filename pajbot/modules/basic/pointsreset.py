@@ -37,7 +37,7 @@ class PointsResetModule(BaseModule):
 
             if victim.points <= -1:
                 old_points = victim.points
-                victim.points = 0
+                bot.points_ledger.set(victim, 0, "Points reset", other_user=source)
                 bot.whisper(source, f"You changed the points for {victim} from {old_points} to {victim.points} points")
 
     def load_commands(self, **options):
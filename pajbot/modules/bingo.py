@@ -386,7 +386,7 @@ class BingoModule(BaseModule):
         # user guessed the emote
         HandlerManager.trigger("on_bingo_win", source, self.active_game)
         points_reward = self.active_game.points_reward
-        source.points += points_reward
+        self.bot.points_ledger.add(source, points_reward, "Won a bingo")
         self.active_game = None
 
         self.bot.me(
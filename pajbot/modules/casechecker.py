@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Optional
 import logging
 
 from pajbot.managers.handler import HandlerManager
+from pajbot.models.message_features import MessageFeatures
 from pajbot.models.user import User
 from pajbot.modules import BaseModule, ModuleSetting
 
@@ -162,7 +163,7 @@ class CaseCheckerModule(BaseModule):
         ),
     ]
 
-    def on_message(self, source: User, message: str, msg_id: str, **rest) -> bool:
+    def on_message(self, source: User, message: str, msg_id: str, features: MessageFeatures, **rest) -> bool:
         if self.bot is None:
             log.warning("Module bot is None")
             return True
@@ -181,7 +182,7 @@ class CaseCheckerModule(BaseModule):
         if self.settings["vip_exemption"] and source.vip is True:
             return True
 
-        amount_lowercase = sum(1 for c in message if c.islower())
+        amount_lowercase = features.num_lowercase
         if self.settings["lowercase_timeouts"] is True:
             if amount_lowercase >= self.settings["max_lowercase"]:
                 self.bot.delete_or_timeout(
@@ -208,7 +209,7 @@ class CaseCheckerModule(BaseModule):
                 )
                 return False
 
-        amount_uppercase = sum(1 for c in message if c.isupper())
+        amount_uppercase = features.num_uppercase
         if self.settings["uppercase_timeouts"] is True:
             if amount_uppercase >= self.settings["max_uppercase"]:
                 self.bot.delete_or_timeout(
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 import logging
 import math
@@ -253,12 +253,12 @@ class CheerAlertModule(BaseModule):
 
         if round_number > 0:
             points_to_grant = round_number * self.settings["grant_points_per_100_bits"]
-            user.points += points_to_grant
+            self.bot.points_ledger.add(user, points_to_grant, "Cheered")
             alert_message = self.settings["alert_message_points_given"]
             if alert_message != "":
                 self.bot.say(alert_message.format(username=user, points=points_to_grant, num_bits=num_bits))
 
-    def on_pubmsg(self, source: User, message: str, tags: dict[str, str]) -> bool:
+    def on_pubmsg(self, source: User, message: str, tags: dict[str, str], **rest: Any) -> bool:
         if "bits" not in tags:
             return True
 
@@ -110,7 +110,7 @@ class NewChatterAlertModule(BaseModule):
         if self.settings["grant_points_on_new_chatter"] <= 0:
             return
 
-        user.points += self.settings["grant_points_on_new_chatter"]
+        self.bot.points_ledger.add(user, self.settings["grant_points_on_new_chatter"], "New chatter")
 
         alert_message = self.settings["alert_message_points_given"]
         if alert_message != "":
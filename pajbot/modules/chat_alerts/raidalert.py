@@ -130,7 +130,7 @@ class RaidAlertModule(BaseModule):
         if self.settings["multiply_points_by_raiders"] is True:
             awarded_points *= num_viewers
 
-        user.points += awarded_points
+        self.bot.points_ledger.add(user, awarded_points, "Raided")
 
         alert_message = self.settings["alert_message_points_given"]
         if alert_message != "":
@@ -191,7 +191,7 @@ class SubAlertModule(BaseModule):
         if self.settings["grant_points_on_sub"] <= 0:
             return
 
-        user.points += self.settings["grant_points_on_sub"]
+        self.bot.points_ledger.add(user, self.settings["grant_points_on_sub"], "Subscribed")
 
         alert_message = self.settings["alert_message_points_given"]
         if alert_message != "":
@@ -4,6 +4,7 @@ import logging
 from datetime import timedelta
 
 from pajbot.managers.db import DBManager
+from pajbot.managers.handler import HandlerManager
 from pajbot.managers.schedule import ScheduleManager
 from pajbot.models.command import Command, CommandExample
 from pajbot.modules import BaseModule, ModuleSetting
@@ -122,6 +123,18 @@ ON CONFLICT (id) DO UPDATE SET
                 update_values,
             )
 
+            # The new points of the chatters, for the points ranking
+            new_points = dict(
+                db_session.execute(
+                    text('SELECT id, points FROM "user" WHERE id = ANY(:ids)'),
+                    {"ids": [basics.id for basics in chatters]},
+                ).tuples()
+            )
+
+        self.bot.user_state_manager.invalidate(basics.id for basics in chatters)
+        self.bot.user_rank_manager.update("points", new_points)
+        self.bot.execute_now(HandlerManager.trigger, "on_chatters_refreshed", chatters=chatters)
+
         log.info(f"Successfully updated {len(chatters)} chatters")
 
     def load_commands(self, **options):
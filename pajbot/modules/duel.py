@@ -311,7 +311,13 @@ class DuelModule(BaseModule):
 
             duel_price = self.duel_request_price[self.duel_targets[source.id]]
 
-            if not source.can_afford(duel_price) or not requestor.can_afford(duel_price):
+            source_reservation = bot.points_ledger.reserve(source, duel_price, "Lost a duel")
+            requestor_reservation = bot.points_ledger.reserve(requestor, duel_price, "Lost a duel")
+            if source_reservation is None or requestor_reservation is None:
+                for reservation in (source_reservation, requestor_reservation):
+                    if reservation is not None:
+                        reservation.release()
+
                 bot.whisper(
                     source,
                     f"Your duel request with {requestor} was cancelled due to one of you not having enough points.",
@@ -328,15 +334,14 @@ class DuelModule(BaseModule):
 
                 return
 
-            source.points -= duel_price
-            requestor.points -= duel_price
             winning_pot = int(duel_price * (1.0 - self.settings["duel_tax"] / 100))
-            participants = [source, requestor]
-            winner = random.choice(participants)
-            participants.remove(winner)
-            loser = participants.pop()
-            winner.points += duel_price
-            winner.points += winning_pot
+            participants = [(source, source_reservation), (requestor, requestor_reservation)]
+            winner, winner_reservation = random.choice(participants)
+            participants.remove((winner, winner_reservation))
+            loser, loser_reservation = participants.pop()
+            loser_reservation.commit()
+            winner_reservation.release()
+            bot.points_ledger.add(winner, winning_pot, "Won a duel", other_user=loser)
 
             # Persist duel statistics
             winner.duel_stats.won(winning_pot)
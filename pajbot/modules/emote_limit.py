@@ -5,7 +5,7 @@ from typing import TYPE_CHECKING, Optional
 import logging
 
 from pajbot.managers.handler import HandlerManager
-from pajbot.models.emote import EmoteInstance
+from pajbot.models.message_features import MessageFeatures
 from pajbot.models.user import User
 from pajbot.modules import BaseModule, ModuleSetting
 
@@ -87,7 +87,7 @@ class EmoteLimitModule(BaseModule):
         ),
     ]
 
-    def on_message(self, source: User, message: str, emote_instances: list[EmoteInstance], msg_id: str, **rest) -> bool:
+    def on_message(self, source: User, message: str, msg_id: str, features: MessageFeatures, **rest) -> bool:
         if self.bot is None:
             log.warning("Module bot is None")
             return True
@@ -104,7 +104,7 @@ class EmoteLimitModule(BaseModule):
         if self.settings["allow_subs_to_bypass"] and source.subscriber is True:
             return True
 
-        if len(emote_instances) > self.settings["max_emotes"]:
+        if features.num_emotes > self.settings["max_emotes"]:
             self.bot.delete_or_timeout(
                 source,
                 self.settings["moderation_action"],
@@ -4,9 +4,8 @@ from typing import TYPE_CHECKING, Optional
 
 import logging
 
-from pajbot.emoji import ALL_EMOJI
 from pajbot.managers.handler import HandlerManager
-from pajbot.models.emote import EmoteInstance
+from pajbot.models.message_features import MessageFeatures
 from pajbot.models.user import User
 from pajbot.modules import BaseModule, ModuleSetting
 
@@ -119,7 +118,7 @@ class EmoteTimeoutModule(BaseModule):
         ),
     ]
 
-    def on_message(self, source: User, message: str, emote_instances: list[EmoteInstance], msg_id: str, **rest) -> bool:
+    def on_message(self, source: User, message: str, msg_id: str, features: MessageFeatures, **rest) -> bool:
         if self.bot is None:
             log.warning("Module bot is None")
             return True
@@ -133,7 +132,7 @@ class EmoteTimeoutModule(BaseModule):
         if not self.bot.is_online and not self.settings["enable_in_offline_chat"]:
             return True
 
-        if self.settings["timeout_twitch"] and any(e.emote.provider == "twitch" for e in emote_instances):
+        if self.settings["timeout_twitch"] and "twitch" in features.emote_providers:
             self.bot.delete_or_timeout(
                 source,
                 self.settings["moderation_action"],
@@ -144,7 +143,7 @@ class EmoteTimeoutModule(BaseModule):
             )
             return False
 
-        if self.settings["timeout_ffz"] and any(e.emote.provider == "ffz" for e in emote_instances):
+        if self.settings["timeout_ffz"] and "ffz" in features.emote_providers:
             self.bot.delete_or_timeout(
                 source,
                 self.settings["moderation_action"],
@@ -155,7 +154,7 @@ class EmoteTimeoutModule(BaseModule):
             )
             return False
 
-        if self.settings["timeout_bttv"] and any(e.emote.provider == "bttv" for e in emote_instances):
+        if self.settings["timeout_bttv"] and "bttv" in features.emote_providers:
             self.bot.delete_or_timeout(
                 source,
                 self.settings["moderation_action"],
@@ -166,7 +165,7 @@ class EmoteTimeoutModule(BaseModule):
             )
             return False
 
-        if self.settings["timeout_7tv"] and any(e.emote.provider == "7tv" for e in emote_instances):
+        if self.settings["timeout_7tv"] and "7tv" in features.emote_providers:
             self.bot.delete_or_timeout(
                 source,
                 self.settings["moderation_action"],
@@ -177,7 +176,7 @@ class EmoteTimeoutModule(BaseModule):
             )
             return False
 
-        if self.settings["timeout_emoji"] and any(emoji in message for emoji in ALL_EMOJI):
+        if self.settings["timeout_emoji"] and features.contains_emoji:
             self.bot.delete_or_timeout(
                 source,
                 self.settings["moderation_action"],
@@ -101,8 +101,9 @@ class GivePointsModule(BaseModule):
                 bot.whisper(source, "Your target must be a subscriber.")
                 return False
 
-            source.points -= num_points
-            target.points += num_points
+            if not bot.points_ledger.transfer(source, target, num_points, "Gave points"):
+                bot.whisper(source, f"You cannot give away more points than you have. You have {source.points} points.")
+                return False
 
             bot.whisper(source, f"Successfully gave away {num_points} points to {target}")
 
@@ -1,23 +1,32 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Literal, Optional, Union
+from typing import TYPE_CHECKING, Any, Generic, Iterator, Literal, Optional, TypeVar, Union
 
 import argparse
+import collections
+import functools
 import logging
+import os
+import re
+import threading
+import time
 import urllib.parse
+from concurrent.futures import Future
 
 import pajbot.managers
 import pajbot.models
-import pajbot.utils
 from pajbot.apiwrappers.safebrowsing import SafeBrowsingAPI
+from pajbot.link_crawler import LinkCrawler, LinkCrawlerHostBusy
 from pajbot.managers.adminlog import AdminLogManager
 from pajbot.managers.db import Base, DBManager
 from pajbot.managers.handler import HandlerManager
+from pajbot.managers.redis import RedisManager
+from pajbot.managers.schedule import ScheduledJob, ScheduleManager
 from pajbot.models.command import Command, CommandExample
 from pajbot.modules import BaseModule, ModuleSetting
+from pajbot.streamhelper import StreamHelper
 
 import requests
-from bs4 import BeautifulSoup
 from sqlalchemy import Integer
 from sqlalchemy.orm import Mapped, Session, mapped_column
 from urlextract import URLExtract
@@ -27,8 +36,58 @@ if TYPE_CHECKING:
 
 log = logging.getLogger(__name__)
 
-extractor = URLExtract()
-extractor.update_when_older(14)
+# List of all top-level domains, see scripts/README.md for how to update it
+TLDS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "tlds-alpha-by-domain.txt")
+
+
+def load_tlds(path: str) -> set[str]:
+    """Loads the lowercase top-level domains (both the xn-- and the unicode form of IDN ones) from an IANA TLD list"""
+    tlds = set()
+    with open(path, encoding="utf-8") as tlds_file:
+        for line in tlds_file:
+            tld = line.strip().lower()
+            if not tld or tld.startswith("#"):
+                continue
+
+            tlds.add(tld)
+            try:
+                tlds.add(tld.encode("ascii").decode("idna"))
+            except UnicodeError:
+                pass
+
+    return tlds
+
+
+TLDS = load_tlds(TLDS_PATH)
+
+
+class LocalTLDURLExtract(URLExtract):
+    """URLExtract with the TLDs from TLDS_PATH, instead of a list that is downloaded or updated from the network"""
+
+    def _load_cached_tlds(self) -> set[str]:
+        return {"." + tld for tld in TLDS}
+
+
+extractor = LocalTLDURLExtract()
+
+# URLExtract only finds a URL where a "." is followed by a TLD (or a number, for IPv4 addresses) that ends
+# in one of these characters or at the end of the message. Apart from that, only URLs like http://localhost are found
+URL_TLD_CANDIDATE_REGEX = re.compile(r"\.([^" + re.escape("".join(sorted(extractor.get_after_tld_chars()))) + r"]*)")
+IPV4_TLDS = frozenset(str(number) for number in range(256))
+
+
+def may_contain_url(message: str) -> bool:
+    """Quickly rules out most messages that find_unique_urls would find no URLs in. If it returns True, there
+    might be a URL in the message"""
+    if "." not in message:
+        return "localhost" in message.lower()
+
+    for match in URL_TLD_CANDIDATE_REGEX.finditer(message):
+        tld = match.group(1).lower()
+        if tld in TLDS or tld in IPV4_TLDS:
+            return True
+
+    return "localhost" in message.lower()
 
 
 def is_subdomain(x: str, y: str) -> bool:
@@ -70,7 +129,139 @@ def is_same_url(x: Url, y: Url) -> bool:
     )
 
 
+T = TypeVar("T")
+
+
+class LinkIndexPathNode(Generic[T]):
+    __slots__ = ("children", "values")
+
+    def __init__(self) -> None:
+        self.children: dict[str, LinkIndexPathNode[T]] = {}
+        self.values: list[T] = []
+
+
+class LinkIndexDomainNode(Generic[T]):
+    __slots__ = ("children", "paths")
+
+    def __init__(self) -> None:
+        self.children: dict[str, LinkIndexDomainNode[T]] = {}
+        # Links on exactly this domain (and its subdomains), by path
+        self.paths: Optional[LinkIndexPathNode[T]] = None
+
+
+class LinkIndex(Generic[T]):
+    """
+    Finds all links (domain + path) that a URL falls under, with the same rules as `is_subdomain` and `is_subpath`,
+    in time proportional to the number of labels and path segments of the URL instead of the number of links.
+
+    Domains are stored in a trie of their labels in reverse order (pajlada.se -> se, pajlada), with a trie of path
+    segments below each domain. A URL matches every link found while walking down its own labels and segments.
+    """
+
+    def __init__(self) -> None:
+        self.root: LinkIndexDomainNode[T] = LinkIndexDomainNode()
+        self.num_values = 0
+
+    def __len__(self) -> int:
+        return self.num_values
+
+    @staticmethod
+    def _domain_labels(domain: str) -> list[str]:
+        if domain.startswith("www."):
+            domain = domain[4:]
+        return domain.split(".")[::-1]
+
+    @staticmethod
+    def _path_segments(path: str) -> list[str]:
+        # "/a" and "/a/" both match "/a" and everything below "/a/"
+        if path.endswith("/"):
+            path = path[:-1]
+        return path.split("/")
+
+    def _find_path_node(self, domain: str, path: str, create: bool) -> Optional[LinkIndexPathNode[T]]:
+        domain_node = self.root
+        for label in self._domain_labels(domain):
+            next_domain_node = domain_node.children.get(label, None)
+            if next_domain_node is None:
+                if not create:
+                    return None
+                next_domain_node = LinkIndexDomainNode()
+                domain_node.children[label] = next_domain_node
+            domain_node = next_domain_node
+
+        if domain_node.paths is None:
+            if not create:
+                return None
+            domain_node.paths = LinkIndexPathNode()
+
+        path_node = domain_node.paths
+        for segment in self._path_segments(path):
+            next_path_node = path_node.children.get(segment, None)
+            if next_path_node is None:
+                if not create:
+                    return None
+                next_path_node = LinkIndexPathNode()
+                path_node.children[segment] = next_path_node
+            path_node = next_path_node
+
+        return path_node
+
+    def add(self, domain: Optional[str], path: Optional[str], value: T) -> None:
+        if domain is None or path is None:
+            # Never matches anything, see LinkCheckerLink.is_subdomain
+            return
+
+        path_node = self._find_path_node(domain, path, create=True)
+        assert path_node is not None
+        path_node.values.append(value)
+        self.num_values += 1
+
+    def remove(self, domain: Optional[str], path: Optional[str], value: T) -> None:
+        if domain is None or path is None:
+            return
+
+        path_node = self._find_path_node(domain, path, create=False)
+        if path_node is not None and value in path_node.values:
+            path_node.values.remove(value)
+            self.num_values -= 1
+
+    def find(self, domain: str, path: str) -> Iterator[T]:
+        """Yields the values of all links the given domain and path fall under"""
+        path_segments: Optional[list[str]] = None
+
+        domain_node = self.root
+        # Not _domain_labels, www. is only stripped from the links
+        for label in reversed(domain.split(".")):
+            next_domain_node = domain_node.children.get(label, None)
+            if next_domain_node is None:
+                return
+            domain_node = next_domain_node
+
+            if domain_node.paths is None:
+                continue
+
+            if path_segments is None:
+                path_segments = path.split("/")
+
+            path_node = domain_node.paths
+            for segment in path_segments:
+                next_path_node = path_node.children.get(segment, None)
+                if next_path_node is None:
+                    break
+                path_node = next_path_node
+                yield from path_node.values
+
+
 def find_unique_urls(message: str) -> set[str]:
+    if not may_contain_url(message):
+        return set()
+
+    return set(_extract_unique_urls(message))
+
+
+# Copypasta is posted many times over, so the URLs of recent messages are remembered
+@functools.lru_cache(maxsize=1024)
+def _extract_unique_urls(message: str) -> frozenset[str]:
     urls = []
     for url in extractor.gen_urls(message):
         if not (url.startswith("http://") or url.startswith("https://")):
@@ -79,7 +270,7 @@ def find_unique_urls(message: str) -> set[str]:
             url = url[:-1]
         urls.append(url)
 
-    return set(urls)
+    return frozenset(urls)
 
 
 class Url:
@@ -89,21 +280,171 @@ class Url:
 
 
 class LinkCheckerCache:
-    def __init__(self) -> None:
-        self.cache: dict[str, bool] = {}
-        return
+    """
+    Remembers whether recently checked URLs are safe (True) or bad (False), so they don't have to be checked again.
+
+    Verdicts are kept in a small in-process LRU in front of two redis hashes, one for safe and one for bad URLs, which
+    are shared with the other processes of this streamer and survive a restart. Every verdict expires on its own after
+    the TTL it was stored with. Redis can't expire single hash fields, so the hashes map each URL to the time it
+    expires at, and expired fields are skipped on lookup and removed by `purge_expired`.
+    """
+
+    # Verdicts are kept in memory for at most this many seconds, so verdicts that other processes forget in redis
+    # are forgotten here soon after
+    LOCAL_TTL = 60
+
+    def __init__(self, use_redis: bool, max_size: int = 10000) -> None:
+        self.use_redis = use_redis
+        self.max_size = max_size
+
+        self.lock = threading.Lock()
+        # url -> (safe, expires at)
+        self.local: collections.OrderedDict[str, tuple[bool, float]] = collections.OrderedDict()
+
+        # lookups since the last publish_stats
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        return url.strip("/").lower()
+
+    @staticmethod
+    def redis_key(safe: bool) -> str:
+        return f"{StreamHelper.get_streamer()}:linkchecker_{'safe' if safe else 'bad'}_urls"
+
+    @staticmethod
+    def stats_redis_key() -> str:
+        return f"{StreamHelper.get_streamer()}:linkchecker_cache_stats"
+
+    def _set_local(self, url: str, safe: bool, expires_at: float, now: float) -> None:
+        self.local[url] = (safe, min(expires_at, now + self.LOCAL_TTL))
+        self.local.move_to_end(url)
+        while len(self.local) > self.max_size:
+            self.local.popitem(last=False)
+
+    def get(self, url: str) -> Optional[bool]:
+        """Returns the verdict for the given URL, or None if it's not cached"""
+        url = self.normalize_url(url)
+        now = time.time()
+
+        with self.lock:
+            entry = self.local.get(url, None)
+            if entry is not None:
+                safe, expires_at = entry
+                if expires_at > now:
+                    self.local.move_to_end(url)
+                    self.local_hits += 1
+                    return safe
+                del self.local[url]
+
+        if self.use_redis:
+            try:
+                pipeline = RedisManager.get().pipeline()
+                pipeline.hget(self.redis_key(False), url)
+                pipeline.hget(self.redis_key(True), url)
+                bad_expires_at, safe_expires_at = pipeline.execute()
+            except:
+                log.exception("Failed to look up link verdict in redis")
+            else:
+                # If a URL has both verdicts, the bad one wins
+                for safe, expires_at in ((False, bad_expires_at), (True, safe_expires_at)):
+                    if expires_at is not None and float(expires_at) > now:
+                        with self.lock:
+                            self._set_local(url, safe, float(expires_at), now)
+                            self.redis_hits += 1
+                        return safe
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, url: str, safe: bool, ttl: float) -> None:
+        """Remembers the verdict for the given URL for ttl seconds, replacing any earlier verdict"""
+        url = self.normalize_url(url)
+        now = time.time()
+        expires_at = now + ttl
+
+        with self.lock:
+            self._set_local(url, safe, expires_at, now)
+
+        if not self.use_redis:
+            return
+
+        try:
+            pipeline = RedisManager.get().pipeline()
+            pipeline.hset(self.redis_key(safe), url, str(expires_at))
+            pipeline.hdel(self.redis_key(not safe), url)
+            pipeline.execute()
+        except:
+            log.exception("Failed to store link verdict in redis")
+
+    def forget(self, safe: bool) -> None:
+        """Forgets all safe or all bad verdicts, e.g. after the blacklist or whitelist has changed"""
+        with self.lock:
+            for url in [url for url, (entry_safe, _) in self.local.items() if entry_safe is safe]:
+                del self.local[url]
+
+        if not self.use_redis:
+            return
+
+        try:
+            RedisManager.get().delete(self.redis_key(safe))
+        except:
+            log.exception("Failed to forget link verdicts in redis")
+
+    def purge_expired(self) -> None:
+        now = time.time()
+
+        with self.lock:
+            for url in [url for url, (_, expires_at) in self.local.items() if expires_at <= now]:
+                del self.local[url]
+
+        if not self.use_redis:
+            return
+
+        try:
+            redis = RedisManager.get()
+            for safe in (False, True):
+                key = self.redis_key(safe)
+                expired_urls = [url for url, expires_at in redis.hscan_iter(key) if float(expires_at) <= now]
+                if expired_urls:
+                    redis.hdel(key, *expired_urls)
+        except:
+            log.exception("Failed to purge expired link verdicts from redis")
+
+    def publish_stats(self) -> None:
+        """Logs the hit rate since the last call, and adds the lookups to the totals in redis"""
+        with self.lock:
+            local_hits, redis_hits, misses = self.local_hits, self.redis_hits, self.misses
+            self.local_hits = self.redis_hits = self.misses = 0
+            num_local = len(self.local)
+
+        lookups = local_hits + redis_hits + misses
+        if lookups == 0:
+            return
 
-    def __getitem__(self, url: str) -> bool:
-        return self.cache[url.strip("/").lower()]
+        log.info(
+            f"LinkChecker cache: {(local_hits + redis_hits) / lookups:.1%} of {lookups} lookups hit "
+            f"({local_hits} in memory, {redis_hits} in redis), {num_local} URLs in memory"
+        )
 
-    def __setitem__(self, url: str, safe: bool) -> None:
-        self.cache[url.strip("/").lower()] = safe
+        if not self.use_redis:
+            return
 
-    def __contains__(self, url: str) -> bool:
-        return url.strip("/").lower() in self.cache
+        try:
+            pipeline = RedisManager.get().pipeline()
+            pipeline.hincrby(self.stats_redis_key(), "local_hits", local_hits)
+            pipeline.hincrby(self.stats_redis_key(), "redis_hits", redis_hits)
+            pipeline.hincrby(self.stats_redis_key(), "misses", misses)
+            pipeline.execute()
+        except:
+            log.exception("Failed to publish link cache stats")
 
-    def __delitem__(self, url: str) -> None:
-        del self.cache[url.strip("/").lower()]
+    def run_maintenance(self) -> None:
+        self.purge_expired()
+        self.publish_stats()
 
 
 class LinkCheckerLink:
@@ -223,6 +564,24 @@ class LinkCheckerModule(BaseModule):
             required=True,
             default=False,
         ),
+        ModuleSetting(
+            key="safe_link_cache_time",
+            label="Remember safe links for (seconds)",
+            type="number",
+            required=True,
+            placeholder="",
+            default=1800,
+            constraints={"min_value": 20, "max_value": 604800},
+        ),
+        ModuleSetting(
+            key="bad_link_cache_time",
+            label="Remember bad links for (seconds)",
+            type="number",
+            required=True,
+            placeholder="",
+            default=86400,
+            constraints={"min_value": 20, "max_value": 604800},
+        ),
     ]
 
     def __init__(self, bot: Bot) -> None:
@@ -231,8 +590,18 @@ class LinkCheckerModule(BaseModule):
 
         self.blacklisted_links: list[BlacklistedLink] = []
         self.whitelisted_links: list[WhitelistedLink] = []
+        # Lookup structures for the two lists above, see build_link_indexes
+        self.blacklist_index: LinkIndex[BlacklistedLink] = LinkIndex()
+        self.whitelist_index: LinkIndex[WhitelistedLink] = LinkIndex()
+        self.super_whitelist_index: LinkIndex[str] = LinkIndex()
+        for domain in self.super_whitelist:
+            self.super_whitelist_index.add(domain, "/", domain)
 
-        self.cache = LinkCheckerCache()  # cache[url] = True means url is safe, False means the link is bad
+        self.cache = LinkCheckerCache(use_redis=bot is not None)
+        self.cache_job: Optional[ScheduledJob] = None
+
+        # Created when the first link is checked, bot.user_agent isn't known yet when modules are loaded
+        self.crawler: Optional[LinkCrawler] = None
 
         self.safe_browsing_api: Optional[SafeBrowsingAPI] = None
 
@@ -249,6 +618,9 @@ class LinkCheckerModule(BaseModule):
         HandlerManager.add_handler("on_message", self.on_message, priority=150, run_if_propagation_stopped=True)
         HandlerManager.add_handler("on_commit", self.on_commit)
 
+        if self.cache_job is None:
+            self.cache_job = ScheduleManager.execute_every(self.CACHE_MAINTENANCE_INTERVAL, self.cache.run_maintenance)
+
         if self.db_session is not None:
             self.db_session.commit()
             self.db_session.close()
@@ -262,6 +634,20 @@ class LinkCheckerModule(BaseModule):
         for link in self.db_session.query(WhitelistedLink):
             self.whitelisted_links.append(link)
 
+        self.build_link_indexes()
+
+    def build_link_indexes(self) -> None:
+        blacklist_index: LinkIndex[BlacklistedLink] = LinkIndex()
+        for blacklisted_link in self.blacklisted_links:
+            blacklist_index.add(blacklisted_link.domain, blacklisted_link.path, blacklisted_link)
+
+        whitelist_index: LinkIndex[WhitelistedLink] = LinkIndex()
+        for whitelisted_link in self.whitelisted_links:
+            whitelist_index.add(whitelisted_link.domain, whitelisted_link.path, whitelisted_link)
+
+        self.blacklist_index = blacklist_index
+        self.whitelist_index = whitelist_index
+
     def disable(self, bot):
         if not bot:
             return
@@ -269,17 +655,30 @@ class LinkCheckerModule(BaseModule):
         pajbot.managers.handler.HandlerManager.remove_handler("on_message", self.on_message)
         pajbot.managers.handler.HandlerManager.remove_handler("on_commit", self.on_commit)
 
+        if self.cache_job is not None:
+            self.cache_job.remove()
+            self.cache_job = None
+
         if self.db_session is not None:
             self.db_session.commit()
             self.db_session.close()
             self.db_session = None
             self.blacklisted_links = []
             self.whitelisted_links = []
+            self.build_link_indexes()
 
     def reload(self):
+        self.build_link_indexes()
         log.info(f"Loaded {len(self.blacklisted_links)} bad links and {len(self.whitelisted_links)} good links")
         return self
 
+    # Only the first 1 MB of a site, or what arrived within 3 seconds, is looked at for links to other sites
+    MAX_PAGE_SIZE = 1024 * 1024
+    MAX_PAGE_LOAD_TIME = 3
+
+    # How often expired verdicts are removed from the cache and its hit rate is logged, in seconds
+    CACHE_MAINTENANCE_INTERVAL = 10 * 60
+
     super_whitelist = ["pajlada.se", "pajlada.com", "forsen.tv", "pajbot.com"]
 
     def on_message(self, source, whisper, urls, **rest):
@@ -309,11 +708,8 @@ class LinkCheckerModule(BaseModule):
                     parsed_url = Url(url)
                     if len(parsed_url.parsed.netloc.split(".")) < 2:
                         continue
-                    whitelisted = False
-                    for whitelist in self.super_whitelist:
-                        if is_subdomain(parsed_url.parsed.netloc, whitelist):
-                            whitelisted = True
-                            break
+                    # Every path is below "/"
+                    whitelisted = next(self.super_whitelist_index.find(parsed_url.parsed.netloc, "/"), None) is not None
 
                     if whitelisted is False and self.is_whitelisted(url):
                         whitelisted = True
@@ -340,22 +736,17 @@ class LinkCheckerModule(BaseModule):
             # First we perform a basic check
             if self.simple_check(url, action) == self.RET_FURTHER_ANALYSIS:
                 # If the basic check returns no relevant data, we queue up a proper check on the URL
-                self.bot.action_queue.submit(self.check_url, url, action)
+                self.check_url(url, action)
 
     def on_commit(self, **rest):
         if self.db_session is not None:
             self.db_session.commit()
 
-    def delete_from_cache(self, url):
-        if url in self.cache:
-            del self.cache[url]
-
     def cache_url(self, url, safe):
-        if url in self.cache and self.cache[url] == safe:
-            return
-
-        self.cache[url] = safe
-        self.bot.execute_delayed(20, self.delete_from_cache, url)
+        if safe:
+            self.cache.set(url, True, self.settings["safe_link_cache_time"])
+        else:
+            self.cache.set(url, False, self.settings["bad_link_cache_time"])
 
     def counteract_bad_url(self, url, action=None, want_to_cache=True, want_to_blacklist=False):
         log.debug(f"LinkChecker: BAD URL FOUND {url.url}")
@@ -390,7 +781,10 @@ class LinkCheckerModule(BaseModule):
         link = BlacklistedLink(domain, path, level)
         self.db_session.add(link)
         self.blacklisted_links.append(link)
+        self.blacklist_index.add(link.domain, link.path, link)
         self.db_session.commit()
+        # The link or a page linking to it might have been cached as safe
+        self.cache.forget(safe=True)
 
     def whitelist_url(self, url, parsed_url=None):
         if not (url.lower().startswith("http://") or url.lower().startswith("https://")):
@@ -413,7 +807,9 @@ class LinkCheckerModule(BaseModule):
         link = WhitelistedLink(domain, path)
         self.db_session.add(link)
         self.whitelisted_links.append(link)
+        self.whitelist_index.add(link.domain, link.path, link)
         self.db_session.commit()
+        self.cache.forget(safe=False)
 
     def is_blacklisted(self, url, parsed_url=None, sublink=False):
         if parsed_url is None:
@@ -427,15 +823,13 @@ class LinkCheckerModule(BaseModule):
         if len(domain_split) < 2:
             return False
 
-        for link in self.blacklisted_links:
-            if link.is_subdomain(domain):
-                if link.is_subpath(path):
-                    if not sublink:
-                        return True
+        for link in self.blacklist_index.find(domain, path):
+            if not sublink:
+                return True
 
-                    # if it's a sublink, but the blacklisting level is 0, we don't consider it blacklisted
-                    if link.level >= 1:
-                        return True
+            # if it's a sublink, but the blacklisting level is 0, we don't consider it blacklisted
+            if link.level >= 1:
+                return True
 
         return False
 
@@ -451,12 +845,7 @@ class LinkCheckerModule(BaseModule):
         if len(domain_split) < 2:
             return False
 
-        for link in self.whitelisted_links:
-            if link.is_subdomain(domain):
-                if link.is_subpath(path):
-                    return True
-
-        return False
+        return next(self.whitelist_index.find(domain, path), None) is not None
 
     RET_BAD_LINK = -1
     RET_FURTHER_ANALYSIS = 0
@@ -470,11 +859,11 @@ class LinkCheckerModule(BaseModule):
         -1 = Link is bad
         0 = Link needs further analysis
         """
-        if url.url in self.cache:
-            if not self.cache[url.url]:  # link is bad
-                self.counteract_bad_url(url, action, False, False)
-                return self.RET_BAD_LINK
-
+        safe = self.cache.get(url.url)
+        if safe is False:
+            self.counteract_bad_url(url, action, False, False)
+            return self.RET_BAD_LINK
+        if safe is True:
             return self.RET_GOOD_LINK
 
         if self.is_blacklisted(url.url, url.parsed, sublink):
@@ -496,175 +885,145 @@ class LinkCheckerModule(BaseModule):
         return self.basic_check(url, action)
 
     def check_url(self, url, action):
+        if self.crawler is None:
+            self.crawler = LinkCrawler(self.bot.user_agent)
+
         url = Url(url)
         if len(url.parsed.netloc.split(".")) < 2:
             # The URL is broken, ignore it
             return
 
+        # If the same URL is posted again while it's being checked, we wait for the check that's already running
+        future = self.crawler.crawl(LinkCheckerCache.normalize_url(url.url), lambda: self._check_url(url))
+        future.add_done_callback(lambda future: self._on_url_checked(future, action))
+
+    @staticmethod
+    def _on_url_checked(future: Future[bool], action) -> None:
         try:
-            self._check_url(url, action)
+            is_bad = future.result()
         except:
             log.exception("LinkChecker unhandled exception while _check_url")
+            return
 
-    def _bs_get_site_links(self, html) -> list[str]:
-        # Checks the HTML content of the site and parses out any links
-        urls: list[str] = []
-
-        soup = BeautifulSoup(html, "html.parser")
-
-        for link in soup.find_all("a"):  # get a list of links to external sites
-            url = link.get("href")
-            if url is None:
-                continue
-            if url.startswith("//"):
-                urls.append("http:" + url)
-            elif url.startswith("http://") or url.startswith("https://"):
-                urls.append(url)
+        if is_bad:
+            action()
 
-        return urls
+    def _check_url(self, url: Url) -> bool:
+        """Checks the url and the sites it links to, and returns True if it's bad"""
+        assert self.crawler is not None
 
-    def _check_url(self, url, action):
         # XXX: The basic check is currently performed twice on links found in messages. Solve
-        res = self.basic_check(url, action)
+        res = self.basic_check(url, None)
         if res == self.RET_GOOD_LINK:
-            return
+            return False
         elif res == self.RET_BAD_LINK:
-            return
+            return True
 
         connection_timeout = 2
         read_timeout = 1
         try:
-            r = requests.head(
-                url.url, allow_redirects=True, timeout=connection_timeout, headers={"User-Agent": self.bot.user_agent}
-            )
+            r = self.crawler.head(url.url, timeout=connection_timeout)
+        except LinkCrawlerHostBusy:
+            # Don't remember the link as safe, it wasn't checked
+            log.warning(f"Not checking {url.url}, its site has been sent too many requests")
+            return False
         except:
             self.cache_url(url.url, True)
-            return
+            return False
 
         checkcontenttype = "content-type" in r.headers and r.headers["content-type"] == "application/octet-stream"
         checkdispotype = "disposition-type" in r.headers and r.headers["disposition-type"] == "attachment"
 
         if checkcontenttype or checkdispotype:  # triggering a download not allowed
-            self.counteract_bad_url(url, action)
-            return
+            self.counteract_bad_url(url)
+            return True
 
         redirected_url = Url(r.url)
         if is_same_url(url, redirected_url) is False:
-            res = self.basic_check(redirected_url, action)
+            res = self.basic_check(redirected_url, None)
             if res == self.RET_GOOD_LINK:
-                return
+                return False
             elif res == self.RET_BAD_LINK:
-                return
+                return True
 
         if self.safe_browsing_api and self.safe_browsing_api.is_url_bad(redirected_url.url):  # harmful url detected
             log.debug("Google Safe Browsing API lists URL")
-            self.counteract_bad_url(url, action, want_to_blacklist=False)
+            self.counteract_bad_url(url, want_to_blacklist=False)
             self.counteract_bad_url(redirected_url, want_to_blacklist=False)
-            return
+            return True
 
         if "content-type" not in r.headers or not r.headers["content-type"].startswith("text/html"):
-            return  # can't analyze non-html content
-        maximum_size = 1024 * 1024 * 10  # 10 MB
-        receive_timeout = 3
+            return False  # can't analyze non-html content
 
-        html = ""
         try:
-            response = requests.get(
-                url=url.url,
-                stream=True,
+            urls = self.crawler.get_links(
+                url.url,
                 timeout=(connection_timeout, read_timeout),
-                headers={"User-Agent": self.bot.user_agent},
+                max_bytes=self.MAX_PAGE_SIZE,
+                max_time=self.MAX_PAGE_LOAD_TIME,
             )
-
-            content_length = response.headers.get("Content-Length")
-            if content_length and int(response.headers.get("Content-Length")) > maximum_size:
-                log.error("This file is too big!")
-                return
-
-            size = 0
-            start = pajbot.utils.now().timestamp()
-
-            for chunk in response.iter_content(1024):
-                if pajbot.utils.now().timestamp() - start > receive_timeout:
-                    log.error("The site took too long to load")
-                    return
-
-                size += len(chunk)
-                if size > maximum_size:
-                    log.error("This file is too big! (fake header)")
-                    return
-                html += str(chunk)
-
+        except LinkCrawlerHostBusy:
+            log.warning(f"Not looking at the links on {url.url}, its site has been sent too many requests")
+            return False
         except requests.exceptions.ConnectTimeout:
             log.warning(f"Connection timed out while checking {url.url}")
             self.cache_url(url.url, True)
-            return
+            return False
         except requests.exceptions.ReadTimeout:
             log.warning(f"Reading timed out while checking {url.url}")
             self.cache_url(url.url, True)
-            return
+            return False
         except:
             log.exception("Unhandled exception")
-            return
+            return False
 
         original_url = url
         original_redirected_url = redirected_url
-        urls = []
-
-        try:
-            urls = self._bs_get_site_links(html)
-        except:
-            log.exception("Something went wrong parsing links")
 
-        for url in urls:  # check if the site links to anything dangerous
-            url = Url(url)
+        for link in urls:  # check if the site links to anything dangerous
+            link_url = Url(link)
 
-            if is_subdomain(url.parsed.netloc, original_url.parsed.netloc):
+            if is_subdomain(link_url.parsed.netloc, original_url.parsed.netloc):
                 # log.debug('Skipping because internal link')
                 continue
 
-            res = self.basic_check(url, action, sublink=True)
+            res = self.basic_check(link_url, None, sublink=True)
             if res == self.RET_BAD_LINK:
-                self.counteract_bad_url(url)
+                self.counteract_bad_url(link_url)
                 self.counteract_bad_url(original_url, want_to_blacklist=False)
                 self.counteract_bad_url(original_redirected_url, want_to_blacklist=False)
-                return
+                return True
             elif res == self.RET_GOOD_LINK:
                 continue
 
             try:
-                r = requests.head(
-                    url.url,
-                    allow_redirects=True,
-                    timeout=connection_timeout,
-                    headers={"User-Agent": self.bot.user_agent},
-                )
+                r = self.crawler.head(link_url.url, timeout=connection_timeout)
             except:
                 continue
 
             redirected_url = Url(r.url)
-            if not is_same_url(url, redirected_url):
-                res = self.basic_check(redirected_url, action, sublink=True)
+            if not is_same_url(link_url, redirected_url):
+                res = self.basic_check(redirected_url, None, sublink=True)
                 if res == self.RET_BAD_LINK:
-                    self.counteract_bad_url(url)
+                    self.counteract_bad_url(link_url)
                     self.counteract_bad_url(original_url, want_to_blacklist=False)
                     self.counteract_bad_url(original_redirected_url, want_to_blacklist=False)
-                    return
+                    return True
                 elif res == self.RET_GOOD_LINK:
                     continue
 
             if self.safe_browsing_api and self.safe_browsing_api.is_url_bad(redirected_url.url):  # harmful url detected
-                log.debug(f"Evil sublink {url} by google API")
-                self.counteract_bad_url(original_url, action)
+                log.debug(f"Evil sublink {link_url} by google API")
+                self.counteract_bad_url(original_url)
                 self.counteract_bad_url(original_redirected_url)
-                self.counteract_bad_url(url)
+                self.counteract_bad_url(link_url)
                 self.counteract_bad_url(redirected_url)
-                return
+                return True
 
         # if we got here, the site is clean for our standards
         self.cache_url(original_url.url, True)
         self.cache_url(original_redirected_url.url, True)
-        return
+        return False
 
     def load_commands(self, **options):
         self.commands["add"] = Command.multiaction_command(
@@ -829,8 +1188,10 @@ class LinkCheckerModule(BaseModule):
 
         if link:
             self.blacklisted_links.remove(link)
+            self.blacklist_index.remove(link.domain, link.path, link)
             self.db_session.delete(link)
             self.db_session.commit()
+            self.cache.forget(safe=False)
         else:
             bot.whisper(source, "No link with the given id found")
             return False
@@ -858,8 +1219,10 @@ class LinkCheckerModule(BaseModule):
 
         if link:
             self.whitelisted_links.remove(link)
+            self.whitelist_index.remove(link.domain, link.path, link)
             self.db_session.delete(link)
             self.db_session.commit()
+            self.cache.forget(safe=True)
         else:
             bot.whisper(source, "No link with the given id found")
             return False
@@ -1,9 +1,15 @@
+from typing import Iterable, Optional
+
 import logging
 import re
+import threading
+import time
 from datetime import timedelta
 
+from pajbot import utils
 from pajbot.managers.db import DBManager
 from pajbot.managers.handler import HandlerManager
+from pajbot.managers.schedule import ScheduledJob, ScheduleManager
 from pajbot.models.user import User
 from pajbot.modules import BaseModule, ModuleSetting
 
@@ -14,6 +20,73 @@ log = logging.getLogger(__name__)
 
 USERNAME_IN_MESSAGE_PATTERN = re.compile("[A-Za-z0-9_]{4,}")
 
+# Only users that were seen in chat this recently count as pinged
+KNOWN_USER_MAX_AGE = timedelta(weeks=2)
+
+
+class RecentUserIndex:
+    """
+    The logins and lowercase display names of all users seen in chat within KNOWN_USER_MAX_AGE, so pings can be
+    counted without asking the database
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # user id -> (login, lowercase display name, last seen as unix time)
+        self.users: dict[str, tuple[str, str, float]] = {}
+        # login or lowercase display name -> user id. The display name is usually just the login, so most users
+        # only have one entry here
+        self.names: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def _remove_names(self, user_id: str, login: str, name: str) -> None:
+        for key in (login, name):
+            if self.names.get(key, None) == user_id:
+                del self.names[key]
+
+    def see(self, user_id: str, login: str, name: str, last_seen: Optional[float] = None) -> None:
+        """Remembers that the given user was in chat at last_seen (unix time, defaults to now)"""
+        if last_seen is None:
+            last_seen = time.time()
+        name = name.lower()
+
+        with self.lock:
+            previous = self.users.get(user_id, None)
+            if previous is not None:
+                previous_login, previous_name, previous_last_seen = previous
+                last_seen = max(last_seen, previous_last_seen)
+                if previous_login != login or previous_name != name:
+                    self._remove_names(user_id, previous_login, previous_name)
+
+            self.users[user_id] = (login, name, last_seen)
+            self.names[login] = user_id
+            self.names[name] = user_id
+
+    def count_known_users(self, usernames: Iterable[str]) -> int:
+        """Counts the users that one of the given lowercase names belongs to"""
+        min_last_seen = time.time() - KNOWN_USER_MAX_AGE.total_seconds()
+
+        with self.lock:
+            user_ids = {self.names[username] for username in usernames if username in self.names}
+            return sum(1 for user_id in user_ids if self.users[user_id][2] >= min_last_seen)
+
+    def prune(self) -> None:
+        """Forgets the users that haven't been seen within KNOWN_USER_MAX_AGE"""
+        min_last_seen = time.time() - KNOWN_USER_MAX_AGE.total_seconds()
+
+        with self.lock:
+            for user_id, (login, name, last_seen) in list(self.users.items()):
+                if last_seen < min_last_seen:
+                    del self.users[user_id]
+                    self._remove_names(user_id, login, name)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.users = {}
+            self.names = {}
+
 
 class MassPingProtectionModule(BaseModule):
     ID = __name__.split(".")[-1]
@@ -91,10 +164,42 @@ class MassPingProtectionModule(BaseModule):
         ),
     ]
 
-    @staticmethod
-    def count_known_users(usernames):
+    # How often users that haven't been seen in a while are removed from the index, in seconds
+    PRUNE_INTERVAL = 60 * 60
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.recent_users = RecentUserIndex()
+        # Until the index has been loaded from the database, pings are counted in the database instead
+        self.recent_users_loaded = False
+        self.prune_job: Optional[ScheduledJob] = None
+
+    def load_recent_users(self) -> None:
+        with DBManager.create_session_scope() as db_session:
+            recent_users = (
+                db_session.query(User)
+                .with_entities(User.id, User._login, User.name, User.last_seen)
+                .filter(User.last_seen >= utils.now() - KNOWN_USER_MAX_AGE)
+                .all()
+            )
+
+        for user_id, login, name, last_seen in recent_users:
+            self.recent_users.see(user_id, login, name, last_seen.timestamp())
+
+        self.recent_users_loaded = True
+        log.info(f"Loaded {len(self.recent_users)} recently seen users for mass ping protection")
+
+    def count_known_users(self, usernames):
         if len(usernames) < 1:
             return 0
+
+        if self.recent_users_loaded:
+            return self.recent_users.count_known_users(usernames)
+
+        return MassPingProtectionModule.count_known_users_in_db(usernames)
+
+    @staticmethod
+    def count_known_users_in_db(usernames):
         with DBManager.create_session_scope() as db_session:
             # quick EXPLAIN ANALYZE for this query:
             #
@@ -125,8 +230,7 @@ class MassPingProtectionModule(BaseModule):
                 .scalar()
             )
 
-    @staticmethod
-    def count_pings(message, source, emote_instances):
+    def count_pings(self, message, source, emote_instances):
         potential_users = set()
 
         for match in USERNAME_IN_MESSAGE_PATTERN.finditer(message):
@@ -149,10 +253,10 @@ class MassPingProtectionModule(BaseModule):
 
         # check how many of the words in `potential_users` refer to known users
         # (i.e. we have seen this username before & user was recently seen in chat)
-        return MassPingProtectionModule.count_known_users(potential_users)
+        return self.count_known_users(potential_users)
 
     def determine_timeout_length(self, message, source, emote_instances):
-        ping_count = MassPingProtectionModule.count_pings(message, source, emote_instances)
+        ping_count = self.count_pings(message, source, emote_instances)
         pings_too_many = ping_count - self.settings["max_ping_count"]
 
         if pings_too_many <= 0:
@@ -172,6 +276,8 @@ class MassPingProtectionModule(BaseModule):
             log.warning("on_message failed because bot is None")
             return False
 
+        self.recent_users.see(source.id, source.login, source.name)
+
         if source.level >= self.settings["bypass_level"] or source.moderator is True:
             return True
 
@@ -196,8 +302,33 @@ class MassPingProtectionModule(BaseModule):
         )
         return False
 
+    def on_chatters_refreshed(self, chatters, **rest) -> bool:
+        for chatter in chatters:
+            self.recent_users.see(chatter.id, chatter.login, chatter.name)
+
+        return True
+
     def enable(self, bot):
         HandlerManager.add_handler("on_message", self.on_message, priority=150, run_if_propagation_stopped=True)
+        HandlerManager.add_handler("on_chatters_refreshed", self.on_chatters_refreshed)
+
+        if not bot:
+            return
+
+        # enable is also called for modules that are already enabled
+        if self.prune_job is not None:
+            return
+
+        bot.action_queue.submit(self.load_recent_users)
+        self.prune_job = ScheduleManager.execute_every(self.PRUNE_INTERVAL, self.recent_users.prune)
 
     def disable(self, bot):
         HandlerManager.remove_handler("on_message", self.on_message)
+        HandlerManager.remove_handler("on_chatters_refreshed", self.on_chatters_refreshed)
+
+        if self.prune_job is not None:
+            self.prune_job.remove()
+            self.prune_job = None
+
+        self.recent_users_loaded = False
+        self.recent_users.clear()
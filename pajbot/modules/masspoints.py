@@ -12,6 +12,8 @@ from pajbot.models.command import Command, CommandExample
 from pajbot.models.user import User
 from pajbot.modules import BaseModule, ModuleSetting
 
+from sqlalchemy import update
+
 if TYPE_CHECKING:
     from pajbot.bot import Bot
 
@@ -61,18 +63,28 @@ class MassPointsModule(BaseModule):
             bot.whisper(source, f"{e}. Usage: !{self.command_name} POINTS")
             return False
 
+        # last_active of chatters is written in batches, make sure the database is up to date
+        bot.user_state_manager.commit()
+
         with DBManager.create_session_scope() as db_session:
             # We want to know how many users we are giving points to
 
             threshold = datetime.now(timezone.utc) - timedelta(minutes=self.settings["last_active_minutes"])
 
-            num_users = (
-                db_session.query(User)
-                .filter(User.last_active >= threshold)
-                .update({User.points: User.points + num_points})
+            new_points = dict(
+                db_session.execute(
+                    update(User)
+                    .where(User.last_active >= threshold)
+                    .values(points=User.points + num_points)
+                    .returning(User.id, User.points)
+                ).tuples()
             )
+            num_users = len(new_points)
+
+        bot.user_state_manager.invalidate_all()
+        bot.user_rank_manager.update("points", new_points)
 
-            bot.say(f"Successfully gave away {num_points} points to {num_users} users FeelsGoodMan")
+        bot.say(f"Successfully gave away {num_points} points to {num_users} users FeelsGoodMan")
 
         return True
 
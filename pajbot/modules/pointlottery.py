@@ -118,15 +118,14 @@ class PointLotteryModule(BaseModule):
             else:
                 tickets = int(message.split(" ")[1])
 
-            if not source.can_afford(tickets):
-                bot.me(f"Sorry, {source}, you don't have enough points! FeelsBadMan")
-                return False
-
             if tickets <= 0:
                 bot.me(f"Sorry, {source}, you have to buy at least 1 ticket! FeelsBadMan")
                 return False
 
-            source.points -= tickets
+            if not bot.points_ledger.spend(source, tickets, "Bought lottery tickets"):
+                bot.me(f"Sorry, {source}, you don't have enough points! FeelsBadMan")
+                return False
+
             self.lottery_points += tickets
             log.info(f"Lottery points is now at {self.lottery_points}")
         except (ValueError, TypeError, AttributeError):
@@ -155,7 +154,7 @@ class PointLotteryModule(BaseModule):
         )
         bot.me(f"The lottery has finished! {winner} won {self.lottery_points} points! PogChamp")
 
-        winner.points += self.lottery_points
+        bot.points_ledger.add(winner, self.lottery_points, "Won the lottery")
 
         self.lottery_users = []
 
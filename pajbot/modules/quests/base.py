@@ -69,7 +69,7 @@ class BaseQuest(BaseModule):
         if reward_type == "tokens":
             user.tokens += reward_amount
         else:
-            user.points += reward_amount
+            self.bot.points_ledger.add(user, reward_amount, "Finished a quest")
 
         # Notify the user that they've finished today's quest
         message = f"You finished todays quest! You have been awarded with {reward_amount} {reward_type}."
@@ -8,6 +8,7 @@ import random
 
 from pajbot.managers.db import DBManager
 from pajbot.managers.handler import HandlerManager
+from pajbot.managers.outbound import OutboundPriority
 from pajbot.models.command import Command, CommandExample
 from pajbot.models.user import User
 from pajbot.modules.base import BaseModule, ModuleSetting
@@ -337,7 +338,7 @@ class RaffleModule(BaseModule):
 
             self.bot.me(f"The raffle has finished! {winner} {format_win(self.raffle_points)} points! PogChamp")
 
-            winner.points += self.raffle_points
+            self.bot.points_ledger.add(winner, self.raffle_points, "Won a raffle")
 
             HandlerManager.trigger("on_raffle_win", winner=winner, points=self.raffle_points)
 
@@ -444,7 +445,8 @@ class RaffleModule(BaseModule):
 
         # and we can pick the winners!
         winner_ids = random.sample(list(self.raffle_users), num_winners)
-        with DBManager.create_session_scope() as db_session:
+        # The list of winners can span many messages, they should not hold up replies to commands
+        with self.bot.outbound.priority_scope(OutboundPriority.BULK), DBManager.create_session_scope() as db_session:
             winners = db_session.query(User).filter(User.id.in_(winner_ids)).all()
 
             # reset
@@ -459,7 +461,7 @@ class RaffleModule(BaseModule):
 
             winners_arr = []
             for winner in winners:
-                winner.points += points_per_user
+                self.bot.points_ledger.add(winner, points_per_user, "Won a multi-raffle")
                 winners_arr.append(winner)
 
                 winners_str = generate_winner_list(winners_arr)
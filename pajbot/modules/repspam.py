@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Optional
 import logging
 
 from pajbot.managers.handler import HandlerManager
+from pajbot.models.message_features import MessageFeatures
 from pajbot.models.user import User
 from pajbot.modules.base import BaseModule, ModuleSetting
 
@@ -118,7 +119,7 @@ class RepspamModule(BaseModule):
 
         return len(word) <= 0
 
-    def on_message(self, source: User, message: str, whisper: bool, **rest) -> bool:
+    def on_message(self, source: User, message: str, whisper: bool, features: MessageFeatures, **rest) -> bool:
         if self.bot is None:
             log.warning("Module bot is None")
             return True
@@ -139,16 +140,13 @@ class RepspamModule(BaseModule):
             # Message too short
             return True
 
-        word_list = [word for word in message.split(" ") if not self.is_word_ignored(word)]
-        word_set = set(word_list)
+        # mapping word -> count/frequency
+        word_freq = {word: freq for word, freq in features.word_frequency.items() if not self.is_word_ignored(word)}
 
-        if len(word_set) < self.settings["min_unique_words"]:
+        if len(word_freq) < self.settings["min_unique_words"]:
             # There needs to be at least X unique words
             return True
 
-        # create a mapping word -> count/frequency
-        word_freq = {word: word_list.count(word) for word in word_set}
-
         # reverse the mapping to frequency -> set of words that repeat that amount
         # (sorted by frequency, from most frequent to lowest frequent)
         freq_to_word: dict[int, set[str]] = {}
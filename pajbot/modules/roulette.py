@@ -11,6 +11,7 @@ import pajbot.models
 from pajbot import utils
 from pajbot.managers.db import DBManager
 from pajbot.managers.handler import HandlerManager
+from pajbot.managers.outbound import OutboundPriority
 from pajbot.models.command import Command, CommandExample
 from pajbot.models.roulette import Roulette
 from pajbot.models.user import User
@@ -239,18 +240,23 @@ class RouletteModule(BaseModule):
             bot.whisper(source, "You can't bet 0 or less points!")
             return False
 
-        if not source.can_afford(bet):
-            bot.whisper(source, f"You don't have enough points to do a roulette for {bet} points :(")
-            return False
-
         if bet < self.settings["min_roulette_amount"]:
             bot.whisper(source, f"You have to bet at least {self.settings['min_roulette_amount']} point! :(")
             return False
 
+        reservation = bot.points_ledger.reserve(source, bet, "Lost a roulette")
+        if reservation is None:
+            bot.whisper(source, f"You don't have enough points to do a roulette for {bet} points :(")
+            return False
+
         # Calculating the result
         result = self.rigged_random_result()
         points = bet if result else -bet
-        source.points += points
+        if result:
+            reservation.release()
+            bot.points_ledger.add(source, points, "Won a roulette")
+        else:
+            reservation.commit()
 
         with DBManager.create_session_scope() as db_session:
             r = Roulette(source.id, points)
@@ -306,7 +312,8 @@ class RouletteModule(BaseModule):
             raise ValueError("Bot must not be None")
 
         msg = self.output_buffer
-        self.bot.me(msg)
+        with self.bot.outbound.priority_scope(OutboundPriority.BULK):
+            self.bot.me(msg)
         self.output_buffer = ""
         self.output_buffer_args = []
 
@@ -266,14 +266,15 @@ class SlotMachineModule(BaseModule):
             bot.whisper(source, "You can't bet 0 points!")
             return False
 
-        if not source.can_afford(bet):
-            bot.whisper(source, f"You don't have enough points to do a slot machine pull for {bet} points :(")
-            return False
-
         if bet < self.settings["min_bet"]:
             bot.whisper(source, f"You have to bet at least {self.settings['min_bet']} point! :(")
             return False
 
+        reservation = bot.points_ledger.reserve(source, bet, "Lost a slot machine pull")
+        if reservation is None:
+            bot.whisper(source, f"You don't have enough points to do a slot machine pull for {bet} points :(")
+            return False
+
         # how much of the users point they're expected to get back (basically how much the house yoinks)
         expected_return = 1.0
 
@@ -289,10 +290,11 @@ class SlotMachineModule(BaseModule):
         # Calculating the result
         if bet_return <= 0.0:
             points = -bet
+            reservation.commit()
         else:
-            points = bet * bet_return
-
-        source.points += points
+            points = round(bet * bet_return)
+            reservation.release()
+            bot.points_ledger.add(source, points, "Won a slot machine pull")
 
         arguments = {
             "bet": bet,
@@ -233,7 +233,7 @@ class TriviaModule(BaseModule):
                     self.bot.safe_me(
                         f"{source} got the answer right! The answer was {self.question['answer']} FeelsGoodMan They get {self.point_bounty} points! PogChamp"
                     )
-                    source.points += self.point_bounty
+                    self.bot.points_ledger.add(source, self.point_bounty, "Won a trivia question")
                 else:
                     self.bot.safe_me(
                         f"{source} got the answer right! The answer was {self.question['answer']} FeelsGoodMan"
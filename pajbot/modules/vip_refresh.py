@@ -106,6 +106,9 @@ WHERE
                 )
             )
 
+        # The flags of any user might have changed, cached user state is out of date
+        self.bot.user_state_manager.invalidate_all()
+
         log.info(f"Successfully updated {len(vips)} VIPs")
 
     def load_commands(self, **options):
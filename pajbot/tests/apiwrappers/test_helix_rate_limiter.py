@@ -0,0 +1,72 @@
+import time
+
+from pajbot.apiwrappers.twitch.rate_limiter import (
+    HelixPriority,
+    HelixRateLimiter,
+    HelixRateLimitTimeout,
+    get_endpoint_priority,
+)
+
+import pytest
+
+
+def test_endpoint_priority():
+    assert get_endpoint_priority("/moderation/bans") == HelixPriority.MODERATION
+    assert get_endpoint_priority("/moderation/moderators") == HelixPriority.BACKGROUND
+    assert get_endpoint_priority("/chat/chatters") == HelixPriority.BACKGROUND
+    assert get_endpoint_priority("/whispers") == HelixPriority.CHAT
+    assert get_endpoint_priority("/users") == HelixPriority.DEFAULT
+
+
+def test_grants_immediately_with_points_left():
+    limiter = HelixRateLimiter()
+    limiter.update("token", {"Ratelimit-Limit": "800", "Ratelimit-Remaining": "799", "Ratelimit-Reset": "0"})
+
+    assert limiter.acquire("token").done()
+    assert limiter.jsonify() == {"granted": 1, "delayed": 0, "waiting": 0}
+
+
+def test_waits_for_reset_and_orders_by_priority():
+    limiter = HelixRateLimiter()
+    reset = int(time.time()) + 1
+    limiter.update(
+        "token",
+        {"Ratelimit-Limit": "800", "Ratelimit-Remaining": "0", "Ratelimit-Reset": str(reset)},
+        rate_limited=True,
+    )
+
+    granted = []
+    background = limiter.acquire("token", HelixPriority.BACKGROUND)
+    background.add_done_callback(lambda _: granted.append("background"))
+    moderation = limiter.acquire("token", HelixPriority.MODERATION)
+    moderation.add_done_callback(lambda _: granted.append("moderation"))
+
+    # other tokens are not affected
+    assert limiter.acquire("other token").done()
+
+    assert not moderation.done()
+    moderation.result(timeout=5)
+    # background requests also wait until the reserved share of the bucket has been refilled
+    background.result(timeout=10)
+
+    assert granted == ["moderation", "background"]
+    assert time.time() >= reset - 1
+
+
+def test_wait_gives_up_after_timeout():
+    limiter = HelixRateLimiter()
+    reset = int(time.time()) + 60
+    limiter.update(
+        "token",
+        {"Ratelimit-Limit": "800", "Ratelimit-Remaining": "0", "Ratelimit-Reset": str(reset)},
+        rate_limited=True,
+    )
+
+    with pytest.raises(HelixRateLimitTimeout):
+        limiter.wait("token", HelixPriority.MODERATION, timeout=0.1)
+
+    # The request that gave up no longer waits for a point
+    assert limiter.jsonify()["waiting"] == 0
+
+    # other tokens are not affected
+    limiter.wait("other token", timeout=0.1)
@@ -0,0 +1,16 @@
+def test_banphrase_api_test_result() -> None:
+    from pajbot.models.banphrase import Banphrase
+    from pajbot.models.banphrase_matcher import BanphraseMatcher
+    from pajbot.web.routes.api.banphrases import get_test_result
+
+    banphrase = Banphrase(phrase="forsen", length=60)
+    banphrase.id = 1
+    matcher = BanphraseMatcher([banphrase])
+
+    assert get_test_result(matcher, "xD") == {"banned": False, "input_message": "xD"}
+
+    result = get_test_result(matcher, "xD FORSEN")
+    assert result["banned"] is True
+    assert result["input_message"] == "xD FORSEN"
+    assert result["banphrase_data"]["id"] == 1
+    assert result["banphrase_data"]["length"] == 60
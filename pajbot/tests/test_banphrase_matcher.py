@@ -0,0 +1,77 @@
+def create_banphrase(banphrase_id, phrase, **options):
+    from pajbot.models.banphrase import Banphrase
+
+    banphrase = Banphrase(phrase=phrase, **options)
+    banphrase.id = banphrase_id
+    return banphrase
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    from pajbot.models.banphrase_matcher import AhoCorasickAutomaton
+
+    automaton = AhoCorasickAutomaton([("he", 1), ("she", 2), ("his", 3), ("hers", 4)])
+    assert sorted(automaton.search("ushers")) == [(1, 4, 2), (2, 4, 1), (2, 6, 4)]
+    assert list(automaton.search("")) == []
+
+
+def test_banphrase_matcher_operators():
+    from pajbot.models.banphrase_matcher import BanphraseMatcher
+
+    contains = create_banphrase(1, "forsen")
+    startswith = create_banphrase(2, "!bet", operator="startswith")
+    endswith = create_banphrase(3, "xd", operator="endswith")
+    exact = create_banphrase(4, "lul", operator="exact")
+    regex = create_banphrase(5, r"(\w)\1{5,}", operator="regex")
+    accents = create_banphrase(6, "cafe", remove_accents=True)
+    case_sensitive = create_banphrase(7, "NaM", case_sensitive=True)
+
+    matcher = BanphraseMatcher([contains, startswith, endswith, exact, regex, accents, case_sensitive])
+
+    assert matcher.match("hello FORSEN", None) is contains
+    assert matcher.match("!bet 50", None) is startswith
+    assert matcher.match("lol !bet 50", None) is None
+    assert matcher.match("that was funny XD", None) is endswith
+    assert matcher.match("xd that was funny", None) is None
+    assert matcher.match("LUL", None) is exact
+    assert matcher.match("LUL LUL", None) is None
+    assert matcher.match("aaaaaaa", None) is regex
+    assert matcher.match("un café", None) is accents
+    assert matcher.match("NaM", None) is case_sensitive
+    assert matcher.match("nam", None) is None
+
+
+def test_banphrase_matcher_picks_greater_banphrase():
+    from types import SimpleNamespace
+
+    from pajbot.models.banphrase_matcher import BanphraseMatcher
+
+    short = create_banphrase(1, "bad", length=60)
+    long = create_banphrase(2, "bad word", length=600)
+    same_length = create_banphrase(3, "word", length=600)
+    permanent = create_banphrase(4, r"w[o0]rd", operator="regex", permanent=True, sub_immunity=True)
+
+    matcher = BanphraseMatcher([short, long, same_length, permanent])
+
+    assert matcher.match("bad", None) is short
+    # The first of two equally long timeouts wins
+    assert matcher.match("bad word", SimpleNamespace(subscriber=True)) is long
+    assert matcher.match("bad word", SimpleNamespace(subscriber=False)) is permanent
+    assert matcher.match("bad word", None) is permanent
+
+
+def test_banphrase_matcher_regex_timeout():
+    from pajbot.models.banphrase_matcher import BanphraseMatcher
+
+    slow = create_banphrase(1, r"(a|aa)+$", operator="regex")
+    fast = create_banphrase(2, r"b+", operator="regex", length=5)
+
+    searches = []
+    matcher = BanphraseMatcher(
+        [slow, fast],
+        regex_timeout=0.01,
+        on_regex_search=lambda banphrase, duration, timed_out: searches.append((banphrase, timed_out)),
+    )
+
+    # The slow regex is aborted and doesn't match, the next one is still searched
+    assert matcher.match("a" * 5000 + "!b", None) is fast
+    assert searches == [(slow, True), (fast, False)]
@@ -0,0 +1,36 @@
+def test_fold_confusables():
+    from pajbot.confusables import fold_confusables
+
+    # Cyrillic, Armenian, fullwidth and mathematical bold look-alikes
+    assert fold_confusables("ｆо𝗋ѕеո") == "forsen"
+    assert fold_confusables("ᴘᴀᴊʟᴀᴅᴀ") == "pajlada"
+    assert fold_confusables("ⓕⓞⓡⓢⓔⓝ") == "forsen"
+    assert fold_confusables("café Straße") == "cafe Strasse"
+    # Invisible characters are removed, whitespace is collapsed
+    assert fold_confusables("f\u200bor\u00adsen") == "forsen"
+    assert fold_confusables("  a \u2800\u3000 b\t") == "a b"
+    # Case is kept
+    assert fold_confusables("КАРРА") == "KAPPA"
+    assert fold_confusables("plain message") == "plain message"
+
+
+def test_banphrase_normalize_confusables():
+    from pajbot.models.banphrase import Banphrase
+    from pajbot.models.banphrase_matcher import BanphraseMatcher
+
+    plain = Banphrase(phrase="forsen", length=60)
+    plain.id = 1
+    confusables = Banphrase(phrase="pajlada", length=60, normalize_confusables=True)
+    confusables.id = 2
+    confusables_exact = Banphrase(phrase="КАРРА  123", operator="exact", normalize_confusables=True)
+    confusables_exact.id = 3
+
+    matcher = BanphraseMatcher([plain, confusables, confusables_exact])
+
+    assert matcher.match("ｆо𝗋ѕеո", None) is None
+    assert matcher.match("hi ᴘᴀᴊ\u200bʟᴀᴅᴀ", None) is confusables
+    assert matcher.match(" Kappa 123 ", None) is confusables_exact
+
+    for banphrase in (confusables, confusables_exact):
+        for message in ("hi ᴘᴀᴊ\u200bʟᴀᴅᴀ", " Kappa 123 "):
+            assert bool(banphrase.match(message, None)) is (matcher.match(message, None) is banphrase)
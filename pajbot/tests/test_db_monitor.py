@@ -0,0 +1,81 @@
+def test_find_call_site():
+    from pajbot.managers.db_monitor import find_call_site
+
+    call_site = find_call_site()
+    assert call_site.startswith("pajbot/tests/test_db_monitor.py:")
+    assert call_site.endswith("(test_find_call_site)")
+
+
+def test_checkout_checkin_stats():
+    from pajbot.managers.db_monitor import DBPoolMonitor
+
+    monitor = DBPoolMonitor()
+    first_record = object()
+    second_record = object()
+
+    for wait, record in ((0.002, first_record), (0.004, second_record)):
+        monitor.record_wait(wait)
+        monitor._on_checkout(None, record, None)
+
+    data = monitor.jsonify()
+    assert data["checkouts"] == 2
+    assert data["max_wait_ms"] == 4.0
+    assert round(data["avg_wait_ms"], 6) == 3.0
+    assert len(data["currently_held"]) == 2
+    assert data["currently_held"][0]["call_site"].endswith("(test_checkout_checkin_stats)")
+
+    monitor._on_checkin(None, first_record)
+    monitor._on_checkin(None, second_record)
+    # Checked in twice, or checked out before the monitor was installed
+    monitor._on_checkin(None, second_record)
+
+    data = monitor.jsonify()
+    assert data["currently_held"] == []
+    assert len(data["longest_held"]) == 1
+    (stats,) = data["longest_held"].values()
+    assert stats["checkouts"] == 2
+
+    monitor.reset()
+    data = monitor.jsonify()
+    assert data["checkouts"] == 0
+    assert data["longest_held"] == {}
+
+
+def test_overflow_is_not_negative():
+    from pajbot.managers.db_monitor import DBPoolMonitor
+
+    from sqlalchemy.pool import QueuePool
+
+    monitor = DBPoolMonitor()
+    monitor.pool = QueuePool(lambda: None, pool_size=10, max_overflow=20)
+
+    data = monitor.jsonify()
+    assert data["pool_size"] == 10
+    assert data["overflow"] == 0
+
+
+def test_monitored_scope(caplog):
+    from contextlib import contextmanager
+
+    from pajbot.managers.db_monitor import DBPoolMonitor
+
+    monitor = DBPoolMonitor()
+
+    @contextmanager
+    @monitor.monitored_scope
+    def scope():
+        yield "connection"
+
+    with scope() as connection:
+        assert connection == "connection"
+    assert monitor.num_slow_scopes == 0
+
+    monitor.SLOW_SCOPE_THRESHOLD = 0.0
+    try:
+        with scope():
+            raise ValueError()
+    except ValueError:
+        pass
+
+    assert monitor.num_slow_scopes == 1
+    assert "test_db_monitor.py" in caplog.text
@@ -0,0 +1,111 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "statement,expected",
+    [
+        (
+            'SELECT "user".id, "user".login FROM "user" WHERE "user".login = %(login_1)s LIMIT %(param_1)s',
+            'SELECT "user".id, "user".login FROM "user" WHERE "user".login = ? LIMIT ?',
+        ),
+        (
+            "SELECT * FROM banphrase\n    WHERE id = 5 AND phrase = 'it''s 1 phrase'",
+            "SELECT * FROM banphrase WHERE id = ? AND phrase = ?",
+        ),
+        ('SELECT id FROM "user" WHERE id IN (1, 2, 3)', 'SELECT id FROM "user" WHERE id IN (?, ...)'),
+        ("SELECT id FROM \"user\" WHERE id = ANY(ARRAY['1','2'])", 'SELECT id FROM "user" WHERE id = ANY(ARRAY[?])'),
+        (
+            "INSERT INTO points_ledger_entry(user_id, amount) VALUES ('1', 5),('2', -3),('3', NULL)",
+            "INSERT INTO points_ledger_entry(user_id, amount) VALUES (?, ...), ...",
+        ),
+        (
+            "UPDATE \"user\" SET points = \"user\".points + v.amount FROM (VALUES ('1', 5::bigint),('2', 7::bigint)) "
+            'AS v(id, amount) WHERE "user".id = v.id',
+            'UPDATE "user" SET points = "user".points + v.amount FROM (VALUES (?, ?::bigint), ...) '
+            'AS v(id, amount) WHERE "user".id = v.id',
+        ),
+        ("SELECT num_lines_1 FROM user_1 WHERE x IS NULL", "SELECT num_lines_1 FROM user_1 WHERE x IS NULL"),
+    ],
+)
+def test_fingerprint(statement, expected):
+    from pajbot.managers.db_query_stats import fingerprint
+
+    assert fingerprint(statement) == expected
+
+
+def test_record_and_jsonify():
+    from pajbot.managers.db_query_stats import DBQueryMonitor
+
+    monitor = DBQueryMonitor()
+    for user_id, duration in (("1", 0.001), ("2", 0.003)):
+        monitor.record(f"SELECT * FROM \"user\" WHERE id = '{user_id}'", duration)
+    monitor.record("SELECT 1", 0.0001)
+
+    data = monitor.jsonify()
+    assert len(data) == 2
+    assert data[0]["fingerprint"] == 'SELECT * FROM "user" WHERE id = ?'
+    assert data[0]["call_site"].startswith("pajbot/tests/test_db_query_stats.py:")
+    assert data[0]["count"] == 2
+    assert round(data[0]["total_ms"], 6) == 4.0
+    assert round(data[0]["avg_ms"], 6) == 2.0
+    assert round(data[0]["max_ms"], 6) == 3.0
+
+    monitor.MAX_ENTRIES = 2
+    monitor.record("SELECT 2 FROM playsound", 0.001)
+    assert (monitor.OTHER_KEY[0], monitor.OTHER_KEY[1]) in monitor.queries
+
+    monitor.reset()
+    assert monitor.jsonify() == []
+
+
+def test_merge_query_stats():
+    from pajbot.managers.db_query_stats import merge_query_stats
+
+    def entry(query_fingerprint, call_site, count, total_ms, max_ms):
+        return {
+            "fingerprint": query_fingerprint,
+            "call_site": call_site,
+            "count": count,
+            "total_ms": total_ms,
+            "avg_ms": total_ms / count,
+            "max_ms": max_ms,
+        }
+
+    merged = merge_query_stats(
+        {
+            "bot": [entry("SELECT ?", "a.py:1 (a)", 2, 10.0, 8.0), entry("SELECT ?", "b.py:1 (b)", 1, 1.0, 1.0)],
+            "web": [entry("SELECT ?", "a.py:1 (a)", 2, 30.0, 20.0)],
+        }
+    )
+
+    assert [query["call_site"] for query in merged] == ["a.py:1 (a)", "b.py:1 (b)"]
+    assert merged[0]["count"] == 4
+    assert merged[0]["total_ms"] == 40.0
+    assert merged[0]["avg_ms"] == 10.0
+    assert merged[0]["max_ms"] == 20.0
+    assert merged[0]["processes"] == ["bot", "web"]
+    assert merged[1]["processes"] == ["bot"]
+
+
+def test_cursor_execute_hooks():
+    from pajbot.managers.db_query_stats import DBQueryMonitor, MonitoredCursor
+
+    from sqlalchemy import create_engine, text
+
+    monitor = DBQueryMonitor()
+    previous_monitor = MonitoredCursor.monitor
+    try:
+        engine = create_engine("sqlite://")
+        monitor.install(engine)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :value"), {"value": 1})
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM table_that_does_not_exist"))
+    finally:
+        MonitoredCursor.monitor = previous_monitor
+
+    data = {query["fingerprint"]: query for query in monitor.jsonify()}
+    assert data["SELECT ?"]["count"] == 1
+    assert data["SELECT ?"]["call_site"].endswith("(test_cursor_execute_hooks)")
+    assert data["SELECT * FROM table_that_does_not_exist"]["count"] == 1
@@ -0,0 +1,25 @@
+def test_contains_emoji():
+    from pajbot.emoji import ALL_EMOJI, contains_emoji
+
+    assert contains_emoji("hello 😀") is True
+    assert contains_emoji("keycap #️⃣") is True
+    assert contains_emoji("🏴󠁧󠁢󠁳󠁣󠁴󠁿") is True
+    assert contains_emoji("© 2024") is True
+    assert contains_emoji("") is False
+    assert contains_emoji("forsen LULW #1 2*3") is False
+
+    # Same result as looking for every emoji in the message
+    for emoji in ALL_EMOJI:
+        assert contains_emoji(f"xd {emoji} xd") is True
+
+
+def test_count_emoji():
+    from pajbot.emoji import ALL_EMOJI, count_emoji
+
+    assert count_emoji("no emoji here #1") == 0
+    assert count_emoji("😀😀 😀") == 3
+    # Sequences count as one emoji each
+    assert count_emoji("👨‍👩‍👧 🇸🇪 1️⃣ 👍🏽") == 4
+
+    for emoji in ALL_EMOJI:
+        assert count_emoji(emoji) == 1
@@ -0,0 +1,30 @@
+def make_emote(code, provider):
+    from pajbot.models.emote import Emote
+
+    return Emote(code=code, provider=provider, id=f"{provider}-{code}", urls={}, max_width=28, max_height=28)
+
+
+def test_emote_lookup_table_precedence():
+    from pajbot.managers.emote import EmoteLookupTable
+
+    ffz_channel = [make_emote("LULW", "ffz")]
+    bttv_channel = [make_emote("LULW", "bttv"), make_emote("monkaS", "bttv")]
+    bttv_global = [make_emote("monkaS", "bttv-global"), make_emote(":tf:", "bttv-global")]
+
+    table = EmoteLookupTable([ffz_channel, bttv_channel, bttv_global])
+
+    assert table.match("LULW").provider == "ffz"
+    assert table.match("monkaS").provider == "bttv"
+    assert table.match(":tf:").provider == "bttv-global"
+    assert table.match("lulw") is None
+    assert table.match("") is None
+    assert table.match("x") is None
+    assert table.match("LULWLULWLULW") is None
+
+
+def test_empty_emote_lookup_table():
+    from pajbot.managers.emote import EmoteLookupTable
+
+    table = EmoteLookupTable([])
+    assert table.match("") is None
+    assert table.match("Kappa") is None
@@ -0,0 +1,22 @@
+def test_epm_counter():
+    from pajbot.managers.emote import EpmCounter
+
+    counter = EpmCounter(1000)
+    assert counter.add(1000, 2) == 2
+    assert counter.add(1000, 1) == 3
+    assert counter.add(1030, 5) == 8
+
+    # the uses from second 1000 leave the window after 60 seconds
+    counter.advance(1059)
+    assert counter.total == 8
+    counter.advance(1060)
+    assert counter.total == 5
+
+    assert counter.add(1089, 1) == 6
+    counter.advance(1090)
+    assert counter.total == 1
+
+    # long breaks clear everything
+    counter.advance(5000)
+    assert counter.total == 0
+    assert counter.add(5000, 4) == 4
@@ -0,0 +1,51 @@
+def test_handler_stats():
+    from pajbot.managers.handler import HandlerManager
+
+    HandlerManager.init_handlers()
+    HandlerManager.reset_stats()
+
+    class TestModule:
+        def on_message(self, **rest):
+            return False
+
+        def on_message_late(self, **rest):
+            raise ValueError("oops")
+
+    module = TestModule()
+    HandlerManager.add_handler("on_message", module.on_message, priority=10)
+    HandlerManager.add_handler("on_message", module.on_message_late, run_if_propagation_stopped=True)
+
+    for _ in range(3):
+        HandlerManager.trigger("on_message", message="xd")
+
+    stats = HandlerManager.jsonify_stats()["on_message"]
+    assert stats["TestModule.on_message"]["calls"] == 3
+    assert stats["TestModule.on_message"]["propagation_stops"] == 3
+    assert stats["TestModule.on_message"]["exceptions"] == 0
+    assert stats["TestModule.on_message_late"]["calls"] == 3
+    assert stats["TestModule.on_message_late"]["exceptions"] == 3
+    assert sum(stats["TestModule.on_message"]["histogram"].values()) == 3
+
+    # Stats are kept after the handler is removed
+    HandlerManager.remove_handler("on_message", module.on_message)
+    HandlerManager.trigger("on_message", message="xd")
+    stats = HandlerManager.jsonify_stats()["on_message"]
+    assert stats["TestModule.on_message"]["calls"] == 3
+    assert stats["TestModule.on_message_late"]["calls"] == 4
+
+    HandlerManager.remove_handler("on_message", module.on_message_late)
+
+
+def test_handler_stats_percentile():
+    from pajbot.managers.handler import HandlerStats
+
+    stats = HandlerStats()
+    for _ in range(98):
+        stats.record(0.0002)
+    stats.record(0.003)
+    stats.record(2.0)
+
+    assert stats.percentile_ms(0.50) == 0.5
+    assert stats.percentile_ms(0.99) == 5.0
+    assert stats.percentile_ms(1.0) is None
+    assert stats.max_time == 2.0
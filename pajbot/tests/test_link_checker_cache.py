@@ -0,0 +1,68 @@
+def test_verdicts():
+    from pajbot.modules.linkchecker import LinkCheckerCache
+
+    cache = LinkCheckerCache(use_redis=False)
+    assert cache.get("https://example.com/") is None
+
+    cache.set("https://example.com/", True, 60)
+    cache.set("https://evil.example.com", False, 60)
+    assert cache.get("https://EXAMPLE.com") is True
+    assert cache.get("https://evil.example.com/") is False
+
+    # A new verdict replaces the old one
+    cache.set("https://example.com", False, 60)
+    assert cache.get("https://example.com") is False
+
+    assert (cache.local_hits, cache.redis_hits, cache.misses) == (3, 0, 1)
+
+
+def test_expiry(monkeypatch):
+    import time
+
+    from pajbot.modules.linkchecker import LinkCheckerCache
+
+    now = 1000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    cache = LinkCheckerCache(use_redis=False)
+    cache.set("https://safe.example.com", True, 30)
+    cache.set("https://bad.example.com", False, 3600)
+
+    now += 29
+    assert cache.get("https://safe.example.com") is True
+    now += 2
+    assert cache.get("https://safe.example.com") is None
+
+    # Only kept in memory for LOCAL_TTL, redis is the one that remembers it for longer
+    now += LinkCheckerCache.LOCAL_TTL
+    cache.purge_expired()
+    assert len(cache.local) == 0
+
+
+def test_lru():
+    from pajbot.modules.linkchecker import LinkCheckerCache
+
+    cache = LinkCheckerCache(use_redis=False, max_size=2)
+    cache.set("https://a.com", True, 60)
+    cache.set("https://b.com", True, 60)
+    assert cache.get("https://a.com") is True
+    cache.set("https://c.com", True, 60)
+
+    assert cache.get("https://a.com") is True
+    assert cache.get("https://b.com") is None
+    assert cache.get("https://c.com") is True
+
+
+def test_forget():
+    from pajbot.modules.linkchecker import LinkCheckerCache
+
+    cache = LinkCheckerCache(use_redis=False)
+    cache.set("https://safe.com", True, 60)
+    cache.set("https://bad.com", False, 60)
+
+    cache.forget(safe=True)
+    assert cache.get("https://safe.com") is None
+    assert cache.get("https://bad.com") is False
+
+    cache.publish_stats()
+    assert (cache.local_hits, cache.redis_hits, cache.misses) == (0, 0, 0)
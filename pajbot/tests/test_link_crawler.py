@@ -0,0 +1,59 @@
+import pytest
+
+
+def test_link_extractor_streaming():
+    from pajbot.link_crawler import LinkExtractor
+
+    html = (
+        '<html><body><a href="https://example.com/a">a</a> <A HREF="//cdn.example.com/b">b</A>'
+        '<a href="/relative">c</a><a>d</a><a href="https://example.com/a">again</a>'
+        '<a class="x" href="http://example.com/?a=1&amp;b=2">e</a></body></html>'
+    )
+
+    extractor = LinkExtractor()
+    # Tags and attributes may be split between chunks
+    for i in range(0, len(html), 7):
+        extractor.feed(html[i : i + 7])
+
+    assert extractor.links == ["https://example.com/a", "http://cdn.example.com/b", "http://example.com/?a=1&b=2"]
+
+
+def test_crawl_single_flight():
+    import threading
+
+    from pajbot.link_crawler import LinkCrawler
+
+    crawler = LinkCrawler("test")
+    release = threading.Event()
+    calls = []
+
+    def crawl():
+        calls.append(1)
+        release.wait(5)
+        return True
+
+    first = crawler.crawl("https://example.com", crawl)
+    second = crawler.crawl("https://example.com", crawl)
+    other = crawler.crawl("https://example.org", crawl)
+    assert first is second
+    assert other is not first
+
+    release.set()
+    assert first.result(5) is True
+    assert other.result(5) is True
+    assert len(calls) == 2
+
+    # Once it's done, the next crawl of the same key runs again
+    assert crawler.crawl("https://example.com", crawl).result(5) is True
+    assert len(calls) == 3
+
+
+def test_host_politeness():
+    from pajbot.link_crawler import LinkCrawler, LinkCrawlerHostBusy
+
+    crawler = LinkCrawler("test", host_interval=10, max_host_wait=5)
+    crawler.wait_for_host("https://example.com/a")
+    crawler.wait_for_host("https://other.example.com/a")
+
+    with pytest.raises(LinkCrawlerHostBusy):
+        crawler.wait_for_host("https://EXAMPLE.com/b")
@@ -0,0 +1,53 @@
+def test_link_index_find():
+    from pajbot.modules.linkchecker import LinkIndex
+
+    index: LinkIndex[str] = LinkIndex()
+    index.add("pajlada.se", "/", "all of pajlada.se")
+    index.add("www.forsen.tv", "/clips", "forsen.tv clips")
+    index.add("forsen.tv", "/clips/abc/", "one forsen.tv clip")
+
+    def find(domain, path):
+        return sorted(index.find(domain, path))
+
+    assert find("pajlada.se", "/") == ["all of pajlada.se"]
+    assert find("test.pajlada.se", "/foo/bar") == ["all of pajlada.se"]
+    assert find("xpajlada.se", "/") == []
+    assert find("pajlada.com", "/") == []
+    assert find("forsen.tv", "/") == []
+    assert find("forsen.tv", "/clips") == ["forsen.tv clips"]
+    assert find("www.forsen.tv", "/clips/") == ["forsen.tv clips"]
+    assert find("forsen.tv", "/clipsxd") == []
+    assert find("forsen.tv", "/clips/abc/def") == ["forsen.tv clips", "one forsen.tv clip"]
+    assert len(index) == 3
+
+    index.remove("forsen.tv", "/clips/abc/", "one forsen.tv clip")
+    assert find("forsen.tv", "/clips/abc/def") == ["forsen.tv clips"]
+    assert len(index) == 2
+
+
+def test_link_index_matches_linear_scan():
+    import random
+
+    from pajbot.modules.linkchecker import BlacklistedLink, LinkIndex
+
+    rng = random.Random(1337)
+    labels = ["a", "b", "www", "pajlada", "se", "com", ""]
+    segments = ["", "a", "b", "ab", "c"]
+
+    def random_domain():
+        return ".".join(rng.choice(labels) for _ in range(rng.randint(1, 4)))
+
+    def random_path():
+        return "/".join(rng.choice(segments) for _ in range(rng.randint(1, 4)))
+
+    links = [BlacklistedLink(random_domain(), random_path(), 0) for _ in range(300)]
+    index: LinkIndex[BlacklistedLink] = LinkIndex()
+    for link in links:
+        index.add(link.domain, link.path, link)
+
+    for _ in range(2000):
+        domain = random_domain()
+        path = "/" + random_path()
+        expected = [link for link in links if link.is_subdomain(domain) and link.is_subpath(path)]
+        found = list(index.find(domain, path))
+        assert sorted(map(id, found)) == sorted(map(id, expected)), (domain, path)
@@ -0,0 +1,83 @@
+def test_character_counts():
+    import random
+
+    from pajbot.models.message_features import count_characters
+
+    rng = random.Random(1337)
+    # ASCII, accented and fullwidth letters, title case, roman numerals, hangul, emoji, a combining accent and a
+    # zero width space
+    alphabet = "aZ09 !?.\t_ÄäßǅⅫｆ테😂\u0301\u200b"
+    messages = ["", "Hello World!", "ABC abc 123", "ÄÖÜ äöü"]
+    messages += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 40))) for _ in range(500)]
+
+    for message in messages:
+        counts = count_characters(message)
+        assert counts.lowercase == sum(1 for c in message if c.islower()), message
+        assert counts.uppercase == sum(1 for c in message if c.isupper()), message
+        assert counts.non_alnum == sum(not c.isalnum() for c in message), message
+
+
+def test_words():
+    from pajbot.models.message_features import MessageFeatures
+
+    features = MessageFeatures("a b  b b a")
+    assert features.words == ["a", "b", "", "b", "b", "a"]
+    assert features.word_frequency == {"a": 2, "b": 3, "": 1}
+    assert features.longest_repeat_run == 2
+    assert MessageFeatures("xd xd xd").longest_repeat_run == 3
+
+
+def test_emotes():
+    from pajbot.models.emote import Emote, EmoteInstance
+    from pajbot.models.message_features import MessageFeatures
+
+    kappa = Emote("Kappa", "twitch", "25", {}, 28, 28)
+    lulw = Emote("LULW", "ffz", "1", {}, 28, 28)
+
+    features = MessageFeatures("Kappa LULW Kappa 😂")
+    assert features.num_emotes == 0
+    assert features.emote_providers == frozenset()
+    assert features.contains_emoji is True
+
+    features.set_emotes_and_urls(
+        [EmoteInstance(0, 5, kappa), EmoteInstance(6, 10, lulw), EmoteInstance(11, 16, kappa)], set()
+    )
+    assert features.num_emotes == 3
+    assert features.emote_providers == {"twitch", "ffz"}
+
+
+def test_module_handlers_accept_features():
+    import inspect
+
+    from pajbot.modules import available_modules
+
+    # The keyword arguments the bot triggers the message handlers with
+    handler_kwargs = {
+        "on_pubmsg": ["source", "message", "tags", "features"],
+        "on_message": [
+            "source",
+            "message",
+            "emote_instances",
+            "emote_counts",
+            "whisper",
+            "urls",
+            "msg_id",
+            "event",
+            "features",
+        ],
+    }
+
+    num_checked = 0
+    for module in available_modules:
+        for event, kwargs in handler_kwargs.items():
+            handler = getattr(module, event, None)
+            if handler is None:
+                continue
+
+            try:
+                inspect.signature(handler).bind(module, **{kwarg: None for kwarg in kwargs})
+            except TypeError as e:
+                raise AssertionError(f"{module.__name__}.{event} can't be triggered: {e}") from e
+            num_checked += 1
+
+    assert num_checked > 0
@@ -0,0 +1,151 @@
+import threading
+
+
+def test_moderation_dispatcher_priority():
+    from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
+
+    dispatcher = ModerationDispatcher(num_workers=1)
+
+    # Keep the only worker busy until all actions are queued
+    blocker = threading.Event()
+    dispatcher.submit(ModerationPriority.DELETE, None, None, blocker.wait)
+
+    executed = []
+    dispatcher.submit(ModerationPriority.DELETE, None, ("delete", "a"), executed.append, "delete a")
+    dispatcher.submit(ModerationPriority.TIMEOUT, "b", ("timeout", "b", 600), executed.append, "timeout b")
+    dispatcher.submit(ModerationPriority.BAN, "c", ("ban", "c"), executed.append, "ban c")
+    dispatcher.submit(ModerationPriority.DELETE, None, ("delete", "d"), executed.append, "delete d")
+    dispatcher.submit(ModerationPriority.BAN, "e", ("ban", "e"), executed.append, "ban e")
+
+    blocker.set()
+    dispatcher.join()
+
+    assert executed == ["ban c", "ban e", "timeout b", "delete a", "delete d"]
+
+    data = dispatcher.jsonify()
+    assert data["submitted"] == 6
+    assert data["actions"]["BAN"]["completed"] == 2
+    assert data["actions"]["DELETE"]["completed"] == 3
+
+
+def test_moderation_dispatcher_dedup():
+    from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
+
+    dispatcher = ModerationDispatcher(num_workers=1)
+
+    executed = []
+    assert dispatcher.submit(ModerationPriority.TIMEOUT, "a", ("timeout", "a", 600), executed.append, "timeout a 600")
+    assert not dispatcher.submit(
+        ModerationPriority.TIMEOUT, "a", ("timeout", "a", 600), executed.append, "timeout a 600"
+    )
+    # A longer timeout is a different action
+    assert dispatcher.submit(ModerationPriority.TIMEOUT, "a", ("timeout", "a", 3600), executed.append, "timeout a 3600")
+    dispatcher.join()
+
+    assert executed == ["timeout a 600", "timeout a 3600"]
+    assert dispatcher.num_deduplicated == 1
+
+
+def test_moderation_dispatcher_dedup_undone_actions():
+    from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
+
+    dispatcher = ModerationDispatcher(num_workers=1)
+
+    executed = []
+    assert dispatcher.submit(ModerationPriority.BAN, "a", ("ban", "a"), executed.append, "ban a")
+    assert dispatcher.submit(ModerationPriority.UNBAN, "a", ("unban", "a"), executed.append, "unban a")
+    # The unban undid the first ban, so this one isn't a duplicate
+    assert dispatcher.submit(ModerationPriority.BAN, "a", ("ban", "a"), executed.append, "ban a")
+    assert not dispatcher.submit(ModerationPriority.BAN, "a", ("ban", "a"), executed.append, "ban a")
+
+    assert dispatcher.submit(ModerationPriority.TIMEOUT, "b", ("timeout", "b", 600), executed.append, "timeout b")
+    assert dispatcher.submit(ModerationPriority.UNBAN, "b", ("untimeout", "b"), executed.append, "untimeout b")
+    assert dispatcher.submit(ModerationPriority.TIMEOUT, "b", ("timeout", "b", 600), executed.append, "timeout b")
+    # Only the keys of user b are forgotten
+    assert not dispatcher.submit(ModerationPriority.BAN, "a", ("ban", "a"), executed.append, "ban a")
+    dispatcher.join()
+
+    assert [action for action in executed if action.endswith(" a")] == ["ban a", "unban a", "ban a"]
+    assert [action for action in executed if action.endswith(" b")] == ["timeout b", "untimeout b", "timeout b"]
+    assert dispatcher.num_deduplicated == 2
+
+
+def test_moderation_dispatcher_dedup_window():
+    import time
+
+    from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
+
+    dispatcher = ModerationDispatcher(num_workers=1)
+
+    executed = []
+    for _ in range(2):
+        assert dispatcher.submit(
+            ModerationPriority.TIMEOUT, "a", ("timeout", "a", 1), executed.append, "timeout a 1", dedup_window=0.05
+        )
+        assert not dispatcher.submit(
+            ModerationPriority.TIMEOUT, "a", ("timeout", "a", 1), executed.append, "timeout a 1", dedup_window=0.05
+        )
+        # The first timeout has expired, the user's new messages must be purged again
+        time.sleep(0.1)
+    dispatcher.join()
+
+    assert executed == ["timeout a 1", "timeout a 1"]
+
+
+def test_moderation_dispatcher_bounded():
+    from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
+
+    dispatcher = ModerationDispatcher(num_workers=1, max_queue_size=2)
+
+    blocker = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        blocker.wait()
+
+    def fail():
+        raise ValueError("oops")
+
+    dispatcher.submit(ModerationPriority.BAN, None, None, block)
+    started.wait()
+
+    assert dispatcher.submit(ModerationPriority.BAN, None, None, fail)
+    assert dispatcher.submit(ModerationPriority.BAN, None, None, fail)
+    assert not dispatcher.submit(ModerationPriority.BAN, None, None, fail)
+
+    blocker.set()
+    dispatcher.join()
+
+    assert dispatcher.num_dropped == 1
+    assert dispatcher.jsonify()["actions"]["BAN"]["failed"] == 2
+
+
+def test_moderation_dispatcher_user_order():
+    from pajbot.moderation_dispatcher import ModerationDispatcher, ModerationPriority
+
+    dispatcher = ModerationDispatcher(num_workers=4)
+
+    # Keep the worker of user a busy until all of its actions are queued
+    blocker = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        blocker.wait()
+
+    dispatcher.submit(ModerationPriority.DELETE, "a", None, block)
+    started.wait()
+
+    executed = []
+    dispatcher.submit(ModerationPriority.UNBAN, "a", ("untimeout", "a"), executed.append, "untimeout a")
+    # Higher priority, but must not overtake the untimeout submitted before it
+    dispatcher.submit(ModerationPriority.TIMEOUT, "a", ("timeout", "a", 600), executed.append, "timeout a")
+    dispatcher.submit(ModerationPriority.BAN, "a", ("ban", "a"), executed.append, "ban a")
+
+    blocker.set()
+    dispatcher.join()
+
+    assert executed == ["untimeout a", "timeout a", "ban a"]
+    assert dispatcher.jsonify()["queued"] == 0
+    assert dispatcher._queued_users == {}
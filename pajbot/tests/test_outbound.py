@@ -0,0 +1,60 @@
+import threading
+import time
+
+
+def test_sliding_window_limit():
+    from pajbot.managers.outbound import SlidingWindowLimit
+
+    limit = SlidingWindowLimit(2, 30)
+    assert limit.time_until_available(100.0) == 0.0
+    limit.record(100.0)
+    limit.record(110.0)
+    assert limit.time_until_available(120.0) == 10.0
+    assert limit.time_until_available(130.0) == 0.0
+
+
+def test_outbound_lane_priority_and_coalescing():
+    from pajbot.managers.outbound import OutboundLane, OutboundPriority, SlidingWindowLimit
+
+    lane = OutboundLane("test", [SlidingWindowLimit(100, 30)], max_backlog=2)
+
+    sent = []
+    blocker = threading.Event()
+
+    def block():
+        blocker.wait()
+        return True
+
+    lane.submit(OutboundPriority.REPLY, "block", block, ())
+    while lane._in_flight is None:
+        time.sleep(0.01)
+
+    assert lane.submit(OutboundPriority.BULK, "timer", sent.append, ("timer",))
+    assert lane.submit(OutboundPriority.REPLY, "reply", sent.append, ("reply",))
+    # identical to a message that is still queued
+    assert not lane.submit(OutboundPriority.REPLY, "reply", sent.append, ("reply",))
+    # too many messages are queued for bulk messages
+    assert not lane.submit(OutboundPriority.BULK, "raffle", sent.append, ("raffle",))
+    assert lane.submit(OutboundPriority.MODERATION, "notice", sent.append, ("notice",))
+
+    blocker.set()
+    assert lane.flush(timeout=5)
+
+    assert sent == ["notice", "reply", "timer"]
+    assert lane.num_coalesced == 1
+    assert lane.num_dropped == 1
+
+
+def test_outbound_lane_rate_limit():
+    from pajbot.managers.outbound import OutboundLane, OutboundPriority, SlidingWindowLimit
+
+    lane = OutboundLane("test", [SlidingWindowLimit(2, 0.5)], max_backlog=100)
+
+    sent_at = []
+    for i in range(4):
+        lane.submit(OutboundPriority.REPLY, i, lambda: sent_at.append(time.monotonic()), ())
+
+    assert lane.flush(timeout=5)
+    assert len(sent_at) == 4
+    # the third message had to wait for the first one to leave the window
+    assert sent_at[2] - sent_at[0] >= 0.5
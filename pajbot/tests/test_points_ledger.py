@@ -0,0 +1,237 @@
+import pytest
+
+
+def _make_user(user_id: str, points: int):
+    from pajbot.models.user import User
+
+    from sqlalchemy.orm import make_transient_to_detached
+
+    user = User()
+    user.id = user_id
+    user._login = user_id
+    user.name = user_id
+    user.points = points
+    make_transient_to_detached(user)
+    return user
+
+
+@pytest.fixture
+def ledger():
+    from pajbot.managers.points_ledger import PointsLedger
+    from pajbot.models.user import User
+
+    from sqlalchemy import event
+
+    ledger = PointsLedger()
+    yield ledger
+    event.remove(User, "load", ledger._on_load)
+    event.remove(User, "refresh", ledger._on_refresh)
+
+
+def test_changes_are_buffered_as_increments(ledger) -> None:
+    from sqlalchemy import inspect
+
+    source = _make_user("1", 100)
+    target = _make_user("2", 0)
+
+    assert ledger.transfer(source, target, 30, "Gave points")
+    assert not ledger.transfer(source, target, 1000, "Gave points")
+    ledger.add(target, 5, "Won a roulette")
+    ledger.set(source, 50, "Set by an admin")
+
+    assert (source.points, target.points) == (50, 35)
+    assert ledger._pending == {"1": -50, "2": 35}
+    assert [(entry.user_id, entry.amount, entry.other_user_id) for entry in ledger._entries] == [
+        ("1", -30, "2"),
+        ("2", 30, "1"),
+        ("2", 5, None),
+        ("1", -20, None),
+    ]
+
+    # The new values must not be written by the ORM, the ledger writes the increments
+    assert not inspect(source).attrs.points.history.has_changes()
+
+
+def test_new_users_get_their_points_from_the_insert(ledger) -> None:
+    from pajbot.models.user import User
+
+    user = User()
+    user.id = "1"
+    ledger.add(user, 10, "New chatter")
+
+    assert user.points == 10
+    assert ledger._pending == {}
+    assert len(ledger._entries) == 1
+
+
+def test_reservations(ledger) -> None:
+    user = _make_user("1", 100)
+
+    assert ledger.reserve(user, 101, "Lost a roulette") is None
+
+    released = ledger.reserve(user, 60, "Lost a roulette")
+    assert released is not None
+    assert user.points == 40
+    # The reserved points can't be spent twice
+    assert ledger.reserve(user, 60, "Lost a roulette") is None
+    assert not ledger.spend(user, 41, "Bought lottery tickets")
+    # Users loaded in the meantime don't have them either
+    loaded = _make_user("1", 100)
+    ledger._on_load(loaded, None)
+    assert loaded.points == 40
+
+    released.release()
+    assert user.points == 100
+    assert ledger._balances == {}
+    assert ledger._entries == []
+
+    with ledger.reserve(user, 25, "Used !ping"):
+        pass
+    assert user.points == 75
+    assert ledger._pending == {"1": -25}
+    assert ledger._reserved == {}
+
+    with pytest.raises(ValueError):
+        with ledger.reserve(user, 25, "Used !ping"):
+            raise ValueError()
+    assert user.points == 75
+    assert ledger._pending == {"1": -25}
+
+
+def test_copies_of_a_user_share_the_balance(ledger) -> None:
+    first_copy = _make_user("1", 100)
+    second_copy = _make_user("1", 100)
+    target = _make_user("2", 0)
+
+    assert ledger.spend(first_copy, 80, "Bought lottery tickets")
+    # The second copy still says 100, but the points are gone
+    assert not ledger.spend(second_copy, 80, "Bought lottery tickets")
+    assert ledger.reserve(second_copy, 30, "Lost a roulette") is None
+    assert not ledger.transfer(second_copy, target, 30, "Gave points")
+    assert second_copy.points == 20
+
+    assert ledger.reserve(second_copy, 20, "Lost a roulette") is not None
+    assert not ledger.spend(first_copy, 1, "Bought lottery tickets")
+    assert first_copy.points == 0
+
+    ledger.set(second_copy, 50, "Set by an admin")
+    assert ledger.balance(first_copy) == 50
+    # -80 spent, +50 set, the reserved 20 are not written yet
+    assert ledger._pending == {"1": -30}
+
+
+class FakeDB:
+    """Points of the users in the fake database, written by the ledger's UPDATE"""
+
+    def __init__(self) -> None:
+        self.points: dict[str, int] = {}
+        # Called while the ledger's UPDATE runs
+        self.during_write = lambda: None
+        self.fail = False
+
+    def execute_values(self, cursor, sql, argslist, template=None, fetch=False):
+        if not fetch:
+            return None
+
+        self.during_write()
+        if self.fail:
+            raise RuntimeError("connection lost")
+
+        for user_id, amount in argslist:
+            self.points[user_id] += amount
+        return [(user_id, self.points[user_id]) for user_id, _ in argslist]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    from contextlib import contextmanager
+
+    from pajbot.managers import points_ledger
+    from pajbot.managers.db import DBManager
+
+    db = FakeDB()
+
+    @contextmanager
+    def create_dbapi_cursor_scope():
+        yield None
+
+    monkeypatch.setattr(DBManager, "create_dbapi_cursor_scope", create_dbapi_cursor_scope)
+    monkeypatch.setattr(points_ledger, "execute_values", db.execute_values)
+    return db
+
+
+def test_loads_during_commit_count_changes_once(ledger, fake_db) -> None:
+    fake_db.points["1"] = 100
+    user = _make_user("1", 100)
+    assert ledger.spend(user, 30, "Bought lottery tickets")
+
+    loaded = []
+
+    def load(points):
+        loaded_user = _make_user("1", points)
+        ledger._on_load(loaded_user, None)
+        loaded.append(loaded_user.points)
+
+    def during_write():
+        # Loaded before the UPDATE is visible
+        load(fake_db.points["1"])
+        # Changed while the UPDATE is in flight
+        assert ledger.spend(user, 5, "Bought lottery tickets")
+
+    fake_db.during_write = during_write
+    ledger.commit()
+    # Loaded after the UPDATE, but before the ledger has seen it finish
+    load(fake_db.points["1"])
+
+    assert fake_db.points["1"] == 70
+    assert loaded == [70, 65]
+    assert ledger._in_flight == {}
+    assert ledger._pending == {"1": -5}
+    assert ledger.balance(_make_user("1", 70)) == 65
+
+    fake_db.during_write = lambda: None
+    ledger.commit()
+    assert fake_db.points["1"] == 65
+    assert ledger._balances == {}
+    assert ledger._pending == {}
+
+    # Nothing unwritten, the database is right again
+    load(65)
+    assert loaded[-1] == 65
+
+
+def test_commit_picks_up_changes_done_by_others(ledger, fake_db) -> None:
+    fake_db.points["1"] = 100
+    user = _make_user("1", 100)
+    assert ledger.spend(user, 30, "Bought lottery tickets")
+
+    def during_write():
+        # e.g. points for watching given by the chatters refresh, and another spend while the commit runs
+        fake_db.points["1"] += 10
+        assert ledger.spend(user, 5, "Bought lottery tickets")
+
+    fake_db.during_write = during_write
+    ledger.commit()
+
+    assert fake_db.points["1"] == 80
+    assert ledger.balance(user) == 75
+    assert user.points == 75
+
+
+def test_failed_commit_is_retried(ledger, fake_db) -> None:
+    fake_db.points["1"] = 100
+    user = _make_user("1", 100)
+    assert ledger.spend(user, 30, "Bought lottery tickets")
+
+    fake_db.fail = True
+    ledger.commit()
+    assert ledger._pending == {"1": -30}
+    assert ledger._in_flight == {}
+    assert len(ledger._entries) == 1
+    assert ledger.balance(user) == 70
+
+    fake_db.fail = False
+    ledger.commit()
+    assert fake_db.points["1"] == 70
+    assert ledger._pending == {}
+    assert ledger._entries == []
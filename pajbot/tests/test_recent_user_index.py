@@ -0,0 +1,76 @@
+def test_count_known_users():
+    from pajbot.modules.massping import RecentUserIndex
+
+    index = RecentUserIndex()
+    index.see("1", "pajlada", "pajlada")
+    index.see("2", "testaccount_420", "테스트계정420")
+    index.see("3", "forsen", "Forsen")
+
+    assert index.count_known_users(set()) == 0
+    assert index.count_known_users({"pajlada", "forsen", "nobody"}) == 2
+    # The login and display name of the same user count once
+    assert index.count_known_users({"testaccount_420", "테스트계정420"}) == 1
+    assert len(index) == 3
+
+
+def test_renamed_user():
+    from pajbot.modules.massping import RecentUserIndex
+
+    index = RecentUserIndex()
+    index.see("1", "oldname", "OldName")
+    index.see("1", "newname", "NewName")
+
+    assert index.count_known_users({"oldname"}) == 0
+    assert index.count_known_users({"newname"}) == 1
+
+
+def test_expiry(monkeypatch):
+    import time
+
+    from pajbot.modules.massping import KNOWN_USER_MAX_AGE, RecentUserIndex
+
+    now = 1_000_000_000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    index = RecentUserIndex()
+    index.see("1", "pajlada", "pajlada", now - KNOWN_USER_MAX_AGE.total_seconds() - 1)
+    index.see("2", "forsen", "forsen")
+    # An older sighting doesn't make a user less recent
+    index.see("2", "forsen", "forsen", now - KNOWN_USER_MAX_AGE.total_seconds() - 1)
+
+    assert index.count_known_users({"pajlada", "forsen"}) == 1
+
+    index.prune()
+    assert len(index) == 1
+    assert "pajlada" not in index.names
+
+
+def test_enable_twice(monkeypatch):
+    from types import SimpleNamespace
+
+    from pajbot.managers.schedule import ScheduleManager
+    from pajbot.modules.massping import MassPingProtectionModule
+
+    jobs = []
+
+    def execute_every(interval, method):
+        job = SimpleNamespace(remove=lambda: None)
+        jobs.append(job)
+        return job
+
+    monkeypatch.setattr(ScheduleManager, "execute_every", execute_every)
+    submitted = []
+    bot = SimpleNamespace(action_queue=SimpleNamespace(submit=submitted.append))
+
+    module = MassPingProtectionModule(bot)
+    module.enable(bot)
+    # The module manager also enables modules that are already enabled
+    module.enable(bot)
+
+    assert submitted == [module.load_recent_users]
+    assert len(jobs) == 1
+
+    module.disable(bot)
+    module.enable(bot)
+    assert len(submitted) == 2
+    assert len(jobs) == 2
@@ -0,0 +1,14 @@
+def test_twitch_emotes_are_shared():
+    from pajbot.managers.emote import EmoteManager
+
+    message = "Kappa Keepo Kappa"
+    first = EmoteManager.parse_twitch_emotes_tag("25:0-4,12-16/1902:6-10", message)
+    second = EmoteManager.parse_twitch_emotes_tag("25:0-4", "Kappa")
+
+    assert [instance.emote.code for instance in first] == ["Kappa", "Kappa", "Keepo"]
+    assert first[0].emote is first[1].emote
+    assert first[0].emote is second[0].emote
+    assert first[0].emote.urls["1"] == "https://static-cdn.jtvnw.net/emoticons/v2/25/default/dark/1.0"
+
+    # Same ID, different code (e.g. modified emotes) must not share the object
+    assert EmoteManager.twitch_emote("25", "kappa") is not first[0].emote
@@ -57,3 +57,26 @@ def test_find_unique_urls() -> None:
 
     assert find_unique_urls("omg this isn't chatting, this is meme-ing...my vanity") == set()
     assert find_unique_urls("foo 1.40 bar") == set()
+
+
+def test_may_contain_url() -> None:
+    import random
+
+    from pajbot.modules.linkchecker import _extract_unique_urls, may_contain_url
+
+    assert may_contain_url("hello pajlada.se") is True
+    assert may_contain_url("HELLO PAJLADA.SE?") is True
+    assert may_contain_url("see 10.0.0.1") is True
+    assert may_contain_url("http://LOCALHOST/foo") is True
+    assert may_contain_url("no links here") is False
+    assert may_contain_url("forsenE ... okay.") is False
+    assert may_contain_url("file.notatld") is False
+
+    # Whenever it rules a message out, URLExtract must not find anything in it either
+    rng = random.Random(1337)
+    pieces = ["a", "foo", "com", "se", "tv", "xn--p1ai", "рф", "1", "40", "255", "localhost", "http://", "_"]
+    separators = [".", ". ", " ", "/", ",", "!", ":", "?", "-", ")", "'", "\n", ".."]
+    for _ in range(3000):
+        message = "".join(rng.choice(pieces) + rng.choice(separators) for _ in range(rng.randint(1, 6)))
+        if not may_contain_url(message):
+            assert _extract_unique_urls(message) == frozenset(), message
@@ -0,0 +1,80 @@
+def test_rank_scores():
+    from pajbot.managers.user_rank import rank_scores
+
+    # Same as RANK(): users with the same value share a rank, the next rank skips ahead
+    assert rank_scores([("a", 500.0), ("b", 300.0), ("c", 300.0), ("d", 100.0)]) == [
+        ("a", 500, 1),
+        ("b", 300, 2),
+        ("c", 300, 2),
+        ("d", 100, 4),
+    ]
+    assert rank_scores([]) == []
+
+
+def _make_user(user_id: str, points: int, num_lines: int):
+    from pajbot.models.user import User
+
+    from sqlalchemy.orm import make_transient_to_detached
+
+    user = User()
+    user.id = user_id
+    user._login = user_id
+    user.name = user_id
+    user.points = points
+    user.num_lines = num_lines
+    make_transient_to_detached(user)
+    return user
+
+
+def _make_manager(monkeypatch):
+    from pajbot.managers.user_rank import UserRankManager
+
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    manager = UserRankManager({"main": {}})
+    # Only called directly by the tests
+    event.remove(Session, "after_flush", manager._on_after_flush)
+    event.remove(Session, "after_commit", manager._on_after_commit)
+    event.remove(Session, "after_soft_rollback", manager._on_after_soft_rollback)
+
+    updates = []
+    monkeypatch.setattr(manager, "update", lambda column, values: updates.append((column, values)))
+    monkeypatch.setattr(manager, "remove", lambda user_ids: updates.append(("removed", user_ids)))
+    return manager, updates
+
+
+def test_committed_changes_update_the_ranks(monkeypatch):
+    from sqlalchemy.orm import Session
+
+    manager, updates = _make_manager(monkeypatch)
+
+    db_session = Session()
+    user = _make_user("1", 100, 10)
+    unchanged_user = _make_user("2", 100, 10)
+    db_session.add(user)
+    db_session.add(unchanged_user)
+    user.points += 50
+    unchanged_user.moderator = True
+
+    manager._on_after_flush(db_session, None)
+    manager._on_after_commit(db_session)
+
+    assert updates == [("points", {"1": 150}), ("num_lines", {}), ("removed", [])]
+
+
+def test_rolled_back_changes_are_dropped(monkeypatch):
+    from sqlalchemy.orm import Session
+
+    manager, updates = _make_manager(monkeypatch)
+
+    db_session = Session()
+    user = _make_user("1", 100, 10)
+    db_session.add(user)
+    user.points -= 50
+
+    manager._on_after_flush(db_session, None)
+    manager._on_after_soft_rollback(db_session, None)
+    manager._on_after_commit(db_session)
+
+    assert updates == []
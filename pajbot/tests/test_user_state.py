@@ -0,0 +1,146 @@
+import datetime
+
+
+def _make_manager_with_user():
+    from pajbot.managers.user_state import UserStateManager
+    from pajbot.models.user import User
+
+    manager = UserStateManager(max_size=2)
+
+    user = User()
+    user.id = "11148817"
+    user._login = "pajlada"
+    user.name = "pajlada"
+    user.num_lines = 10
+    manager._store(user.id, manager._snapshot(user))
+
+    return manager
+
+
+def test_user_scope_serves_cached_user_and_defers_hot_columns() -> None:
+    from pajbot.models.user import UserBasics
+
+    from sqlalchemy.orm import Session
+
+    manager = _make_manager_with_user()
+    now = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+    db_session = Session()
+    with manager.user_scope(db_session, UserBasics("11148817", "pajlada", "Pajlada")) as user:
+        assert user.num_lines == 10
+        user.num_lines += 1
+        user.last_seen = now
+
+    assert manager.num_hits == 1
+    assert manager._pending["11148817"].num_lines == 1
+    assert manager._pending["11148817"].last_seen == now
+
+    # Only the display name is left to be written by the session
+    assert _changed_attributes(user) == {"name"}
+
+
+def _changed_attributes(user) -> set[str]:
+    from sqlalchemy import inspect
+
+    return {attr.key for attr in inspect(user).attrs if attr.history.has_changes()}
+
+
+def test_user_scope_expunges_unmodified_user() -> None:
+    from pajbot.models.user import UserBasics
+
+    from sqlalchemy.orm import Session
+
+    manager = _make_manager_with_user()
+
+    db_session = Session()
+    with manager.user_scope(db_session, UserBasics("11148817", "pajlada", "pajlada")) as user:
+        user.num_lines += 5
+        user.moderator = False
+
+    assert user not in db_session
+    assert manager._pending["11148817"].num_lines == 5
+    assert manager._get_values("11148817")["num_lines"] == 15
+
+
+def test_cache_is_size_bounded() -> None:
+    manager = _make_manager_with_user()
+
+    manager._store("1", {})
+    manager._store("2", {})
+
+    assert len(manager) == 2
+    assert manager._get_values("11148817") is None
+
+
+def test_commit_counts_lines_loaded_during_the_write_once(monkeypatch) -> None:
+    from contextlib import contextmanager
+
+    from pajbot.managers import user_state
+    from pajbot.managers.db import DBManager
+    from pajbot.models.user import User, UserBasics
+
+    from sqlalchemy.orm import Session, make_transient_to_detached
+
+    manager = _make_manager_with_user()
+    basics = UserBasics("11148817", "pajlada", "pajlada")
+    # num_lines stored in the fake database
+    db = {"11148817": 10}
+    fail = [True]
+    loaded = []
+
+    def from_basics(db_session, basics):
+        user = User()
+        user.id = basics.id
+        user._login = basics.login
+        user.name = basics.name
+        user.num_lines = db[basics.id]
+        user.last_seen = None
+        user.last_active = None
+        make_transient_to_detached(user)
+        db_session.add(user)
+        return user
+
+    def load():
+        manager.invalidate_all()
+        with manager.user_scope(Session(), basics) as user:
+            loaded.append(user.num_lines)
+
+    @contextmanager
+    def create_dbapi_cursor_scope():
+        yield None
+
+    def execute_values(cursor, sql, argslist, template=None, fetch=False):
+        # Loaded before the UPDATE is visible
+        load()
+        if fail[0]:
+            raise RuntimeError("connection lost")
+
+        for user_id, num_lines, _, _ in argslist:
+            db[user_id] += num_lines
+        # Loaded after the UPDATE, but before the manager has seen it finish
+        load()
+        return [(user_id, db[user_id]) for user_id, _, _, _ in argslist]
+
+    monkeypatch.setattr(User, "from_basics", from_basics)
+    monkeypatch.setattr(DBManager, "create_dbapi_cursor_scope", create_dbapi_cursor_scope)
+    monkeypatch.setattr(user_state, "execute_values", execute_values)
+
+    with manager.user_scope(Session(), basics) as user:
+        user.num_lines += 5
+
+    manager.commit()
+    assert loaded == [15]
+    assert manager._in_flight == {}
+    assert manager._pending["11148817"].num_lines == 5
+
+    fail[0] = False
+    manager.commit()
+    assert db["11148817"] == 15
+    assert loaded == [15, 15, 20]
+    assert manager._in_flight == {}
+    assert manager._pending == {}
+    # The copy cached by the load right after the UPDATE has the lines twice, it must not be served
+    assert manager._get_values("11148817") is None
+
+    load()
+    assert loaded[-1] == 15
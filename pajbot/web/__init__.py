@@ -135,14 +135,20 @@ def init(config_path: str) -> None:
 
     DBManager.init(config["main"]["db"])
 
+    @app.teardown_request
+    def publish_query_stats(exception):
+        # The web process has no scheduler, its query stats are published after a request once they are due
+        DBManager.query_stats.publish_stats_if_due("web")
+
     app.module_manager = ModuleManager(None).load()
 
     pajbot.web.routes.admin.init(app)
     pajbot.web.routes.api.init(app)
     pajbot.web.routes.base.init(app)
 
-    # Make a CSRF exemption for the /api/v1/banphrases/test endpoint
+    # Make a CSRF exemption for the /api/v1/banphrases/test endpoints
     csrf.exempt("pajbot.web.routes.api.banphrases.banphrases_test")
+    csrf.exempt("pajbot.web.routes.api.banphrases.banphrases_test_batch")
 
     pajbot.web.common.filters.init(app)
     pajbot.web.common.assets.init(app)
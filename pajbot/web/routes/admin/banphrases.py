@@ -6,7 +6,7 @@ import logging
 
 from pajbot.managers.adminlog import AdminLogManager
 from pajbot.managers.db import DBManager
-from pajbot.models.banphrase import Banphrase, BanphraseData
+from pajbot.models.banphrase import Banphrase, BanphraseData, BanphraseManager
 from pajbot.models.sock import SocketClientManager
 from pajbot.web.utils import requires_level
 
@@ -31,7 +31,14 @@ def init(page) -> None:
                 .order_by(Banphrase.id)
                 .all()
             )
-            return render_template("admin/banphrases.html", banphrases=banphrases)
+
+            try:
+                regex_costs = BanphraseManager.get_regex_costs()
+            except:
+                log.exception("Failed to load banphrase regex costs")
+                regex_costs = {}
+
+            return render_template("admin/banphrases.html", banphrases=banphrases, regex_costs=regex_costs)
 
     @page.route("/banphrases/create", methods=["GET", "POST"])
     @requires_level(500)
@@ -49,6 +56,7 @@ def init(page) -> None:
                 case_sensitive = request.form.get("case_sensitive", "off") == "on"
                 sub_immunity = request.form.get("sub_immunity", "off") == "on"
                 remove_accents = request.form.get("remove_accents", "off") == "on"
+                normalize_confusables = request.form.get("normalize_confusables", "off") == "on"
                 length = int(request.form["length"])
                 phrase = request.form["phrase"]
                 operator = request.form["operator"].strip().lower()
@@ -81,6 +89,7 @@ def init(page) -> None:
                 "case_sensitive": case_sensitive,
                 "sub_immunity": sub_immunity,
                 "remove_accents": remove_accents,
+                "normalize_confusables": normalize_confusables,
                 "length": length,
                 "added_by": user.id,
                 "edited_by": user.id,
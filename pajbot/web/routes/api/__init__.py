@@ -1,6 +1,7 @@
 import pajbot.web.routes.api.banphrases
 import pajbot.web.routes.api.commands
 import pajbot.web.routes.api.common
+import pajbot.web.routes.api.debug
 import pajbot.web.routes.api.modules
 import pajbot.web.routes.api.playsound
 import pajbot.web.routes.api.social
@@ -40,4 +41,9 @@ def init(app) -> None:
     # /playsound/:name/play
     pajbot.web.routes.api.playsound.init(bp)
 
+    # /debug/handlers
+    # /debug/db
+    # /debug/queries
+    pajbot.web.routes.api.debug.init(bp)
+
     app.register_blueprint(bp)
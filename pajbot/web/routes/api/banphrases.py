@@ -1,5 +1,9 @@
+from typing import Any, Optional
+
 import json
 import logging
+import threading
+import time
 from dataclasses import dataclass
 
 import pajbot.modules
@@ -8,7 +12,9 @@ import pajbot.web.utils
 from pajbot.managers.adminlog import AdminLogManager
 from pajbot.managers.db import DBManager
 from pajbot.models.banphrase import Banphrase, BanphraseManager
-from pajbot.models.sock import SocketClientManager
+from pajbot.models.banphrase_matcher import BanphraseMatcher
+from pajbot.models.sock import Handler, HandlerParam, SocketClientManager, SocketManager
+from pajbot.streamhelper import StreamHelper
 from pajbot.web.schemas.toggle_state import ToggleState, ToggleStateSchema
 
 import marshmallow_dataclass
@@ -39,6 +45,83 @@ class TestBanphrase(Schema):
 TestBanphraseSchema = marshmallow_dataclass.class_schema(TestBanphrase)
 
 
+@dataclass
+class TestBanphraseBatch(Schema):
+    messages: list[str]
+
+
+TestBanphraseBatchSchema = marshmallow_dataclass.class_schema(TestBanphraseBatch)
+
+# Most messages that can be tested with one request to /banphrases/test/batch
+MAX_BATCH_SIZE = 100
+
+
+class BanphraseTestEngine:
+    """
+    Keeps the enabled banphrases loaded and compiled in the web process, for /banphrases/test.
+
+    The banphrases are kept up to date through the same banphrase.update/banphrase.remove topics the bot listens to.
+    They are also reloaded from the database every RELOAD_INTERVAL seconds, in case an update got lost
+    (e.g. while redis was reconnecting).
+    """
+
+    RELOAD_INTERVAL = 600.0
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._socket_manager: Optional[SocketManager] = None
+        self._banphrase_manager: Optional[BanphraseManager] = None
+        self._loaded_at = 0.0
+
+    def _run_handler(self, handler: Handler, data: HandlerParam) -> None:
+        with self._lock:
+            try:
+                handler(data)
+            except:
+                log.exception("Unhandled exception while updating banphrases, reloading them on the next request")
+                self._loaded_at = 0.0
+
+    def _load(self) -> BanphraseManager:
+        if self._socket_manager is None:
+            # Subscribed on first use, so every web worker process gets its own subscription
+            self._socket_manager = SocketManager(StreamHelper.get_streamer(), self._run_handler)
+
+        if self._banphrase_manager is None:
+            self._banphrase_manager = BanphraseManager(None, socket_manager=self._socket_manager)
+
+        try:
+            self._banphrase_manager.load()
+        finally:
+            # Nothing is written from here, so don't hold on to a database connection between requests
+            self._banphrase_manager.db_session.close()
+
+        self._loaded_at = time.monotonic()
+        return self._banphrase_manager
+
+    def get_matcher(self) -> BanphraseMatcher:
+        with self._lock:
+            banphrase_manager = self._banphrase_manager
+            if banphrase_manager is None or time.monotonic() - self._loaded_at > self.RELOAD_INTERVAL:
+                banphrase_manager = self._load()
+
+            # The matcher is never modified, only replaced, so it can be used without holding the lock
+            return banphrase_manager.get_matcher()
+
+
+banphrase_test_engine = BanphraseTestEngine()
+
+
+def get_test_result(matcher: BanphraseMatcher, message: str) -> dict[str, Any]:
+    ret: dict[str, Any] = {"banned": False, "input_message": message}
+
+    banphrase = matcher.match(message, None)
+    if banphrase is not None:
+        ret["banned"] = True
+        ret["banphrase_data"] = banphrase.jsonify()
+
+    return ret
+
+
 def init(bp: Blueprint) -> None:
     @bp.route("/banphrases/remove/<int:banphrase_id>", methods=["POST"])
     @pajbot.web.utils.requires_level(500)
@@ -108,19 +191,33 @@ def init(bp: Blueprint) -> None:
         if not message:
             return {"error": "Parameter `message` cannot be empty."}, 400
 
-        ret = {"banned": False, "input_message": message}
+        return get_test_result(banphrase_test_engine.get_matcher(), message)
 
-        banphrase_manager = BanphraseManager(None).load()
+    @bp.route("/banphrases/test/batch", methods=["POST"])
+    def banphrases_test_batch():
+        # Example request:
+        # curl --json '{"messages": ["xD", "forsen"]}' http://localhost:7070/api/v1/banphrases/test/batch
+        json_data = request.get_json(silent=True)
+        if not json_data:
+            return {"error": "Missing json body"}, 400
         try:
-            res = banphrase_manager.check_message(message, None)
-        finally:
-            banphrase_manager.db_session.close()
+            data: TestBanphraseBatch = TestBanphraseBatchSchema().load(json_data)
+        except ValidationError as err:
+            return {"error": f"Did not match schema: {json.dumps(err.messages)}"}, 400
+
+        if not data.messages:
+            return {"error": "Parameter `messages` cannot be empty."}, 400
+
+        if len(data.messages) > MAX_BATCH_SIZE:
+            return {"error": f"At most {MAX_BATCH_SIZE} messages can be tested at once."}, 400
 
-        if res is not False:
-            ret["banned"] = True
-            ret["banphrase_data"] = res.jsonify()
+        messages = [filter_message(message) for message in data.messages]
+        for index, message in enumerate(messages):
+            if not message:
+                return {"error": f"Message {index} in `messages` cannot be empty."}, 400
 
-        return ret
+        matcher = banphrase_test_engine.get_matcher()
+        return {"results": [get_test_result(matcher, message) for message in messages]}
 
     # @bp.route("/banphrases/dump")
     # def banphrases_dump():
@@ -0,0 +1,47 @@
+import json
+
+from pajbot.managers.db import DBManager
+from pajbot.managers.db_query_stats import merge_query_stats
+from pajbot.managers.redis import RedisManager
+from pajbot.streamhelper import StreamHelper
+from pajbot.web.utils import requires_level
+
+from flask import Blueprint
+from flask.typing import ResponseReturnValue
+
+
+def init(bp: Blueprint) -> None:
+    @bp.route("/debug/handlers")
+    @requires_level(1000)
+    def debug_handlers(**options) -> ResponseReturnValue:
+        # Published by the bot every minute, see HandlerManager.publish_stats
+        streamer = StreamHelper.get_streamer()
+        handler_stats = RedisManager.get().get(f"{streamer}:handler_stats")
+        if handler_stats is None:
+            return {"error": "No handler stats have been published by the bot yet"}, 404
+
+        return {"events": json.loads(handler_stats)}
+
+    @bp.route("/debug/db")
+    @requires_level(1000)
+    def debug_db(**options) -> ResponseReturnValue:
+        # The bot publishes its pool stats every minute, see DBPoolMonitor.publish_stats
+        streamer = StreamHelper.get_streamer()
+        bot_stats = RedisManager.get().get(f"{streamer}:db_pool_stats")
+
+        return {
+            "bot": json.loads(bot_stats) if bot_stats is not None else None,
+            "web": DBManager.monitor.jsonify(),
+        }
+
+    @bp.route("/debug/queries")
+    @requires_level(1000)
+    def debug_queries(**options) -> ResponseReturnValue:
+        # The bot publishes its query stats every minute, the web process's own are published right now
+        DBManager.query_stats.publish_stats("web")
+        published = DBManager.query_stats.get_published_stats()
+
+        return {
+            "processes": published,
+            "queries": merge_query_stats(published)[: DBManager.query_stats.NUM_TOP_ENTRIES],
+        }
@@ -1,6 +1,7 @@
 import logging
 
 from pajbot.managers.db import DBManager
+from pajbot.managers.user_rank import get_top
 from pajbot.models.user import User
 from pajbot.models.webcontent import WebContent
 from pajbot.modules import ChattersRefreshModule
@@ -11,10 +12,40 @@ from flask.typing import ResponseReturnValue
 from markupsafe import Markup
 from sqlalchemy import column, text
 from sqlalchemy.future import select
+from sqlalchemy.orm import Session
 
 log = logging.getLogger(__name__)
 
 
+def get_top_users(db_session: Session) -> list[tuple[User, int]]:
+    top = get_top("points", 30)
+    if top is not None:
+        users = {
+            user.id: user for user in db_session.query(User).filter(User.id.in_([user_id for user_id, _, _ in top]))
+        }
+        return [(users[user_id], rank) for user_id, _, rank in top if user_id in users]
+
+    # The user ranks have not been built yet, rank the users in the database instead.
+    # note on the efficiency of this query: takes approx. 0.3-0.4 milliseconds on a 5 million user DB
+    #
+    # pajbot=# EXPLAIN ANALYZE SELECT * FROM (SELECT *, rank() OVER (ORDER BY points DESC) AS rank FROM "user") AS subquery LIMIT 30;
+    #                                                                         QUERY PLAN
+    # ----------------------------------------------------------------------------------------------------------------------------------------------------------
+    #  Limit  (cost=0.43..2.03 rows=30 width=49) (actual time=0.020..0.069 rows=30 loops=1)
+    #    ->  WindowAgg  (cost=0.43..181912.19 rows=4197554 width=49) (actual time=0.020..0.065 rows=30 loops=1)
+    #          ->  Index Scan Backward using user_points_idx on "user"  (cost=0.43..118948.88 rows=4197554 width=41) (actual time=0.012..0.037 rows=31 loops=1)
+    #  Planning Time: 0.080 ms
+    #  Execution Time: 0.089 ms
+    #
+    # (see also the extensive comment on migration revision ID 2, 0002_create_index_on_user_points.py)
+
+    query = select(User, column("rank")).from_statement(
+        text('SELECT * FROM (SELECT *, rank() OVER (ORDER BY points DESC) AS rank FROM "user") AS subquery LIMIT 30')
+    )
+
+    return list(db_session.execute(query).tuples().all())
+
+
 def init(app):
     @app.route("/points")
     def points() -> ResponseReturnValue:
@@ -28,26 +59,7 @@ def init(app):
                     log.exception("Unhandled exception in def index")
 
             # rankings is a list of (User, int) tuples (user with their rank)
-            # note on the efficiency of this query: takes approx. 0.3-0.4 milliseconds on a 5 million user DB
-            #
-            # pajbot=# EXPLAIN ANALYZE SELECT * FROM (SELECT *, rank() OVER (ORDER BY points DESC) AS rank FROM "user") AS subquery LIMIT 30;
-            #                                                                         QUERY PLAN
-            # ----------------------------------------------------------------------------------------------------------------------------------------------------------
-            #  Limit  (cost=0.43..2.03 rows=30 width=49) (actual time=0.020..0.069 rows=30 loops=1)
-            #    ->  WindowAgg  (cost=0.43..181912.19 rows=4197554 width=49) (actual time=0.020..0.065 rows=30 loops=1)
-            #          ->  Index Scan Backward using user_points_idx on "user"  (cost=0.43..118948.88 rows=4197554 width=41) (actual time=0.012..0.037 rows=31 loops=1)
-            #  Planning Time: 0.080 ms
-            #  Execution Time: 0.089 ms
-            #
-            # (see also the extensive comment on migration revision ID 2, 0002_create_index_on_user_points.py)
-
-            query = select(User, column("rank")).from_statement(
-                text(
-                    'SELECT * FROM (SELECT *, rank() OVER (ORDER BY points DESC) AS rank FROM "user") AS subquery LIMIT 30'
-                )
-            )
-
-            rankings = db_session.execute(query).tuples().all()
+            rankings = get_top_users(db_session)
 
             chatters_refresh_enabled = ChattersRefreshModule.is_enabled()
             chatters_refresh_settings = ChattersRefreshModule.module_settings()
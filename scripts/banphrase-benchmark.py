@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Compares BanphraseMatcher against checking every banphrase one after another, like BanphraseManager.check_message
+used to.
+
+Runs entirely in memory on generated banphrases and chat messages, no config, database or redis required.
+
+See scripts/README.md for usage.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from pajbot.models.banphrase import Banphrase  # noqa: E402
+from pajbot.models.banphrase_matcher import BanphraseMatcher  # noqa: E402
+
+ACCENTED_LETTERS = "áàâäãåéèêëíìîïóòôöõúùûüñç"
+
+
+def random_word(rng: random.Random) -> str:
+    length = rng.randint(3, 10)
+    word = "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+    if rng.random() < 0.2:
+        word = word.capitalize()
+    return word
+
+
+def generate_banphrases(rng: random.Random, num_banphrases: int) -> list[Banphrase]:
+    banphrases = []
+    for i in range(num_banphrases):
+        roll = rng.random()
+        if roll < 0.7:
+            operator = "contains"
+        elif roll < 0.78:
+            operator = "startswith"
+        elif roll < 0.86:
+            operator = "endswith"
+        elif roll < 0.93:
+            operator = "exact"
+        else:
+            operator = "regex"
+
+        if operator == "regex":
+            if rng.random() < 0.1:
+                # backreference, can't be combined with the other regexes
+                phrase = rf"({rng.choice(string.ascii_lowercase)})\1{{{rng.randint(4, 8)},}}"
+            else:
+                phrase = rf"{random_word(rng)}\d{{{rng.randint(1, 4)},}}"
+        else:
+            phrase = " ".join(random_word(rng) for _ in range(rng.randint(1, 3)))
+
+        banphrase = Banphrase(
+            name=f"Banphrase {i}",
+            phrase=phrase,
+            operator=operator,
+            length=rng.choice([5, 60, 300, 600, 3600]),
+            permanent=rng.random() < 0.05,
+            case_sensitive=rng.random() < 0.1,
+            remove_accents=rng.random() < 0.2,
+            normalize_confusables=rng.random() < 0.1,
+            sub_immunity=rng.random() < 0.1,
+        )
+        banphrase.id = i
+        banphrases.append(banphrase)
+
+    return banphrases
+
+
+def generate_messages(rng: random.Random, banphrases: list[Banphrase], num_messages: int) -> list[str]:
+    vocabulary = ["the", "a", "is", "this", "LOL", "what", "?", "no", "yes", "stream", "game", "!", "xd", "okay"]
+    messages = []
+    for _ in range(num_messages):
+        words = []
+        for _ in range(rng.randint(1, 20)):
+            if rng.random() < 0.01:
+                banphrase = rng.choice(banphrases)
+                if banphrase.operator != "regex":
+                    words.append(banphrase.phrase)
+            elif rng.random() < 0.5:
+                words.append(rng.choice(vocabulary))
+            else:
+                word = random_word(rng)
+                if rng.random() < 0.05:
+                    word += rng.choice(ACCENTED_LETTERS)
+                words.append(word)
+        messages.append(" ".join(words))
+    return messages
+
+
+def check_message_loop(banphrases: list[Banphrase], message: str, user: Any) -> Optional[Banphrase]:
+    matched_banphrase = None
+    for banphrase in banphrases:
+        if banphrase.match(message, user):
+            if not matched_banphrase or banphrase.greater_than(matched_banphrase):
+                matched_banphrase = banphrase
+    return matched_banphrase
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the combined banphrase matcher")
+    parser.add_argument("--banphrases", type=int, default=5000, help="Enabled banphrases")
+    parser.add_argument("--messages", type=int, default=200, help="Chat messages to check")
+    parser.add_argument("--repeat", type=int, default=3, help="Take the best of this many runs")
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    banphrases = generate_banphrases(rng, args.banphrases)
+    messages = generate_messages(rng, banphrases, args.messages)
+    users = [SimpleNamespace(subscriber=rng.random() < 0.3) for _ in messages]
+
+    build_time = min(timeit.repeat(lambda: BanphraseMatcher(banphrases), number=1, repeat=args.repeat))
+    print(f"Building the matcher for {len(banphrases)} banphrases took {build_time * 1000:.2f}ms")
+    matcher = BanphraseMatcher(banphrases)
+
+    # Both have to pick the exact same banphrase
+    num_matched = 0
+    for message, user in zip(messages, users):
+        expected = check_message_loop(banphrases, message, user)
+        assert matcher.match(message, user) is expected, message  # type: ignore[arg-type]
+        if expected is not None:
+            num_matched += 1
+    print(f"{num_matched} of {len(messages)} messages match a banphrase")
+
+    def run_loop() -> None:
+        for message, user in zip(messages, users):
+            check_message_loop(banphrases, message, user)
+
+    def run_matcher() -> None:
+        match = matcher.match
+        for message, user in zip(messages, users):
+            match(message, user)  # type: ignore[arg-type]
+
+    results = {}
+    for name, function in (("loop", run_loop), ("matcher", run_matcher)):
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        results[name] = best
+        print(
+            f"{name:>8}: {best * 1000:9.2f}ms for {len(messages)} messages ({best * 1e6 / len(messages):8.1f}µs/message)"
+        )
+
+    print(f"Speedup: {results['loop'] / results['matcher']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
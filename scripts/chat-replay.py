@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Replays recorded Twitch IRC traffic through the bot's message pipeline as fast as possible,
+and reports how many messages per second the bot can keep up with.
+
+The bot is set up from a regular config file, which MUST point at a throwaway PostgreSQL schema and Redis
+database - the replay creates users, awards points, and runs every enabled module against them.
+Helix is replaced with a local stand-in that answers from the users seen in the recording,
+and outgoing chat messages and moderation actions are only counted, never sent.
+
+See scripts/README.md for usage.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import argparse
+import collections
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from pajbot.apiwrappers.twitch.helix import TwitchHelixAPI  # noqa: E402
+from pajbot.managers.handler import HandlerManager  # noqa: E402
+from pajbot.managers.irc import Connection  # noqa: E402
+
+from requests import Response  # noqa: E402
+
+log = logging.getLogger("chat-replay")
+
+IRC_LINE_REGEX = re.compile(r"^(?:@(?P<tags>\S+) )?(?::(?P<prefix>\S+) )?(?P<command>\S+)(?: (?P<target>[^:\s]\S*))?")
+
+
+class RecordedUser:
+    def __init__(self, id: str, login: str, name: str) -> None:
+        self.id = id
+        self.login = login
+        self.name = name
+
+    def jsonify(self) -> dict[str, str]:
+        return {"id": self.id, "login": self.login, "display_name": self.name}
+
+
+class Recording:
+    """Raw IRC lines of a recording, plus the users and channel seen in them"""
+
+    def __init__(self, path: str) -> None:
+        self.lines: list[str] = []
+        self.users_by_id: dict[str, RecordedUser] = {}
+        self.users_by_login: dict[str, RecordedUser] = {}
+        channels: collections.Counter[tuple[str, str]] = collections.Counter()
+
+        with open(path, "r", encoding="utf-8") as recording_file:
+            for line in recording_file:
+                line = line.rstrip("\r\n")
+                if not line or line.startswith("#"):
+                    continue
+
+                match = IRC_LINE_REGEX.match(line)
+                if match is None:
+                    continue
+
+                self.lines.append(line)
+
+                tags = parse_tags(match.group("tags") or "")
+                prefix = match.group("prefix") or ""
+                target = match.group("target") or ""
+
+                if "room-id" in tags and target.startswith("#"):
+                    channels[(tags["room-id"], target[1:])] += 1
+
+                user_id = tags.get("user-id", None)
+                login = tags.get("login", prefix.split("!")[0])
+                if user_id and login:
+                    user = RecordedUser(user_id, login, tags.get("display-name", "") or login)
+                    self.users_by_id[user_id] = user
+                    self.users_by_login[login] = user
+
+        # The channel most messages were recorded in
+        self.channel: Optional[tuple[str, str]] = channels.most_common(1)[0][0] if channels else None
+
+
+def parse_tags(raw_tags: str) -> dict[str, str]:
+    tags = {}
+    for raw_tag in raw_tags.split(";"):
+        key, _, value = raw_tag.partition("=")
+        tags[key] = value
+    return tags
+
+
+class ReplayTwitchHelixAPI(TwitchHelixAPI):
+    """Answers Helix requests from the recording instead of the network.
+    Every request is counted, and can optionally be delayed to simulate the round trip to Twitch."""
+
+    recording: Recording
+    latency: float = 0.0
+
+    def __init__(self, redis, app_token_manager) -> None:
+        super().__init__(redis, app_token_manager)
+        self.requests: collections.Counter[str] = collections.Counter()
+
+    def _user(self, user_id: Optional[str] = None, login: Optional[str] = None) -> Optional[RecordedUser]:
+        if user_id is not None:
+            if user_id in self.recording.users_by_id:
+                return self.recording.users_by_id[user_id]
+            if self.recording.channel is not None and self.recording.channel[0] == user_id:
+                return RecordedUser(user_id, self.recording.channel[1], self.recording.channel[1])
+            # Unknown IDs (e.g. the bot account from the config) are made up
+            return RecordedUser(user_id, f"user{user_id}", f"user{user_id}")
+
+        if login is not None:
+            return self.recording.users_by_login.get(login, None)
+
+        return None
+
+    def request(self, method, endpoint, params, headers, authorization=None, json=None):
+        self.requests[f"{method} {endpoint}"] += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        params = params or {}
+        body: dict[str, Any] = {"data": [], "pagination": {}}
+
+        if endpoint == "/users":
+            user = self._user(params.get("id", None), params.get("login", None))
+            if user is not None:
+                body["data"] = [user.jsonify()]
+        elif endpoint == "/chat/chatters":
+            body["data"] = [
+                {"user_id": user.id, "user_login": user.login, "user_name": user.name}
+                for user in self.recording.users_by_id.values()
+            ]
+        elif endpoint == "/moderation/bans" and method == "POST":
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            body["data"] = [{"created_at": now, "end_time": None}]
+
+        response = Response()
+        response.status_code = 200
+        response._content = to_json(body).encode("utf-8")
+        return response
+
+
+def to_json(data: Any) -> str:
+    return json.dumps(data)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def configure_modules(bot, module_ids: Optional[list[str]]) -> None:
+    if module_ids is None:
+        return
+
+    for module in list(bot.module_manager.modules):
+        if module.ID not in module_ids:
+            bot.module_manager.disable_module(module.ID)
+
+    for module_id in module_ids:
+        if module_id not in bot.module_manager:
+            bot.module_manager.enable_module(module_id)
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    from pajbot.utils import load_config
+
+    recording = Recording(args.recording)
+    if not recording.lines:
+        raise ValueError(f"No IRC lines found in {args.recording}")
+
+    config = load_config(args.config)
+    if recording.channel is not None:
+        # Replay into the recorded channel, so the messages are treated as messages from the streamer's chat
+        config["main"]["streamer_id"] = recording.channel[0]
+
+    ReplayTwitchHelixAPI.recording = recording
+    ReplayTwitchHelixAPI.latency = args.helix_latency / 1000
+
+    import pajbot.bot
+
+    pajbot.bot.TwitchHelixAPI = ReplayTwitchHelixAPI  # type: ignore[misc]
+
+    bot = pajbot.bot.Bot(config, argparse.Namespace(silent=False))
+    configure_modules(bot, args.modules.split(",") if args.modules is not None else None)
+
+    sent_messages = collections.Counter[str]()
+    bot.irc.privmsg = lambda channel, message: sent_messages.update(["privmsg"])  # type: ignore[method-assign]
+    bot.irc.send_raw = lambda message: sent_messages.update(["raw"])  # type: ignore[method-assign]
+
+    connection = Connection(bot.reactor)
+
+    lines = recording.lines * args.repeat
+    if args.limit is not None:
+        lines = lines[: args.limit + args.warmup]
+
+    for line in lines[: args.warmup]:
+        connection._process_line(line)
+
+    measured_lines = lines[args.warmup :]
+    latencies: list[float] = []
+    allocated_bytes: list[int] = []
+    bot.twitch_helix_api.requests.clear()
+    HandlerManager.reset_stats()
+
+    if args.trace_allocations:
+        tracemalloc.start()
+
+    time_start = time.perf_counter()
+    for line in measured_lines:
+        if args.trace_allocations:
+            current_before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+        message_start = time.perf_counter()
+        connection._process_line(line)
+        latencies.append(time.perf_counter() - message_start)
+
+        if args.trace_allocations:
+            _, peak = tracemalloc.get_traced_memory()
+            allocated_bytes.append(peak - current_before)
+    time_total = time.perf_counter() - time_start
+
+    # Moderation actions are executed in the background, wait for them so the Helix request counts are complete
+    bot.moderation_dispatcher.join()
+
+    if args.trace_allocations:
+        tracemalloc.stop()
+
+    latencies.sort()
+    report: dict[str, Any] = {
+        "recording": args.recording,
+        "modules": sorted(module.ID for module in bot.module_manager.modules),
+        "messages": len(measured_lines),
+        "seconds": time_total,
+        "messages_per_second": len(measured_lines) / time_total if time_total > 0 else 0.0,
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        "helix_requests": dict(bot.twitch_helix_api.requests),
+        "sent_messages": dict(sent_messages),
+        "moderation": bot.moderation_dispatcher.jsonify(),
+        "handlers": {
+            handler_name: stats
+            for handler_name, stats in sorted(
+                HandlerManager.jsonify_stats().get("on_message", {}).items(),
+                key=lambda item: item[1]["total_ms"],
+                reverse=True,
+            )
+        },
+    }
+    if args.trace_allocations:
+        report["allocated_bytes_per_message"] = {
+            "mean": statistics.mean(allocated_bytes) if allocated_bytes else 0.0,
+            "p99": percentile(sorted(allocated_bytes), 0.99),
+        }
+
+    bot.commit_all()
+
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"Recording:        {report['recording']}")
+    print(f"Enabled modules:  {', '.join(report['modules'])}")
+    print(f"Messages:         {report['messages']} in {report['seconds']:.3f}s")
+    print(f"Throughput:       {report['messages_per_second']:,.1f} messages/s")
+    latency = report["latency_ms"]
+    print(
+        f"Latency:          mean {latency['mean']:.3f}ms, p50 {latency['p50']:.3f}ms, "
+        f"p99 {latency['p99']:.3f}ms, max {latency['max']:.3f}ms"
+    )
+    if "allocated_bytes_per_message" in report:
+        allocations = report["allocated_bytes_per_message"]
+        print(
+            f"Allocations:      mean {allocations['mean']:,.0f} bytes/message, p99 {allocations['p99']:,.0f} bytes/message "
+            "(latency above is inflated by tracemalloc)"
+        )
+    print(f"Helix requests:   {sum(report['helix_requests'].values())}")
+    for endpoint, count in sorted(report["helix_requests"].items()):
+        print(f"  {endpoint}: {count}")
+    print(f"Sent messages:    {sum(report['sent_messages'].values())}")
+    moderation = report["moderation"]
+    print(
+        f"Moderation:       {moderation['submitted']} submitted, {moderation['deduplicated']} deduplicated, "
+        f"{moderation['dropped']} dropped"
+    )
+    print("Slowest on_message handlers:")
+    for handler_name, stats in list(report["handlers"].items())[:10]:
+        print(
+            f"  {handler_name}: total {stats['total_ms']:.1f}ms, avg {stats['avg_ms']:.3f}ms, max {stats['max_ms']:.3f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded Twitch IRC traffic through the bot")
+    parser.add_argument("recording", help="File with one raw IRC line (including IRCv3 tags) per line")
+    parser.add_argument(
+        "--config", "-c", default="config.ini", help="Config file pointing at a THROWAWAY database and Redis"
+    )
+    parser.add_argument(
+        "--modules",
+        default=None,
+        help="Comma-separated list of module IDs to enable, all other modules are disabled "
+        "(default: keep the module configuration from the database)",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the recording this many times")
+    parser.add_argument("--limit", type=int, default=None, help="Only measure this many messages")
+    parser.add_argument("--warmup", type=int, default=100, help="Messages to process before measuring")
+    parser.add_argument(
+        "--helix-latency", type=float, default=0.0, help="Simulated round trip time of Helix requests in milliseconds"
+    )
+    parser.add_argument(
+        "--trace-allocations", action="store_true", help="Measure allocated bytes per message using tracemalloc"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run(args)
+
+    if args.json:
+        print(to_json(report))
+    else:
+        print_report(report)
+
+    # The bot's background threads would keep the process alive
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
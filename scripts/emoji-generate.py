@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import json
 import re
+from typing import Any
 
 import requests
 
@@ -41,9 +42,123 @@ def parse_emoji_data(text):
     return all_emoji
 
 
+def codepoint_ranges(characters):
+    """Turns a set of single characters into a sorted list of (first, last) codepoint ranges"""
+    ranges = []
+    for codepoint in sorted(ord(c) for c in characters):
+        if ranges and ranges[-1][1] == codepoint - 1:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    return [tuple(r) for r in ranges]
+
+
+def format_ranges(ranges):
+    return "[\n" + "".join(f"    (0x{first:X}, 0x{last:X}),\n" for first, last in ranges) + "]"
+
+
+def build_trie(all_emoji):
+    trie: dict[str, Any] = {}
+    for emoji in all_emoji:
+        node = trie
+        for character in emoji:
+            node = node.setdefault(character, {})
+        # end of an emoji
+        node[""] = {}
+    return trie
+
+
+def trie_to_regex(node):
+    """Turns a trie into a regex that matches the longest emoji in it, e.g. {a: {"": {}, b: {"": {}}}} -> a(?:b)?"""
+    alternatives = []
+    leaves = []
+    for character, child in sorted(node.items()):
+        if character == "":
+            continue
+
+        rest = trie_to_regex(child)
+        if rest:
+            alternatives.append(re.escape(character) + rest)
+        else:
+            leaves.append(re.escape(character))
+
+    if len(leaves) == 1:
+        alternatives.append(leaves[0])
+    elif leaves:
+        alternatives.append("[" + "".join(leaves) + "]")
+
+    if not alternatives:
+        return ""
+
+    if len(alternatives) == 1 and "" not in node:
+        return alternatives[0]
+
+    pattern = "(?:" + "|".join(alternatives) + ")"
+    if "" in node:
+        # An emoji can end here, but a longer one is preferred
+        pattern += "?"
+    return pattern
+
+
+MODULE_TEMPLATE = '''# Generated by scripts/emoji-generate.py, see scripts/README.md
+import re
+
+ALL_EMOJI = {all_emoji}
+
+# Codepoints that are an emoji on their own
+SINGLE_CODEPOINT_EMOJI_RANGES = {single_codepoint_ranges}
+
+# First codepoints of the emoji that are a sequence of several codepoints (e.g. keycaps, flags or ZWJ sequences)
+EMOJI_SEQUENCE_START_RANGES = {sequence_start_ranges}
+
+# Matches any emoji in ALL_EMOJI, the longest one if several start at the same position
+EMOJI_PATTERN = {emoji_pattern}
+
+SINGLE_CODEPOINT_EMOJI = frozenset(
+    chr(codepoint) for first, last in SINGLE_CODEPOINT_EMOJI_RANGES for codepoint in range(first, last + 1)
+)
+EMOJI_SEQUENCE_STARTS = frozenset(
+    chr(codepoint) for first, last in EMOJI_SEQUENCE_START_RANGES for codepoint in range(first, last + 1)
+)
+EMOJI_REGEX = re.compile(EMOJI_PATTERN)
+
+
+def contains_emoji(message: str) -> bool:
+    """Returns True if any emoji in ALL_EMOJI is part of the message"""
+    # Most emoji are a single codepoint, so most messages with emoji are decided here
+    if not SINGLE_CODEPOINT_EMOJI.isdisjoint(message):
+        return True
+
+    # and most messages without emoji here
+    if EMOJI_SEQUENCE_STARTS.isdisjoint(message):
+        return False
+
+    return EMOJI_REGEX.search(message) is not None
+
+
+def count_emoji(message: str) -> int:
+    """Returns how many emoji the message contains. A sequence like 👨‍👩‍👧 or 🇸🇪 counts as one emoji"""
+    if SINGLE_CODEPOINT_EMOJI.isdisjoint(message) and EMOJI_SEQUENCE_STARTS.isdisjoint(message):
+        return 0
+
+    return len(EMOJI_REGEX.findall(message))
+'''
+
+
+def generate_module(all_emoji):
+    single_codepoint_emoji = {emoji for emoji in all_emoji if len(emoji) == 1}
+    sequence_starts = {emoji[0] for emoji in all_emoji if len(emoji) > 1}
+
+    return MODULE_TEMPLATE.format(
+        all_emoji=json.dumps(all_emoji, ensure_ascii=False, indent=4),
+        single_codepoint_ranges=format_ranges(codepoint_ranges(single_codepoint_emoji)),
+        sequence_start_ranges=format_ranges(codepoint_ranges(sequence_starts)),
+        emoji_pattern=json.dumps(trie_to_regex(build_trie(all_emoji)), ensure_ascii=False),
+    )
+
+
 if __name__ == "__main__":
     emoji_data_text = download_emoji_data()
     all_emoji = parse_emoji_data(emoji_data_text)
 
-    list_str = json.dumps(all_emoji, ensure_ascii=False, indent=4)
-    print("ALL_EMOJI = " + list_str)
+    print(generate_module(all_emoji), end="")
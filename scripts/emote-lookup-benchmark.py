@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compares the merged emote lookup table (EmoteLookupTable) against looking up every word in the
+six FFZ/BTTV/7TV channel and global lookup tables one after another, like EmoteManager used to.
+
+Runs entirely in memory on generated emote sets and chat messages, no config, database or redis required.
+
+See scripts/README.md for usage.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from pajbot.managers.emote import EmoteLookupTable  # noqa: E402
+from pajbot.models.emote import Emote  # noqa: E402
+
+# Order in which EmoteManager.match_word_to_emote used to query the lookup tables
+PRECEDENCE = ["ffz channel", "bttv channel", "7tv channel", "ffz global", "bttv global", "7tv global"]
+
+
+def random_code(rng: random.Random) -> str:
+    length = rng.randint(3, 14)
+    return rng.choice(string.ascii_letters) + "".join(rng.choice(string.ascii_letters) for _ in range(length - 1))
+
+
+def generate_emote_sets(rng: random.Random, emotes_per_set: int) -> list[list[Emote]]:
+    emote_sets = []
+    for name in PRECEDENCE:
+        provider = name.split(" ")[0]
+        emote_sets.append(
+            [
+                Emote(code=random_code(rng), provider=provider, id=str(i), urls={}, max_width=28, max_height=28)
+                for i in range(emotes_per_set)
+            ]
+        )
+    return emote_sets
+
+
+def generate_messages(rng: random.Random, emote_sets: list[list[Emote]], num_messages: int) -> list[list[str]]:
+    all_codes = [emote.code for emotes in emote_sets for emote in emotes]
+    vocabulary = ["the", "a", "is", "this", "LOL", "what", "?", "no", "yes", "stream", "game", "!", "xd", "okay"]
+    messages = []
+    for _ in range(num_messages):
+        words = []
+        for _ in range(rng.randint(1, 20)):
+            if rng.random() < 0.2:
+                words.append(rng.choice(all_codes))
+            elif rng.random() < 0.5:
+                words.append(rng.choice(vocabulary))
+            else:
+                words.append(random_code(rng).lower())
+        messages.append(words)
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the merged emote lookup table")
+    parser.add_argument("--emotes", type=int, default=300, help="Emotes per provider and set (channel/global)")
+    parser.add_argument("--messages", type=int, default=10000, help="Chat messages to look up")
+    parser.add_argument("--repeat", type=int, default=5, help="Take the best of this many runs")
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    emote_sets = generate_emote_sets(rng, args.emotes)
+    messages = generate_messages(rng, emote_sets, args.messages)
+
+    separate_tables = [{emote.code: emote for emote in emotes} for emotes in emote_sets]
+    merged_table = EmoteLookupTable(emote_sets)
+
+    def match_separate(word: str) -> Optional[Emote]:
+        for table in separate_tables:
+            emote = table.get(word, None)
+            if emote is not None:
+                return emote
+        return None
+
+    def run_separate() -> int:
+        return sum(1 for words in messages for word in words if match_separate(word) is not None)
+
+    def run_merged() -> int:
+        match = merged_table.match
+        return sum(1 for words in messages for word in words if match(word) is not None)
+
+    # Both have to find the exact same emotes
+    for words in messages:
+        for word in words:
+            assert match_separate(word) is merged_table.match(word), word
+
+    num_words = sum(len(words) for words in messages)
+    results = {}
+    for name, function in (("6 lookups", run_separate), ("merged table", run_merged)):
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>14}: {best * 1000:8.2f}ms for {num_words} words ({best * 1e9 / num_words:6.1f}ns/word)")
+
+    print(f"Speedup: {results['6 lookups'] / results['merged table']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Measures what the spam protection modules (case checker, ASCII protection, repetition spam, emote limit and emote
+timeout) cost per chat message together, and compares the MessageFeatures they share against every module walking
+the message on its own, like they used to.
+
+Runs entirely in memory on generated chat messages, no config, database or redis required.
+
+See scripts/README.md for usage.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from pajbot.emoji import contains_emoji  # noqa: E402
+from pajbot.models.emote import Emote, EmoteInstance  # noqa: E402
+from pajbot.models.message_features import MessageFeatures  # noqa: E402
+from pajbot.modules.ascii import AsciiProtectionModule  # noqa: E402
+from pajbot.modules.base import BaseModule  # noqa: E402
+from pajbot.modules.casechecker import CaseCheckerModule  # noqa: E402
+from pajbot.modules.emote_limit import EmoteLimitModule  # noqa: E402
+from pajbot.modules.emote_timeout import EmoteTimeoutModule  # noqa: E402
+from pajbot.modules.repspam import RepspamModule  # noqa: E402
+
+EMOTES = [
+    Emote(code, provider, str(i), {}, 28, 28)
+    for i, (code, provider) in enumerate(
+        [("Kappa", "twitch"), ("PogChamp", "twitch"), ("forsenE", "twitch"), ("OMEGALUL", "ffz"), ("LULW", "ffz")]
+        + [("monkaS", "bttv"), ("FeelsDankMan", "bttv"), ("catJAM", "7tv"), ("peepoHappy", "7tv")]
+    )
+]
+EMOTES_BY_CODE = {emote.code: emote for emote in EMOTES}
+
+VOCABULARY = ["the", "a", "is", "this", "LOL", "what", "?", "no", "yes", "stream", "game", "!", "xd", "okay"]
+UNICODE_WORDS = ["ｆｏｒｓｅｎ", "테스트", "привет", "😂", "▓▓▓▓", "⣿⣿⣿⣿"]
+
+
+def random_word(rng: random.Random) -> str:
+    word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+    return word.upper() if rng.random() < 0.1 else word
+
+
+def generate_message(rng: random.Random) -> tuple[str, list[EmoteInstance]]:
+    words = []
+    if rng.random() < 0.05:
+        # Repetition spam
+        spam = [random_word(rng) for _ in range(rng.randint(2, 4))]
+        words = spam * rng.randint(2, 15)
+    else:
+        for _ in range(rng.randint(1, 25)):
+            roll = rng.random()
+            if roll < 0.15:
+                words.append(rng.choice(EMOTES).code)
+            elif roll < 0.18:
+                words.append(rng.choice(UNICODE_WORDS))
+            elif roll < 0.6:
+                words.append(rng.choice(VOCABULARY))
+            else:
+                words.append(random_word(rng))
+
+    message = " ".join(words)
+
+    emote_instances = []
+    position = 0
+    for word in words:
+        emote = EMOTES_BY_CODE.get(word, None)
+        if emote is not None:
+            emote_instances.append(EmoteInstance(position, position + len(word), emote))
+        position += len(word) + 1
+
+    return message, emote_instances
+
+
+def features_separately(message: str, emote_instances: list[EmoteInstance]) -> dict[str, Any]:
+    """What the modules used to compute, each in its own loop over the message"""
+    word_list = [word for word in message.split(" ") if not RepspamModule.is_word_ignored(word)]
+    word_set = set(word_list)
+    return {
+        "lowercase": sum(1 for c in message if c.islower()),
+        "uppercase": sum(1 for c in message if c.isupper()),
+        "non_alnum": sum(not c.isalnum() for c in message),
+        "word_freq": {word: word_list.count(word) for word in word_set},
+        "num_emotes": len(emote_instances),
+        "providers": {
+            provider
+            for provider in ("twitch", "ffz", "bttv", "7tv")
+            if any(e.emote.provider == provider for e in emote_instances)
+        },
+        "emoji": contains_emoji(message),
+    }
+
+
+def features_shared(message: str, emote_instances: list[EmoteInstance]) -> dict[str, Any]:
+    features = MessageFeatures(message, emote_instances)
+    return {
+        "lowercase": features.num_lowercase,
+        "uppercase": features.num_uppercase,
+        "non_alnum": features.num_non_alnum,
+        "word_freq": {
+            word: freq for word, freq in features.word_frequency.items() if not RepspamModule.is_word_ignored(word)
+        },
+        "num_emotes": features.num_emotes,
+        "providers": {
+            provider for provider in ("twitch", "ffz", "bttv", "7tv") if provider in features.emote_providers
+        },
+        "emoji": features.contains_emoji,
+    }
+
+
+def create_module(module_class: type[BaseModule], bot: Any, **settings: Any) -> Any:
+    module = module_class(bot)
+    module.settings = {setting.key: setting.default for setting in module_class.SETTINGS}
+    module.settings.update(settings)
+    return module
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the spam protection modules")
+    parser.add_argument("--messages", type=int, default=5000, help="Chat messages to check")
+    parser.add_argument("--repeat", type=int, default=3, help="Take the best of this many runs")
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = [generate_message(rng) for _ in range(args.messages)]
+
+    # Both have to see the exact same values
+    for message, emote_instances in messages:
+        assert features_separately(message, emote_instances) == features_shared(message, emote_instances), message
+
+    actions = []
+
+    def record_action(*args: Any, **kwargs: Any) -> None:
+        actions.append(args)
+
+    bot = SimpleNamespace(
+        is_online=True, delete_or_timeout=record_action, timeout=record_action, timeout_warn=record_action
+    )
+    source = SimpleNamespace(level=100, moderator=False, subscriber=False, vip=False)
+    case_checker = create_module(CaseCheckerModule, bot, lowercase_timeouts=True, uppercase_timeouts=True)
+    ascii_protection = create_module(AsciiProtectionModule, bot)
+    repspam = create_module(RepspamModule, bot)
+    emote_limit = create_module(EmoteLimitModule, bot)
+    emote_timeout = create_module(
+        EmoteTimeoutModule, bot, timeout_twitch=False, timeout_ffz=False, timeout_bttv=True, timeout_7tv=True
+    )
+
+    def run_modules(message: str, emote_instances: list[EmoteInstance], features: MessageFeatures) -> None:
+        # Same order as the bot: on_pubmsg, then on_message. Every module looks at every message, no matter
+        # whether an earlier one already timed the user out
+        ascii_protection.on_pubmsg(source, message, tags={"id": "1"}, features=features)
+        for module in (case_checker, repspam, emote_limit, emote_timeout):
+            module.on_message(
+                source, message, msg_id="1", whisper=False, emote_instances=emote_instances, features=features
+            )
+
+    def run_shared() -> None:
+        for message, emote_instances in messages:
+            run_modules(message, emote_instances, MessageFeatures(message, emote_instances))
+
+    results = {}
+    for name, function in (
+        ("separately", lambda: [features_separately(*message) for message in messages]),
+        ("shared", lambda: [features_shared(*message) for message in messages]),
+        ("modules", run_shared),
+    ):
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        results[name] = best
+        print(
+            f"{name:>10}: {best * 1000:9.2f}ms for {len(messages)} messages ({best * 1e6 / len(messages):8.1f}µs/message)"
+        )
+
+    print(f"Speedup of the message features: {results['separately'] / results['shared']:.2f}x")
+    print(f"{len(actions) // args.repeat} moderation actions per run")
+
+
+if __name__ == "__main__":
+    main()
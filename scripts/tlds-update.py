@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+import requests
+
+
+def download_tlds():
+    resp = requests.get("https://data.iana.org/TLD/tlds-alpha-by-domain.txt")
+    resp.raise_for_status()
+    return resp.text
+
+
+if __name__ == "__main__":
+    print(download_tlds(), end="")
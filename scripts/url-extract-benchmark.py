@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compares find_unique_urls against running URLExtract on every message, like find_unique_urls used to.
+
+Runs entirely in memory on generated chat messages, no config, database or redis required.
+
+See scripts/README.md for usage.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from pajbot.modules.linkchecker import _extract_unique_urls, extractor, find_unique_urls  # noqa: E402
+
+VOCABULARY = ["the", "a", "is", "this", "LOL", "what", "?", "no", "yes", "stream", "game", "!", "xd", "okay", "..."]
+URLS = ["pajlada.se", "https://forsen.tv/clips", "www.example.com/a?b=c", "10.0.0.1", "twitch.tv/pajlada"]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+
+
+def random_message(rng: random.Random, link_ratio: float) -> str:
+    words = []
+    for _ in range(rng.randint(1, 20)):
+        if rng.random() < 0.5:
+            words.append(rng.choice(VOCABULARY))
+        else:
+            words.append(random_word(rng))
+
+    if rng.random() < 0.05:
+        # Not a URL, but has a dot
+        words.append(random_word(rng) + "." + random_word(rng))
+    if rng.random() < link_ratio:
+        words.insert(rng.randint(0, len(words)), rng.choice(URLS))
+
+    return " ".join(words)
+
+
+def generate_messages(rng: random.Random, num_messages: int, copypasta_ratio: float, link_ratio: float) -> list[str]:
+    copypastas = [random_message(rng, link_ratio) for _ in range(20)]
+    return [
+        rng.choice(copypastas) if rng.random() < copypasta_ratio else random_message(rng, link_ratio)
+        for _ in range(num_messages)
+    ]
+
+
+def find_unique_urls_unfiltered(message: str) -> set[str]:
+    urls = []
+    for url in extractor.gen_urls(message):
+        if not (url.startswith("http://") or url.startswith("https://")):
+            url = "http://" + url
+        if not (url[-1].isalpha() or url[-1].isnumeric() or url[-1] == "/"):
+            url = url[:-1]
+        urls.append(url)
+
+    return set(urls)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark URL extraction from chat messages")
+    parser.add_argument("--messages", type=int, default=5000, help="Chat messages to extract URLs from")
+    parser.add_argument("--copypasta", type=float, default=0.2, help="Share of messages that are repeated copypasta")
+    parser.add_argument("--links", type=float, default=0.02, help="Share of messages that contain a link")
+    parser.add_argument("--repeat", type=int, default=3, help="Take the best of this many runs")
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = generate_messages(rng, args.messages, args.copypasta, args.links)
+
+    # Both have to find the exact same URLs
+    num_with_urls = 0
+    for message in messages:
+        expected = find_unique_urls_unfiltered(message)
+        assert find_unique_urls(message) == expected, message
+        if expected:
+            num_with_urls += 1
+    print(f"{num_with_urls} of {len(messages)} messages contain a URL")
+
+    def run_unfiltered() -> None:
+        for message in messages:
+            find_unique_urls_unfiltered(message)
+
+    def run_find_unique_urls() -> None:
+        # Every run starts without any remembered messages
+        _extract_unique_urls.cache_clear()
+        for message in messages:
+            find_unique_urls(message)
+
+    results = {}
+    for name, function in (("before", run_unfiltered), ("after", run_find_unique_urls)):
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        results[name] = best
+        print(
+            f"{name:>8}: {best * 1000:9.2f}ms for {len(messages)} messages ({best * 1e6 / len(messages):8.1f}µs/message)"
+        )
+
+    print(f"Speedup: {results['before'] / results['after']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()